@@ -0,0 +1,578 @@
+import asyncio
+import os
+import time
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import boto3
+import httpx
+import requests
+from lib import snapshot
+from lib.cache_stats import stats
+from lib.projection import Projection
+from lib.restapi import (
+    _cached_api_data,
+    _cached_api_data_many,
+    _cached_api_request,
+    batch_get_cached_items,
+    build_response,
+    cached_item_response,
+    endpoint_family,
+    finish_batch,
+    local_response,
+    make_cache_key,
+    memory_cache,
+    project_response,
+    raise_for_negative,
+    resolve_ttl_hours,
+    store_response
+)
+from lib.transport import _MAX_RETRIES, _RETRY_STATUS_CODES, _TIMEOUT, _backoff_seconds, _breaker
+
+
+# asyncio counterpart of lib.restapi for workflows that fan out widely: the
+# same cache tiers, keys, statistics, snapshots and circuit breaker, with
+# upstream requests on an httpx.AsyncClient, and DynamoDB calls and /tmp disk
+# tier I/O on worker threads (only process memory is read on the loop).
+
+# Concurrent requests per upstream host, and concurrent DynamoDB calls (each
+# holds a worker thread of the event loop's default executor)
+_HOST_CONCURRENCY = int(os.environ.get('API_ASYNC_HOST_CONCURRENCY', '20'))
+_DYNAMODB_CONCURRENCY = int(os.environ.get('API_ASYNC_DYNAMODB_CONCURRENCY', '8'))
+
+
+class _InFlightLoad:
+    """A shared cache load and the number of callers awaiting it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _LoopState:
+    """
+    Objects bound to one event loop: the HTTP client, the per-upstream
+    semaphores and the in-flight cache loads.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.client: Optional[httpx.AsyncClient] = None
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.in_flight: Dict[str, _InFlightLoad] = {}
+
+
+_state: Optional[_LoopState] = None
+
+# Module-level so it (and the keep-alive connections of its HTTP client)
+# survives across invocations of a warm Lambda container
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def run(coro: Awaitable[Any]) -> Any:
+    """
+    Run a coroutine to completion on the container's event loop. Call from
+    synchronous code (e.g. a Lambda handler), one call at a time.
+
+    Args:
+        coro: Coroutine to run
+
+    Returns:
+        The coroutine's result
+    """
+    global _loop
+
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+
+def _get_state() -> _LoopState:
+    global _state
+
+    loop = asyncio.get_running_loop()
+    if _state is None or _state.loop is not loop:
+        _state = _LoopState(loop)
+    return _state
+
+
+def semaphore(upstream: str, limit: int) -> asyncio.Semaphore:
+    """
+    Return the running event loop's semaphore for an upstream (a host name,
+    'dynamodb', 'openai', ...), created with limit permits on first use.
+
+    Args:
+        upstream: Upstream name
+        limit: Concurrent calls allowed to the upstream
+
+    Returns:
+        asyncio.Semaphore shared by every caller on the loop
+    """
+    semaphores = _get_state().semaphores
+    if upstream not in semaphores:
+        semaphores[upstream] = asyncio.Semaphore(max(1, limit))
+    return semaphores[upstream]
+
+
+def _get_client() -> httpx.AsyncClient:
+    state = _get_state()
+    if state.client is None:
+        state.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(_TIMEOUT[1], connect=_TIMEOUT[0]),
+            limits=httpx.Limits(max_keepalive_connections=_HOST_CONCURRENCY),
+            follow_redirects=True
+        )
+    return state.client
+
+
+async def in_thread(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run a blocking DynamoDB call on a worker thread, at most
+    API_ASYNC_DYNAMODB_CONCURRENCY at a time.
+
+    Returns:
+        fn's result
+    """
+    async with semaphore('dynamodb', _DYNAMODB_CONCURRENCY):
+        return await asyncio.to_thread(fn, *args)
+
+
+async def _local_response(cache_key: str, url: str) -> Optional[requests.Response]:
+    """
+    Async counterpart of restapi.local_response: memory hits are served on
+    the loop, the disk tier is read on a worker thread.
+    """
+    memory_hit = local_response(cache_key, url, memory_only=True)
+    if memory_hit is not None:
+        return memory_hit
+    return await asyncio.to_thread(local_response, cache_key, url)
+
+
+async def get(url: str, headers: Dict[str, str]) -> requests.Response:
+    """
+    Async counterpart of lib.transport.get: timeouts, jittered retries on
+    429/5xx and connection errors, and the shared per-host circuit breaker,
+    with at most API_ASYNC_HOST_CONCURRENCY requests in flight per host.
+
+    The final response is returned as-is (callers decide whether to
+    raise_for_status); only transport failures raise.
+
+    Args:
+        url: The full URL to request
+        headers: Request headers dictionary
+
+    Returns:
+        requests.Response object
+
+    Raises:
+        CircuitOpenError: If the host's circuit breaker is open
+        requests.RequestException: If the request fails after all retries
+    """
+    host = urlparse(url).netloc
+    client = _get_client()
+
+    for attempt in range(_MAX_RETRIES + 1):
+        trial = _breaker.before_request(host)
+
+        response = None
+        try:
+            async with semaphore(host, _HOST_CONCURRENCY):
+                reply = await client.get(url, headers=headers)
+        except httpx.TransportError as e:
+            _breaker.record_failure(host)
+            if attempt == _MAX_RETRIES:
+                if isinstance(e, httpx.TimeoutException):
+                    raise requests.Timeout(str(e)) from e
+                raise requests.ConnectionError(str(e)) from e
+            print(f"Warning: Request to {host} failed ({type(e).__name__}), retrying")
+        except httpx.RequestError as e:
+            # Not worth retrying (bad encoding, redirect loop), but still a failed request
+            _breaker.record_failure(host)
+            raise requests.RequestException(str(e)) from e
+        except Exception:
+            _breaker.record_failure(host)
+            raise
+        else:
+            response = build_response(reply.status_code, reply.content, dict(reply.headers))
+            response.url = url
+            response.reason = reply.reason_phrase
+
+            if response.status_code not in _RETRY_STATUS_CODES:
+                _breaker.record_success(host)
+                return response
+
+            # Throttling means the host is up; only server errors count against it
+            if response.status_code >= 500:
+                _breaker.record_failure(host)
+            else:
+                _breaker.record_success(host)
+
+            if attempt == _MAX_RETRIES:
+                return response
+            print(f"Warning: Request to {host} returned {response.status_code}, retrying")
+        finally:
+            if trial:
+                _breaker.end_trial(host)
+
+        await asyncio.sleep(_backoff_seconds(attempt, response))
+
+    return response
+
+
+async def _single_flight(cache_key: str, load: Callable[[], Awaitable[requests.Response]]
+                         ) -> Tuple[requests.Response, bool]:
+    """
+    Coalesce concurrent loads of the same key on the running loop into one
+    task. The load is cancelled only when every caller awaiting it is.
+
+    Returns:
+        Tuple of (response, shared), where shared is True for callers that
+        received another caller's result
+    """
+    in_flight = _get_state().in_flight
+    flight = in_flight.get(cache_key)
+    shared = flight is not None
+
+    if flight is None:
+        flight = in_flight[cache_key] = _InFlightLoad(asyncio.ensure_future(load()))
+
+        def forget(_):
+            if in_flight.get(cache_key) is flight:
+                del in_flight[cache_key]
+
+        flight.task.add_done_callback(forget)
+
+    flight.waiters += 1
+    try:
+        return await asyncio.shield(flight.task), shared
+    except asyncio.CancelledError:
+        if flight.waiters == 1:
+            flight.task.cancel()
+        raise
+    finally:
+        flight.waiters -= 1
+
+
+async def _fetch_upstream(url: str, headers: Dict[str, str],
+                          projection: Optional[Projection] = None) -> requests.Response:
+    """
+    Async counterpart of restapi._fetch_upstream.
+
+    Raises:
+        requests.RequestException: If API request fails
+    """
+    print(f"Making REST API request: {url}")
+    start = time.perf_counter()
+    response = await get(url, headers)
+    stats.record_upstream(endpoint_family(url), (time.perf_counter() - start) * 1000, len(response.content))
+
+    # 404s are returned (not raised) so they can be negative-cached;
+    # callers raise them through raise_for_negative
+    if response.status_code != HTTPStatus.NOT_FOUND:
+        response.raise_for_status()
+
+    if projection and response.status_code == HTTPStatus.OK:
+        project_response(response, projection, url)
+    return response
+
+
+def _get_cached_item(table, cache_key: str) -> Optional[Dict[str, Any]]:
+    return table.get_item(Key={'cacheKey': cache_key}).get('Item')
+
+
+async def _load_through_cache(url: str, headers: Dict[str, str], cache_key: str,
+                              cache_ttl_hours: float, stale_while_revalidate: bool,
+                              projection: Optional[Projection] = None) -> requests.Response:
+    """
+    Async counterpart of restapi._load_through_cache. Refreshes are coalesced
+    within the event loop but do not take the cross-container refresh lease,
+    whose wait is a polling loop; stale entries are still revalidated by the
+    background executor, under the lease.
+
+    Raises:
+        requests.RequestException: If API request fails
+    """
+    table_name = os.environ.get('API_CACHE_TABLE')
+    if not table_name:
+        print("Warning: API_CACHE_TABLE not set, skipping cache")
+        stats.record_miss(endpoint_family(url))
+        return await _fetch_upstream(url, headers, projection)
+
+    table = None
+    try:
+        table = boto3.resource('dynamodb').Table(table_name)
+        cached_item = await in_thread(_get_cached_item, table, cache_key)
+
+        if cached_item is not None:
+            # May read chunk items and promotes to the disk tier
+            cached_response = await in_thread(cached_item_response, cache_key, cached_item, url, headers,
+                                              cache_ttl_hours, stale_while_revalidate, projection)
+            if cached_response is not None:
+                return cached_response
+
+    except Exception as e:
+        print(f"Warning: Failed to read from cache: {str(e)}")
+        # Continue to make API request if cache read fails
+
+    stats.record_miss(endpoint_family(url))
+
+    response = await _fetch_upstream(url, headers, projection)
+    # Compresses and writes the disk tier; the DynamoDB write is queued
+    await asyncio.to_thread(store_response, table, cache_key, url, response, cache_ttl_hours)
+    return response
+
+
+async def cached_api_request(url: str, headers: Dict[str, str], cache_ttl_hours: Optional[float] = None,
+                             stale_while_revalidate: bool = False,
+                             projection: Optional[Projection] = None) -> requests.Response:
+    """
+    Async counterpart of restapi._cached_api_request, sharing its cache tiers
+    and keys. Snapshot replay is served by the synchronous path.
+
+    Args:
+        url: The full URL to request
+        headers: Request headers dictionary
+        cache_ttl_hours: Time-to-live for cache entries in hours (default: the
+            endpoint family's policy)
+        stale_while_revalidate: If True, an expired DynamoDB entry is returned
+            immediately and refreshed in the background
+        projection: Top-level keys and fields to keep (see lib.projection)
+
+    Returns:
+        requests.Response object (either from cache or fresh API call)
+
+    Raises:
+        requests.RequestException: If API request fails (including cached 404s)
+    """
+    snapshot_mode = snapshot.mode()
+    if snapshot_mode == snapshot.REPLAY:
+        return _cached_api_request(url, headers, cache_ttl_hours, stale_while_revalidate, projection)
+
+    cache_key = make_cache_key(url, headers, projection)
+    cache_ttl_hours = resolve_ttl_hours(url, cache_ttl_hours)
+
+    # Check the container-local tiers before going over the network
+    response = await _local_response(cache_key, url)
+    if response is None:
+        response, shared = await _single_flight(
+            cache_key,
+            lambda: _load_through_cache(url, headers, cache_key, cache_ttl_hours, stale_while_revalidate, projection)
+        )
+        if shared:
+            # Give each waiter its own Response object
+            print(f"Coalesced request for URL: {url}")
+            stats.record_coalesced(endpoint_family(url), len(response.content))
+            response = build_response(response.status_code, response.content, dict(response.headers))
+
+    if snapshot_mode == snapshot.RECORD:
+        snapshot.record(cache_key, url, response)
+
+    raise_for_negative(response, url)
+    return response
+
+
+async def cached_api_data(url: str, headers: Dict[str, str], cache_ttl_hours: Optional[float] = None,
+                          stale_while_revalidate: bool = False, projection: Optional[Projection] = None) -> Any:
+    """
+    Async counterpart of restapi._cached_api_data: the decoded JSON body,
+    served from the decoded-object tier on repeat hits (shared, must not be
+    modified).
+
+    Args:
+        url: The full URL to request
+        headers: Request headers dictionary
+        cache_ttl_hours: Time-to-live for cache entries in hours (default: the
+            endpoint family's policy)
+        stale_while_revalidate: If True, an expired DynamoDB entry is returned
+            immediately and refreshed in the background
+        projection: Top-level keys and fields to keep (see lib.projection)
+
+    Returns:
+        Decoded JSON response body
+
+    Raises:
+        requests.RequestException: If API request fails (including cached 404s)
+        ValueError: If the response body is not valid JSON
+    """
+    if snapshot.mode() == snapshot.REPLAY:
+        return _cached_api_data(url, headers, cache_ttl_hours, stale_while_revalidate, projection)
+
+    cache_key = make_cache_key(url, headers, projection)
+    decoded_hit = memory_cache.get_decoded(cache_key)
+    if decoded_hit is not None:
+        stats.record_hit(endpoint_family(url), 'memory', cache_key, decoded_hit[1])
+        return decoded_hit[0]
+
+    response = await cached_api_request(url, headers, cache_ttl_hours, stale_while_revalidate, projection)
+    data = response.json()
+    memory_cache.set_decoded(cache_key, response.content, data)
+    return data
+
+
+async def cached_api_data_many(urls: List[str], headers: Dict[str, str], cache_ttl_hours: Optional[float] = None,
+                               raise_on_error: bool = True, stale_while_revalidate: bool = False,
+                               projection: Optional[Projection] = None) -> Dict[str, Any]:
+    """
+    Async counterpart of restapi._cached_api_data_many: decoded-object and
+    local tiers first, one BatchGetItem round trip (per 100 keys) for the
+    rest, then every miss fetched concurrently, bounded by the per-host
+    semaphore rather than a worker pool. Cancelling the call cancels its
+    upstream requests.
+
+    Args:
+        urls: Full URLs to request (duplicates are requested once)
+        headers: Request headers dictionary shared by every URL
+        cache_ttl_hours: Time-to-live for cache entries in hours (default: the
+            endpoint family's policy)
+        raise_on_error: If True, re-raise the first failure, cancelling the
+            remaining requests; if False, failed URLs (including invalid JSON)
+            are logged and left out of the result
+        stale_while_revalidate: If True, expired DynamoDB entries are returned
+            immediately and refreshed in the background
+        projection: Top-level keys and fields to keep from every response
+
+    Returns:
+        Dictionary mapping each URL to its decoded JSON body
+
+    Raises:
+        requests.RequestException: If an API request fails and raise_on_error is True
+        ValueError: If a response is not valid JSON and raise_on_error is True
+    """
+    unique_urls = list(dict.fromkeys(urls))
+
+    if snapshot.mode() == snapshot.REPLAY:
+        return _cached_api_data_many(unique_urls, headers, cache_ttl_hours, raise_on_error=raise_on_error,
+                                     stale_while_revalidate=stale_while_revalidate, projection=projection)
+
+    url_to_key = {url: make_cache_key(url, headers, projection) for url in unique_urls}
+    url_to_ttl = {url: resolve_ttl_hours(url, cache_ttl_hours) for url in unique_urls}
+    results = {}
+    responses = {}
+
+    # Decoded objects, then the container-local tiers
+    local_urls = []
+    for url in unique_urls:
+        decoded_hit = memory_cache.get_decoded(url_to_key[url])
+        if decoded_hit is not None:
+            stats.record_hit(endpoint_family(url), 'memory', url_to_key[url], decoded_hit[1])
+            results[url] = decoded_hit[0]
+        else:
+            local_urls.append(url)
+
+    local_hits = await asyncio.gather(*(_local_response(url_to_key[url], url) for url in local_urls))
+
+    pending_urls = []
+    for url, local_hit in zip(local_urls, local_hits):
+        if local_hit is not None:
+            responses[url] = local_hit
+        else:
+            pending_urls.append(url)
+
+    table_name = os.environ.get('API_CACHE_TABLE')
+    if not table_name:
+        print("Warning: API_CACHE_TABLE not set, skipping cache")
+
+    if table_name and pending_urls:
+        try:
+            cached_items = await in_thread(batch_get_cached_items, table_name,
+                                           [url_to_key[url] for url in pending_urls])
+
+            # Decoding may read chunk items and promotes to the disk tier
+            found_urls = [url for url in pending_urls if url_to_key[url] in cached_items]
+            found_responses = dict(zip(found_urls, await asyncio.gather(*(
+                in_thread(cached_item_response, url_to_key[url], cached_items[url_to_key[url]], url, headers,
+                          url_to_ttl[url], stale_while_revalidate, projection)
+                for url in found_urls
+            ))))
+
+            missed_urls = []
+            for url in pending_urls:
+                cached_response = found_responses.get(url)
+                if cached_response is not None:
+                    responses[url] = cached_response
+                else:
+                    missed_urls.append(url)
+            pending_urls = missed_urls
+
+        except Exception as e:
+            print(f"Warning: Failed to batch read from cache: {str(e)}")
+            # Continue to make API requests if cache read fails
+
+    if pending_urls:
+        await _fetch_misses(pending_urls, headers, url_to_key, url_to_ttl, table_name,
+                            raise_on_error, projection, responses)
+
+    for url, response in finish_batch(responses, url_to_key, raise_on_error).items():
+        try:
+            results[url] = response.json()
+        except ValueError as e:
+            if raise_on_error:
+                raise
+            print(f"Warning: Invalid JSON response for URL {url}: {str(e)}")
+            continue
+
+        memory_cache.set_decoded(url_to_key[url], response.content, results[url])
+
+    return results
+
+
+async def _fetch_misses(urls: List[str], headers: Dict[str, str], url_to_key: Dict[str, str],
+                        url_to_ttl: Dict[str, float], table_name: Optional[str], raise_on_error: bool,
+                        projection: Optional[Projection], responses: Dict[str, requests.Response]) -> None:
+    """
+    Fetch cache misses from upstream concurrently (coalesced with identical
+    in-flight loads), queueing their cache writes and adding them to responses.
+
+    Raises:
+        requests.RequestException: For the first failure if raise_on_error is True
+    """
+    for url in urls:
+        stats.record_miss(endpoint_family(url))
+
+    table = None
+    if table_name:
+        try:
+            table = boto3.resource('dynamodb').Table(table_name)
+        except Exception as e:
+            print(f"Warning: DynamoDB cache initialization failed: {str(e)}")
+
+    async def refresh(url: str) -> requests.Response:
+        response = await _fetch_upstream(url, headers, projection)
+        await asyncio.to_thread(store_response, table, url_to_key[url], url, response, url_to_ttl[url])
+        return response
+
+    tasks = {
+        url: asyncio.ensure_future(_single_flight(url_to_key[url], lambda url=url: refresh(url)))
+        for url in urls
+    }
+    try:
+        await asyncio.wait(tasks.values(),
+                           return_when=asyncio.FIRST_EXCEPTION if raise_on_error else asyncio.ALL_COMPLETED)
+    finally:
+        # Stops whatever is still running after a failure, or when this call is cancelled
+        for task in tasks.values():
+            task.cancel()
+
+    first_error = None
+    for url, task in tasks.items():
+        if not task.done() or task.cancelled():
+            continue
+
+        error = task.exception()
+        if error is not None:
+            if not isinstance(error, requests.RequestException):
+                raise error
+            print(f"Warning: REST API request failed for URL {url}: {str(error)}")
+            if first_error is None:
+                first_error = error
+            continue
+
+        response, shared = task.result()
+        if shared:
+            # Another caller fetched (and caches) this URL; take a private copy
+            stats.record_coalesced(endpoint_family(url), len(response.content))
+            response = build_response(response.status_code, response.content, dict(response.headers))
+        responses[url] = response
+
+    if first_error is not None and raise_on_error:
+        raise first_error
@@ -0,0 +1,187 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Optional
+import boto3
+
+
+# CloudWatch namespace for the per-invocation embedded metrics
+_METRICS_NAMESPACE = os.environ.get('API_CACHE_METRICS_NAMESPACE', 'Hp/ApiCache')
+
+# When enabled, per-key hit counts are added to the cache items at the end of
+# each invocation (one UpdateItem per distinct key hit) for the hot-key report
+_TRACK_HITS = os.environ.get('API_CACHE_TRACK_HITS', '').lower() in ('1', 'true', 'yes')
+
+_COUNTERS = ('hits', 'memory_hits', 'disk_hits', 'dynamodb_hits', 'stale_hits', 'snapshot_hits',
+             'misses', 'expirations', 'coalesced', 'upstream_requests',
+             'upstream_latency_ms', 'upstream_bytes', 'bytes_saved')
+
+
+class CacheStats:
+    """
+    Thread-safe API cache counters, kept per endpoint family.
+
+    Counters:
+        hits: requests served from any cache tier (broken down by tier in
+            memory_hits, disk_hits, dynamodb_hits, stale_hits and snapshot_hits)
+        misses: requests with no fresh entry in memory or DynamoDB
+        expirations: DynamoDB entries found but past their TTL
+        coalesced: requests that shared another caller's in-flight request
+        upstream_requests / upstream_latency_ms / upstream_bytes: API calls made
+        bytes_saved: response bytes served from cache instead of the API
+    """
+
+    def __init__(self):
+        self._families: Dict[str, Counter] = defaultdict(Counter)
+        self._key_hits: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record_hit(self, family: str, tier: str, cache_key: Optional[str], size: int) -> None:
+        """Record a response served from cache tier 'memory', 'disk', 'dynamodb', 'stale' or 'snapshot'."""
+        with self._lock:
+            counters = self._families[family]
+            counters['hits'] += 1
+            counters[f"{tier}_hits"] += 1
+            counters['bytes_saved'] += size
+            if cache_key:
+                self._key_hits[cache_key] += 1
+
+    def record_miss(self, family: str) -> None:
+        with self._lock:
+            self._families[family]['misses'] += 1
+
+    def record_expiration(self, family: str) -> None:
+        with self._lock:
+            self._families[family]['expirations'] += 1
+
+    def record_coalesced(self, family: str, size: int) -> None:
+        with self._lock:
+            self._families[family]['coalesced'] += 1
+            self._families[family]['bytes_saved'] += size
+
+    def record_upstream(self, family: str, latency_ms: float, size: int) -> None:
+        with self._lock:
+            counters = self._families[family]
+            counters['upstream_requests'] += 1
+            counters['upstream_latency_ms'] += latency_ms
+            counters['upstream_bytes'] += size
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return a copy of the counters per endpoint family, with derived
+        hit_rate and avg_upstream_latency_ms.
+        """
+        with self._lock:
+            result = {}
+            for family, counters in self._families.items():
+                family_stats = {name: counters.get(name, 0) for name in _COUNTERS}
+                lookups = family_stats['hits'] + family_stats['misses']
+                family_stats['hit_rate'] = family_stats['hits'] / lookups if lookups else 0.0
+                family_stats['avg_upstream_latency_ms'] = (
+                    family_stats['upstream_latency_ms'] / family_stats['upstream_requests']
+                    if family_stats['upstream_requests'] else 0.0
+                )
+                result[family] = family_stats
+            return result
+
+    def key_hits(self) -> Dict[str, int]:
+        """Return hit counts per cache key since the last reset."""
+        with self._lock:
+            return dict(self._key_hits)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._families.clear()
+            self._key_hits.clear()
+
+
+# Process-wide stats, reset at the end of every invocation
+stats = CacheStats()
+
+
+def _metric_unit(name: str) -> str:
+    """CloudWatch unit for a counter name."""
+    if name.endswith('_ms'):
+        return 'Milliseconds'
+    if 'bytes' in name:
+        return 'Bytes'
+    return 'Count'
+
+
+def emit_metrics(function_name: str = '') -> None:
+    """
+    Print the current counters as CloudWatch Embedded Metric Format records,
+    one per endpoint family, so CloudWatch turns the log lines into metrics.
+
+    Args:
+        function_name: Lambda function name, added as a dimension if given
+    """
+    dimensions = ['EndpointFamily', 'FunctionName'] if function_name else ['EndpointFamily']
+
+    for family, family_stats in stats.as_dict().items():
+        metrics = [{'Name': name, 'Unit': _metric_unit(name)} for name in _COUNTERS]
+        record: Dict[str, Any] = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': _METRICS_NAMESPACE,
+                    'Dimensions': [dimensions],
+                    'Metrics': metrics
+                }]
+            },
+            'EndpointFamily': family,
+            **{name: family_stats[name] for name in _COUNTERS},
+            'hit_rate': family_stats['hit_rate']
+        }
+        if function_name:
+            record['FunctionName'] = function_name
+
+        print(json.dumps(record))
+
+
+def _flush_key_hits() -> None:
+    """
+    Add this invocation's per-key hit counts to the cache items (hitCount,
+    lastHit) for the offline hot-key report. Items that no longer exist are
+    not recreated.
+    """
+    table_name = os.environ.get('API_CACHE_TABLE')
+    key_hits = stats.key_hits()
+    if not table_name or not key_hits:
+        return
+
+    table = boto3.resource('dynamodb').Table(table_name)
+    now = datetime.now().isoformat()
+    for cache_key, hits in key_hits.items():
+        try:
+            table.update_item(
+                Key={'cacheKey': cache_key},
+                UpdateExpression='ADD hitCount :hits SET lastHit = :now',
+                ConditionExpression='attribute_exists(cacheKey)',
+                ExpressionAttributeValues={':hits': hits, ':now': now}
+            )
+        except Exception:
+            # Item expired/was deleted, or the update failed; the count is best effort
+            pass
+
+
+def end_invocation(context=None) -> None:
+    """
+    Emit this invocation's cache metrics, persist per-key hit counts if
+    API_CACHE_TRACK_HITS is set, and reset the counters. Call from the
+    Lambda handler before returning. Never raises.
+
+    Args:
+        context: Lambda context object (optional)
+    """
+    try:
+        emit_metrics(getattr(context, 'function_name', '') or '')
+        if _TRACK_HITS:
+            _flush_key_hits()
+    except Exception as e:
+        print(f"Warning: Failed to emit cache metrics: {str(e)}")
+    finally:
+        stats.reset()
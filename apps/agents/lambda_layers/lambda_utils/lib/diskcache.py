@@ -0,0 +1,235 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+
+# Directory and size budget of the on-disk tier. Lambda's /tmp lives as long as
+# the container; API_CACHE_DISK_MB=0 disables the tier.
+_DISK_CACHE_DIR = os.environ.get('API_CACHE_DISK_DIR', '/tmp/api-cache')
+_DISK_CACHE_MAX_BYTES = int(os.environ.get('API_CACHE_DISK_MB', '256')) * 1024 * 1024
+
+# Payloads up to this size are stored in the SQLite row; larger ones (category
+# trees, article lists) go to their own file
+_INLINE_MAX_BYTES = 32 * 1024
+
+
+class DiskCache:
+    """
+    Thread-safe disk cache of API payloads: a SQLite index plus one file per
+    large payload, bounded by total payload size with least-recently-used eviction.
+
+    Entries carry the same absolute expiry (Unix timestamp) as the DynamoDB
+    items they mirror. Any disk or SQLite failure is logged and treated as a miss;
+    if the cache cannot be opened at all it disables itself.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._blob_dir = os.path.join(directory, 'blobs')
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disabled = max_bytes <= 0
+        # One connection shared by all threads; statements are serialized here,
+        # blob file reads and writes happen outside the lock
+        self._lock = threading.Lock()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Open the index on first use. Must be called with the lock held."""
+        if self._conn is not None or self._disabled:
+            return self._conn
+
+        try:
+            os.makedirs(self._blob_dir, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.directory, 'index.db'),
+                                   check_same_thread=False, isolation_level=None)
+            # Contents are a disposable copy of DynamoDB; durability is not needed
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                ' cache_key TEXT PRIMARY KEY,'
+                ' expires_at INTEGER NOT NULL,'
+                ' status_code INTEGER NOT NULL,'
+                ' headers TEXT NOT NULL,'
+                ' size INTEGER NOT NULL,'
+                ' body BLOB,'
+                ' last_access REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)')
+            self.current_bytes = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            self._conn = conn
+
+        except Exception as e:
+            print(f"Warning: Disk cache unavailable at {self.directory}: {str(e)}")
+            self._disabled = True
+
+        return self._conn
+
+    def _blob_path(self, cache_key: str) -> str:
+        return os.path.join(self._blob_dir, cache_key)
+
+    def get(self, cache_key: str) -> Optional[Tuple[int, int, bytes, Dict[str, str]]]:
+        """
+        Return (expires_at, status_code, content, headers) for a live entry, or None.
+        Expired entries are dropped on access.
+        """
+        try:
+            with self._lock:
+                conn = self._connection()
+                if conn is None:
+                    return None
+
+                row = conn.execute(
+                    'SELECT expires_at, status_code, headers, size, body FROM entries WHERE cache_key = ?',
+                    (cache_key,)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                expires_at, status_code, headers, size, body = row
+                if int(datetime.now().timestamp()) >= expires_at:
+                    self._remove(conn, cache_key, size, body is None)
+                    return None
+
+                conn.execute('UPDATE entries SET last_access = ? WHERE cache_key = ?',
+                             (time.time(), cache_key))
+
+            content = bytes(body) if body is not None else self._read_blob(cache_key)
+            if content is None:
+                self._forget_lost_blob(cache_key)
+                return None
+            return expires_at, status_code, content, json.loads(headers)
+
+        except Exception as e:
+            print(f"Warning: Failed to read from disk cache: {str(e)}")
+            return None
+
+    def _read_blob(self, cache_key: str) -> Optional[bytes]:
+        """Read a payload file, or None if it is gone."""
+        try:
+            with open(self._blob_path(cache_key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _forget_lost_blob(self, cache_key: str) -> None:
+        """
+        Drop the row of a payload file that is gone, so the key reads as a miss
+        and is re-cached. Left alone if a put has written the file since.
+        """
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute('SELECT size FROM entries WHERE cache_key = ? AND body IS NULL',
+                               (cache_key,)).fetchone()
+            if row is not None and not os.path.exists(self._blob_path(cache_key)):
+                print(f"Warning: Disk cache payload file missing, dropping entry {cache_key}")
+                self._remove(conn, cache_key, row[0], False)
+
+    def put(self, cache_key: str, expires_at: int, status_code: int,
+            content: bytes, headers: Dict[str, str]) -> None:
+        """
+        Insert or replace an entry, evicting least recently used entries until
+        the payload budget is respected. Payloads larger than the whole budget
+        are not cached.
+        """
+        size = len(content)
+        if self._disabled or size > self.max_bytes:
+            return
+
+        try:
+            is_blob = size > _INLINE_MAX_BYTES
+            if is_blob:
+                # Write beside the target and rename, so readers never see a partial file
+                with self._lock:
+                    if self._connection() is None:
+                        return
+                tmp_path = f"{self._blob_path(cache_key)}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, self._blob_path(cache_key))
+
+            with self._lock:
+                conn = self._connection()
+                if conn is None:
+                    return
+
+                row = conn.execute('SELECT size, body IS NULL FROM entries WHERE cache_key = ?',
+                                   (cache_key,)).fetchone()
+                if row is not None:
+                    # A previous payload file is kept only if it was just rewritten above
+                    conn.execute('DELETE FROM entries WHERE cache_key = ?', (cache_key,))
+                    self.current_bytes -= row[0]
+                    if row[1] and not is_blob:
+                        self._unlink_blob(cache_key)
+
+                self._evict(conn, size)
+
+                conn.execute(
+                    'INSERT INTO entries (cache_key, expires_at, status_code, headers, size, body, last_access)'
+                    ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (cache_key, expires_at, status_code, json.dumps(headers), size,
+                     None if is_blob else sqlite3.Binary(content), time.time())
+                )
+                self.current_bytes += size
+
+        except Exception as e:
+            print(f"Warning: Failed to write to disk cache: {str(e)}")
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        try:
+            with self._lock:
+                conn = self._connection()
+                if conn is None:
+                    return
+                for (cache_key,) in conn.execute('SELECT cache_key FROM entries WHERE body IS NULL').fetchall():
+                    self._unlink_blob(cache_key)
+                conn.execute('DELETE FROM entries')
+                self.current_bytes = 0
+        except Exception as e:
+            print(f"Warning: Failed to clear disk cache: {str(e)}")
+
+    def _evict(self, conn: sqlite3.Connection, incoming_bytes: int) -> None:
+        """
+        Remove entries to make room, expired ones first, then the least recently
+        used. Does nothing while there is room: expired entries are otherwise
+        dropped when read.
+        """
+        if self.current_bytes + incoming_bytes <= self.max_bytes:
+            return
+
+        now = int(datetime.now().timestamp())
+        for cache_key, size, is_blob in conn.execute(
+            'SELECT cache_key, size, body IS NULL FROM entries WHERE expires_at <= ?', (now,)
+        ).fetchall():
+            self._remove(conn, cache_key, size, is_blob)
+
+        while self.current_bytes + incoming_bytes > self.max_bytes:
+            row = conn.execute(
+                'SELECT cache_key, size, body IS NULL FROM entries ORDER BY last_access LIMIT 1'
+            ).fetchone()
+            if row is None:
+                break
+            self._remove(conn, *row)
+
+    def _remove(self, conn: sqlite3.Connection, cache_key: str, size: int, is_blob: bool) -> None:
+        conn.execute('DELETE FROM entries WHERE cache_key = ?', (cache_key,))
+        self.current_bytes -= size
+        if is_blob:
+            self._unlink_blob(cache_key)
+
+    def _unlink_blob(self, cache_key: str) -> None:
+        try:
+            os.remove(self._blob_path(cache_key))
+        except FileNotFoundError:
+            pass
+
+
+# Module-level so warm containers reuse it; the files outlive the process
+disk_cache = DiskCache(_DISK_CACHE_DIR, _DISK_CACHE_MAX_BYTES)
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Optional
+import boto3
+from lib import snapshot
+from lib.cache_stats import stats
+from lib.restapi import _local_get, _local_put, _write_queue
+
+
+# Memo entries share the API cache table and local tiers with API responses,
+# under keys of their own
+_MEMO_KEY_PREFIX = 'memo#'
+
+
+def _memo_key(namespace: str, key: Any) -> str:
+    """Cache key for a JSON-serializable memo key within a namespace."""
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+    return f"{_MEMO_KEY_PREFIX}{namespace}#{digest}"
+
+
+def get(namespace: str, key: Any) -> Optional[Any]:
+    """
+    Look up a memoized value: process memory, then /tmp, then the DynamoDB
+    cache table (promoting hits to the local tiers). Disabled in snapshot replay
+    mode. Failures are logged and treated as a miss.
+
+    Args:
+        namespace: Memo family, also used for cache statistics (e.g. 'vehicle-resolution')
+        key: JSON-serializable key
+
+    Returns:
+        The stored value, or None on a miss
+    """
+    if snapshot.mode() == snapshot.REPLAY:
+        return None
+
+    cache_key = _memo_key(namespace, key)
+    try:
+        local_hit = _local_get(cache_key)
+        if local_hit is not None:
+            tier, (_, content, _) = local_hit
+            stats.record_hit(namespace, tier, cache_key, len(content))
+            return json.loads(content)
+
+        table_name = os.environ.get('API_CACHE_TABLE')
+        if not table_name:
+            return None
+
+        item = boto3.resource('dynamodb').Table(table_name).get_item(Key={'cacheKey': cache_key}).get('Item')
+        if item is None or int(item['ttl']) <= int(datetime.now().timestamp()):
+            stats.record_miss(namespace)
+            return None
+
+        content = item['value'].encode('utf-8')
+        _local_put(cache_key, int(item['ttl']), 200, content, {'Content-Type': 'application/json'})
+        stats.record_hit(namespace, 'dynamodb', cache_key, len(content))
+        return json.loads(content)
+
+    except Exception as e:
+        print(f"Warning: Failed to read memo {namespace}: {str(e)}")
+        return None
+
+
+def put(namespace: str, key: Any, value: Any, ttl_hours: float) -> None:
+    """
+    Store a JSON-serializable value in the local tiers and queue its DynamoDB
+    write (see restapi._flush_cache_writes). Disabled in snapshot replay mode.
+    Failures are logged and ignored.
+
+    Args:
+        namespace: Memo family (e.g. 'vehicle-resolution')
+        key: JSON-serializable key
+        value: JSON-serializable value
+        ttl_hours: Time-to-live in hours
+    """
+    if snapshot.mode() == snapshot.REPLAY:
+        return
+
+    cache_key = _memo_key(namespace, key)
+    try:
+        content = json.dumps(value)
+        ttl_timestamp = int((datetime.now() + timedelta(hours=ttl_hours)).timestamp())
+        _local_put(cache_key, ttl_timestamp, 200, content.encode('utf-8'), {'Content-Type': 'application/json'})
+
+        table_name = os.environ.get('API_CACHE_TABLE')
+        if not table_name:
+            return
+
+        item = {
+            'cacheKey': cache_key,
+            'memo': namespace,
+            'memoKey': json.dumps(key, sort_keys=True),
+            'value': content,
+            'timestamp': datetime.now().isoformat(),
+            'size': len(content),
+            'ttl': ttl_timestamp
+        }
+        _write_queue.put(boto3.resource('dynamodb').Table(table_name), [item])
+
+    except Exception as e:
+        print(f"Warning: Failed to write memo {namespace}: {str(e)}")
+
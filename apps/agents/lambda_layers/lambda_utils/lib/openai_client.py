@@ -1,5 +1,6 @@
+import asyncio
 import base64
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 import time
 
 
@@ -14,6 +15,12 @@ models = [
 ]
 
 
+# AsyncOpenAI client shared by the calls on one event loop (its connection
+# pool is bound to that loop), and the loop it belongs to
+_async_client = None
+_async_client_loop = None
+
+
 class APILimitExceededError(Exception):
     """Raised when the API rate limit is exceeded."""
     pass
@@ -101,6 +108,79 @@ def invoke_model_text(messages: list, model_id: str = "") -> str:
     return get_response_text(response)
 
 
+def _get_async_client() -> AsyncOpenAI:
+    '''
+    Returns the running event loop's AsyncOpenAI client, created on first use
+    so keep-alive connections are reused across calls.
+    '''
+    global _async_client, _async_client_loop
+
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        _async_client = AsyncOpenAI()
+        _async_client_loop = loop
+    return _async_client
+
+
+async def invoke_model_async(messages: list, model_id: str = "", retries: int = 0, failed_models: list = None) -> dict:
+    '''
+    invoke_model() for asyncio code: the same model fallback on rate limits
+    and retry delays, without blocking the event loop.
+    '''
+
+    if retries > 5:
+        print(f"\nERROR in openAI invoke_model_async. Aborting.")
+        raise ValueError("ERROR in openAI invoke_model_async. Aborting.")
+
+    if failed_models is None:
+        failed_models = []
+
+    if model_id == "":
+        model_id = default_model
+
+    try:
+        response = await _get_async_client().chat.completions.create(
+            model=model_id,
+            messages=messages,
+            temperature=0.5,
+            top_p=0.5,
+        )
+
+        return response
+
+    except Exception as e:
+        print(f"\nERROR in openAI invoke_model_async: {e}")
+
+        if f"rate limit reached" in str(e).lower():
+            failed_models.append(model_id)
+            model_id = get_another_model(failed_models)
+            if model_id is None:
+                raise APILimitExceededError(
+                    f"API limit reached. No alternative models available. Aborting.")
+
+        retries += 1
+        retry_delay = 10 * retries
+        print(f"Retrying in {retry_delay} seconds (retry attempt #{retries})")
+        await asyncio.sleep(retry_delay)
+
+        return await invoke_model_async(messages, model_id, retries, failed_models)
+
+
+async def invoke_model_text_async(messages: list, model_id: str = "") -> str:
+    '''
+    invoke_model_text() for asyncio code.
+
+    Args:
+        messages: List of message dictionaries with text content only
+        model_id: Optional model ID to use (defaults to default_model)
+
+    Returns:
+        String containing the model's text response
+    '''
+    response = await invoke_model_async(messages, model_id)
+    return get_response_text(response)
+
+
 def _parse_xml_tag(response: str, tag: str) -> str:
     """
     Parse content from XML tags using partition.
@@ -0,0 +1,140 @@
+import json
+from typing import Any, Dict, List, Optional
+
+try:
+    import ijson
+except ImportError:
+    # Optional: without ijson the full document is parsed with json.loads and then projected
+    ijson = None
+
+
+# Bodies at least this large are projected from a streaming parse, which keeps
+# peak memory near the projected size; smaller ones are faster with json.loads
+_STREAM_MIN_BYTES = 1024 * 1024
+
+# A projection maps top-level response keys to the fields to keep from their
+# value (applied to each element of a list, or to a single object), or to None
+# to keep the whole value. Keys not listed are dropped.
+#   {'countArticles': None, 'articles': ['articleId', 'articleProductName']}
+Projection = Dict[str, Optional[List[str]]]
+
+
+def projection_key(projection: Optional[Projection]) -> str:
+    """
+    Return a stable string for a projection, for use in cache keys ('' for none).
+    """
+    if not projection:
+        return ''
+    return json.dumps({key: sorted(fields) if fields is not None else None
+                       for key, fields in projection.items()}, sort_keys=True)
+
+
+def _project_value(value: Any, fields: Optional[List[str]]) -> Any:
+    if fields is None:
+        return value
+    if isinstance(value, list):
+        return [{f: item[f] for f in fields if f in item} if isinstance(item, dict) else item
+                for item in value]
+    if isinstance(value, dict):
+        return {f: value[f] for f in fields if f in value}
+    return value
+
+
+def _project_loaded(content: bytes, projection: Projection) -> Dict[str, Any]:
+    data = json.loads(content)
+    if not isinstance(data, dict):
+        raise ValueError("Projected response must be a JSON object")
+    return {key: _project_value(data[key], fields) for key, fields in projection.items() if key in data}
+
+
+def _project_stream(content: bytes, projection: Projection) -> Dict[str, Any]:
+    """
+    Build the projected object from ijson parse events, so dropped keys and
+    fields are never materialized.
+    """
+    result: Dict[str, Any] = {}
+    key = None                  # projected top-level key being read
+    fields: Optional[List[str]] = None
+    element_prefix = None       # prefix of the object(s) whose fields are projected
+    element: Dict[str, Any] = {}
+    builder = None              # builds the value currently being kept
+    builder_field = None
+
+    for prefix, event, value in ijson.parse(content, use_float=True):
+        if prefix == '':
+            if key is not None and fields is None:
+                result[key] = builder.value
+            key, builder, element_prefix = None, None, None
+
+            if event == 'map_key' and value in projection:
+                key, fields = value, projection[value]
+                if fields is None:
+                    builder = ijson.ObjectBuilder()
+            elif event == 'start_array':
+                raise ValueError("Projected response must be a JSON object")
+
+        elif key is None:
+            continue
+
+        elif fields is None:
+            builder.event(event, value)
+
+        elif prefix == element_prefix:
+            # Events of a projected object itself: its keys, start and end
+            if event == 'map_key':
+                if builder is not None:
+                    element[builder_field] = builder.value
+                builder = None
+                if value in fields:
+                    builder, builder_field = ijson.ObjectBuilder(), value
+            elif event == 'start_map':
+                element = {}
+                result[key].append(element)
+            elif event == 'end_map':
+                if builder is not None:
+                    element[builder_field] = builder.value
+                builder = None
+            elif event not in ('start_array', 'end_array'):
+                # Scalar list element, kept as-is
+                result[key].append(value)
+
+        elif prefix == key:
+            # The top-level value: a list of objects, an object, or a scalar
+            if event == 'start_array':
+                result[key] = []
+                element_prefix = f"{key}.item"
+            elif event == 'start_map':
+                element = result[key] = {}
+                element_prefix = key
+            elif event != 'end_array':
+                result[key] = value
+
+        elif builder is not None:
+            builder.event(event, value)
+
+    return result
+
+
+def apply(content: bytes, projection: Projection) -> bytes:
+    """
+    Reduce a JSON object response to the projected keys and fields.
+
+    Args:
+        content: Raw JSON response body
+        projection: Keys and fields to keep (see Projection)
+
+    Returns:
+        Compact JSON encoding of the projected object
+
+    Raises:
+        ValueError: If the body is not a JSON object
+    """
+    if ijson is not None and len(content) >= _STREAM_MIN_BYTES:
+        try:
+            projected = _project_stream(content, projection)
+        except ijson.JSONError as e:
+            raise ValueError(f"Invalid JSON response: {str(e)}")
+    else:
+        projected = _project_loaded(content, projection)
+
+    return json.dumps(projected, separators=(',', ':')).encode('utf-8')
@@ -0,0 +1,118 @@
+import json
+import string
+import threading
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping
+
+
+class PromptTemplate(str):
+    """
+    A prompt template, usable as a plain string or with .format(). Its
+    placeholder names are parsed once at load, which also rejects malformed
+    braces, and .format() checks the values against them.
+    """
+
+    fields: FrozenSet[str]
+
+    def __new__(cls, template: str):
+        prompt = super().__new__(cls, template)
+        # Named placeholders only ("{part}", "{vehicle.name}" -> "vehicle"); "{}" and "{0}" are positional
+        prompt.fields = frozenset(
+            name.partition('.')[0].partition('[')[0]
+            for _, name, _, _ in string.Formatter().parse(template)
+            if name and not name[0].isdigit()
+        )
+        return prompt
+
+    def format(self, *args: Any, **kwargs: Any) -> str:
+        """
+        Fill in the template like str.format, with a value for exactly each
+        named placeholder.
+
+        Raises:
+            KeyError: If placeholders have no value
+            TypeError: If values have no placeholder (str.format would ignore them)
+        """
+        missing = self.fields - kwargs.keys()
+        if missing:
+            raise KeyError(f"Prompt template is missing values for: {', '.join(sorted(missing))}")
+        unexpected = kwargs.keys() - self.fields
+        if unexpected:
+            raise TypeError(f"Prompt template has no placeholders for: {', '.join(sorted(unexpected))}")
+        return super().format(*args, **kwargs)
+
+
+# Parsed files keyed by path, shared by every invocation in the container
+_prompts: Dict[str, Mapping[str, PromptTemplate]] = {}
+_lookups: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def load_prompts(path: str) -> Mapping[str, PromptTemplate]:
+    """
+    Return the prompt templates in a prompts.json file, read and validated on
+    first use and then served from memory.
+
+    Args:
+        path: Path to a JSON object mapping prompt names to template strings
+
+    Returns:
+        Read-only mapping of prompt names to templates
+
+    Raises:
+        RuntimeError: If the file cannot be loaded or is not a valid set of templates
+    """
+    prompts = _prompts.get(path)
+    if prompts is None:
+        with _lock:
+            prompts = _prompts.get(path)
+            if prompts is None:
+                try:
+                    with open(path, 'r') as f:
+                        raw = json.load(f)
+                    if not isinstance(raw, dict):
+                        raise ValueError("expected a JSON object of prompt templates")
+                    templates = {}
+                    for name, template in raw.items():
+                        if not isinstance(template, str):
+                            raise ValueError(f"prompt '{name}' is not a string")
+                        templates[name] = PromptTemplate(template)
+                except Exception as e:
+                    raise RuntimeError(f"Failed to load prompts: {str(e)}")
+
+                prompts = _prompts[path] = MappingProxyType(templates)
+
+    return prompts
+
+
+def load_json(path: str) -> Any:
+    """
+    Return the parsed contents of a JSON lookup file, read on first use and
+    then served from memory. The result is shared and must not be modified.
+
+    Args:
+        path: Path to the JSON file
+
+    Returns:
+        Parsed JSON value
+
+    Raises:
+        RuntimeError: If the file cannot be loaded
+    """
+    if path not in _lookups:
+        with _lock:
+            if path not in _lookups:
+                try:
+                    with open(path, 'r') as f:
+                        _lookups[path] = json.load(f)
+                except Exception as e:
+                    raise RuntimeError(f"Failed to load {path}: {str(e)}")
+
+    return _lookups[path]
+
+
+def reload() -> None:
+    """Forget every loaded file so the next access reads it again (for tests and local edits)."""
+    with _lock:
+        _prompts.clear()
+        _lookups.clear()
@@ -1,39 +1,1085 @@
+import atexit
 import json
 import os
-from typing import Dict
+import threading
+import time
+import uuid
+import zlib
+from http import HTTPStatus
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from datetime import datetime, timedelta
 import requests
 import hashlib
 import boto3
+from botocore.exceptions import ClientError
+from lib import snapshot
+from lib.cache_stats import stats
+from lib.diskcache import disk_cache
+from lib import transport
+from lib import projection as json_projection
+from lib.projection import Projection
 
 
-def _cached_api_request(url: str, headers: Dict[str, str], cache_ttl_hours: int = 24) -> requests.Response:
+# The _cached_api_* functions are the entry points. The few public names
+# (make_cache_key, local_response, cached_item_response, store_response, ...)
+# are the cache tiers lib.async_restapi layers its event loop over.
+
+# Upper bound on the in-process cache, in bytes of cached payload
+_MEMORY_CACHE_MAX_BYTES = int(os.environ.get('API_CACHE_MEMORY_MB', '64')) * 1024 * 1024
+
+# Refresh lease on the cache table, taken only to refresh expired entries: how
+# long a container may hold it, and how long other containers wait for the
+# holder when the stale copy cannot be served
+_LEASE_SECONDS = int(os.environ.get('API_CACHE_LEASE_SECONDS', '10'))
+_LEASE_WAIT_SECONDS = float(os.environ.get('API_CACHE_LEASE_WAIT_SECONDS', '3'))
+_LEASE_POLL_SECONDS = 0.2
+
+# Cached bodies are stored zlib-compressed; bodies still larger than one chunk
+# after compression are split across several items to stay under the 400 KB
+# DynamoDB item limit
+_COMPRESSION_LEVEL = 6
+_CHUNK_BYTES = 350 * 1024
+
+# Negative results (404s and empty article lists) are cached separately with a
+# short TTL so agent retries stop hitting the API for known-empty categories
+_NEGATIVE_TTL_MINUTES = int(os.environ.get('API_CACHE_NEGATIVE_TTL_MINUTES', '60'))
+
+# Cache writes are queued and written by a background thread, which collects
+# writes for this long so concurrent misses share BatchWriteItem calls. Handlers
+# wait for background revalidations and drain the queue (for at most
+# _WRITE_DRAIN_SECONDS in all) before returning.
+_WRITE_BATCH_WINDOW_SECONDS = float(os.environ.get('API_CACHE_WRITE_BATCH_WINDOW_SECONDS', '0.05'))
+_WRITE_DRAIN_SECONDS = float(os.environ.get('API_CACHE_WRITE_DRAIN_SECONDS', '10'))
+
+# Cache TTL per endpoint family, matched on the URL path (first match wins).
+# TecDoc catalog structure is near-static; article lists change more often.
+_ENDPOINT_POLICIES: List[Tuple[str, str, float]] = [
+    # (family, path marker, ttl hours)
+    ('manufacturers', '/manufacturers/list/', 24 * 30),
+    ('models', '/models/list/', 24 * 30),
+    ('vehicle-list', '/list-vehicles-id/', 24 * 7),
+    ('vehicle-details', '/vehicle-type-details/', 24 * 7),
+    ('categories', '/products-groups-', 24 * 7),
+    ('article-details', '/articles/article-complete-details/', 24),
+    ('articles', '/articles/list/', 6),
+]
+_DEFAULT_ENDPOINT_FAMILY = 'other'
+_DEFAULT_TTL_HOURS = 24.0
+
+# Credentials never identify a request, so they stay out of cache keys
+# (rotating the RapidAPI key must not invalidate the cache)
+_KEY_EXCLUDED_HEADERS = {'x-rapidapi-key', 'authorization', 'x-api-key'}
+
+# Decoded JSON objects attached to memory entries count against the memory
+# budget at this multiple of their encoded size
+_DECODED_SIZE_FACTOR = 4
+
+# Response headers worth keeping in the cache (the rest are per-request noise
+# such as rate-limit counters and request IDs)
+_CACHED_HEADERS = ('Content-Type',)
+
+# Marks memory entries whose payload has not been decoded (None is valid JSON)
+_NOT_DECODED = object()
+
+
+class _MemoryCache:
+    """
+    Thread-safe LRU cache bounded by the total size of the cached payloads.
+
+    Entries carry the same absolute expiry (Unix timestamp) as their DynamoDB
+    counterpart, so a warm container never serves data the table would reject.
+    An entry can also hold the decoded JSON of its payload (see set_decoded),
+    which is evicted and expires together with it.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        # cache_key -> [expires_at, status_code, content, headers, decoded, size]
+        self._entries: "OrderedDict[str, List[Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cache_key: str) -> Optional[Tuple[int, bytes, Dict[str, str]]]:
+        """
+        Return (status_code, content, headers) for a live entry, or None.
+        Expired entries are dropped on access.
+        """
+        with self._lock:
+            entry = self._live_entry(cache_key)
+            if entry is None:
+                return None
+            return entry[1], entry[2], entry[3]
+
+    def get_decoded(self, cache_key: str) -> Optional[Tuple[Any, int]]:
+        """
+        Return (decoded, content_size) for a live entry with decoded JSON
+        attached, or None. The decoded object is shared, not copied.
+        """
+        with self._lock:
+            entry = self._live_entry(cache_key)
+            if entry is None or entry[4] is _NOT_DECODED:
+                return None
+            return entry[4], len(entry[2])
+
+    def put(self, cache_key: str, expires_at: int, status_code: int,
+            content: bytes, headers: Dict[str, str]) -> None:
+        """
+        Insert or replace an entry, evicting least recently used entries until
+        the payload budget is respected. Payloads larger than the whole budget
+        are not cached.
+        """
+        size = len(content)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if cache_key in self._entries:
+                self._remove(cache_key)
+
+            self._make_room(size)
+            self._entries[cache_key] = [expires_at, status_code, content, headers, _NOT_DECODED, size]
+            self.current_bytes += size
+
+    def set_decoded(self, cache_key: str, content: bytes, decoded: Any) -> None:
+        """
+        Attach the decoded JSON of content to its entry. Ignored if the entry
+        is gone or now holds a different payload.
+        """
+        extra = len(content) * _DECODED_SIZE_FACTOR
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None or entry[2] is not content or entry[4] is not _NOT_DECODED:
+                return
+            if entry[5] + extra > self.max_bytes:
+                return
+
+            # Keep this entry out of the eviction sweep
+            self._entries.move_to_end(cache_key)
+            self._make_room(extra, keep=cache_key)
+            entry[4] = decoded
+            entry[5] += extra
+            self.current_bytes += extra
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _live_entry(self, cache_key: str) -> Optional[List[Any]]:
+        # Caller must hold the lock
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+
+        if int(datetime.now().timestamp()) >= entry[0]:
+            self._remove(cache_key)
+            return None
+
+        self._entries.move_to_end(cache_key)
+        return entry
+
+    def _make_room(self, size: int, keep: Optional[str] = None) -> None:
+        # Caller must hold the lock
+        while self._entries and self.current_bytes + size > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            if oldest_key == keep:
+                break
+            self._remove(oldest_key)
+
+    def _remove(self, cache_key: str) -> None:
+        # Caller must hold the lock
+        entry = self._entries.pop(cache_key)
+        self.current_bytes -= entry[5]
+
+
+# Module-level so it survives across invocations of a warm Lambda container
+memory_cache = _MemoryCache(_MEMORY_CACHE_MAX_BYTES)
+
+
+def _local_get(cache_key: str) -> Optional[Tuple[str, Tuple[int, bytes, Dict[str, str]]]]:
+    """
+    Look a key up in the container-local tiers: process memory, then the /tmp
+    disk cache (promoting disk hits to memory).
+
+    Returns:
+        Tuple of (tier, (status_code, content, headers)), or None on a miss
+    """
+    memory_hit = memory_cache.get(cache_key)
+    if memory_hit is not None:
+        return 'memory', memory_hit
+
+    disk_hit = disk_cache.get(cache_key)
+    if disk_hit is not None:
+        memory_cache.put(cache_key, *disk_hit)
+        return 'disk', disk_hit[1:]
+
+    return None
+
+
+def local_response(cache_key: str, url: str, memory_only: bool = False) -> Optional[requests.Response]:
+    """
+    Serve a request from the container-local tiers (see _local_get), or from
+    process memory alone if memory_only.
+
+    Returns:
+        requests.Response object, or None on a miss
+    """
+    if memory_only:
+        memory_hit = memory_cache.get(cache_key)
+        local_hit = ('memory', memory_hit) if memory_hit is not None else None
+    else:
+        local_hit = _local_get(cache_key)
+    if local_hit is None:
+        return None
+
+    tier, entry = local_hit
+    print(f"{tier.capitalize()} cache hit for URL: {url}")
+    stats.record_hit(endpoint_family(url), tier, cache_key, len(entry[1]))
+    return build_response(*entry)
+
+
+def _local_put(cache_key: str, expires_at: int, status_code: int,
+               content: bytes, headers: Dict[str, str]) -> None:
+    """Store an entry in process memory and the /tmp disk cache."""
+    memory_cache.put(cache_key, expires_at, status_code, content, headers)
+    disk_cache.put(cache_key, expires_at, status_code, content, headers)
+
+
+class _InFlightCall:
+    """State shared between the leader and followers of one coalesced call."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into a single execution.
+
+    The first caller for a key (the leader) runs the function; callers arriving
+    while it is in flight wait for it and receive the same result or exception.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _InFlightCall] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn once for all concurrent callers of key.
+
+        Returns:
+            Tuple of (result, shared) where shared is True for followers
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+
+# Upstream requests in flight in this process, keyed by cache key
+_single_flight = _SingleFlight()
+
+# Background refreshes for stale-while-revalidate, and the cache keys they
+# cover; the condition is notified as each one finishes
+_revalidation_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cache-revalidate')
+_revalidating: set = set()
+_revalidating_done = threading.Condition()
+
+
+class _WriteBehindQueue:
+    """
+    Queue of pending cache writes, flushed in batches by a background thread.
+
+    Each entry is a table, the items for one response and, optionally, the
+    refresh lease to release once the items are written (so other containers
+    waiting on the lease see the entry as soon as it lands).
+    """
+
+    def __init__(self, batch_window_seconds: float):
+        self.batch_window_seconds = batch_window_seconds
+        self._pending: List[Tuple[Any, List[Dict[str, Any]], Optional[Tuple[str, str]]]] = []
+        self._flushing = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def put(self, table, items: List[Dict[str, Any]], lease: Optional[Tuple[str, str]] = None) -> None:
+        """Queue items for writing, with an optional (cache_key, lease_owner) to release after."""
+        with self._condition:
+            self._pending.append((table, items, lease))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='cache-write-behind', daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def drain(self, timeout: float) -> bool:
+        """
+        Wait until every queued write has been flushed.
+
+        Returns:
+            True if the queue drained, False if the timeout expired first
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._flushing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+
+            # Let concurrent writers add to this batch
+            time.sleep(self.batch_window_seconds)
+
+            with self._condition:
+                entries, self._pending = self._pending, []
+                self._flushing += 1
+
+            try:
+                self._flush(entries)
+            finally:
+                with self._condition:
+                    self._flushing -= 1
+                    self._condition.notify_all()
+
+    @staticmethod
+    def _flush(entries: List[Tuple[Any, List[Dict[str, Any]], Optional[Tuple[str, str]]]]) -> None:
+        """Write queued items per table, then release their leases. Never raises."""
+        by_table: Dict[str, Tuple[Any, List[Dict[str, Any]]]] = {}
+        for table, items, _ in entries:
+            by_table.setdefault(table.name, (table, []))[1].extend(items)
+
+        for table_name, (table, items) in by_table.items():
+            try:
+                _write_cache_items(table, items)
+                print(f"Cached {len(items)} items in {table_name}")
+            except Exception as e:
+                print(f"Warning: Failed to write to cache: {str(e)}")
+                # Continue even if cache write fails
+
+        for table, _, lease in entries:
+            if lease is not None:
+                _release_lease(table, *lease)
+
+
+# Cache writes pending for the background writer
+_write_queue = _WriteBehindQueue(_WRITE_BATCH_WINDOW_SECONDS)
+
+
+def _flush_cache_writes(timeout: float = _WRITE_DRAIN_SECONDS) -> bool:
+    """
+    Block until background revalidations have finished and queued cache writes
+    are in DynamoDB, then write out any recorded snapshot responses (see
+    lib.snapshot). Call from the Lambda handler before returning: a frozen
+    container cannot flush, and a revalidation frozen mid-flight keeps its
+    refresh lease until the lease expires. Never raises.
+
+    Args:
+        timeout: Maximum seconds to wait, for both
+
+    Returns:
+        True if every revalidation finished and every write was flushed,
+        False on timeout
+    """
+    try:
+        deadline = time.monotonic() + timeout
+        # Revalidations queue their writes as they finish, so wait for them first
+        settled = _wait_for_revalidations(timeout)
+        if not settled:
+            print(f"Warning: Cache revalidations still running after {timeout}s")
+
+        drained = _write_queue.drain(max(0.0, deadline - time.monotonic()))
+        if not drained:
+            print(f"Warning: Cache writes still pending after {timeout}s")
+
+        # Responses recorded in API_CACHE_MODE=record
+        snapshot.flush()
+        return settled and drained
+    except Exception as e:
+        print(f"Warning: Failed to flush cache writes: {str(e)}")
+        return False
+
+
+def _wait_for_revalidations(timeout: float) -> bool:
+    """
+    Wait until no background revalidation is running.
+
+    Returns:
+        True if none is running, False if the timeout expired first
+    """
+    deadline = time.monotonic() + timeout
+    with _revalidating_done:
+        while _revalidating:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _revalidating_done.wait(remaining)
+    return True
+
+
+# Scripts run outside Lambda exit instead of freezing; flush on the way out
+atexit.register(_flush_cache_writes)
+
+
+def build_response(status_code: int, content: bytes, headers: Dict[str, str]) -> requests.Response:
+    """
+    Create a requests.Response object from cached data.
+
+    Args:
+        status_code: HTTP status code
+        content: Raw response body
+        headers: Response headers
+
+    Returns:
+        requests.Response object
+    """
+    cached_response = requests.Response()
+    cached_response.status_code = int(status_code)
+    cached_response._content = content
+    cached_response.headers.update(headers)
+    return cached_response
+
+
+def make_cache_key(url: str, headers: Dict[str, str], projection: Optional[Projection] = None) -> str:
+    """
+    Generate a canonical cache key from the fields that identify a request.
+
+    The URL is normalized (lower-case scheme and host, sorted query parameters,
+    no fragment) and credential headers such as x-rapidapi-key are excluded.
+    Projected requests are cached separately from the full response.
+
+    Args:
+        url: The full URL to request
+        headers: Request headers dictionary
+        projection: Fields the cached response is reduced to, if any
+
+    Returns:
+        MD5 hex digest identifying the request
+    """
+    parts = urlsplit(url)
+    canonical_url = urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path or '/',
+        urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True))),
+        ''
+    ))
+    identifying_headers = sorted(
+        (name.lower(), value) for name, value in headers.items()
+        if name.lower() not in _KEY_EXCLUDED_HEADERS
+    )
+
+    cache_key_content = 'GET ' + canonical_url + json.dumps(identifying_headers)
+    if projection:
+        cache_key_content += ' PROJECT ' + json_projection.projection_key(projection)
+    return hashlib.md5(cache_key_content.encode()).hexdigest()
+
+
+def endpoint_family(url: str) -> str:
+    """
+    Return the endpoint family of a URL (e.g. 'manufacturers', 'articles').
+    """
+    path = urlsplit(url).path
+    for family, marker, _ in _ENDPOINT_POLICIES:
+        if marker in path:
+            return family
+    return _DEFAULT_ENDPOINT_FAMILY
+
+
+def resolve_ttl_hours(url: str, cache_ttl_hours: Optional[float]) -> float:
+    """
+    TTL for a URL: the explicit cache_ttl_hours if given, otherwise the
+    endpoint family's policy.
+    """
+    if cache_ttl_hours is not None:
+        return cache_ttl_hours
+
+    path = urlsplit(url).path
+    for _, marker, ttl_hours in _ENDPOINT_POLICIES:
+        if marker in path:
+            return ttl_hours
+    return _DEFAULT_TTL_HOURS
+
+
+def _read_cached_item(cache_key: str, cached_item: Dict[str, Any], url: str) -> Optional[requests.Response]:
+    """
+    Turn a DynamoDB cache item into a response if it has not expired,
+    promoting it to the container-local tiers with the same expiry.
+
+    Args:
+        cache_key: Cache key of the item
+        cached_item: Item as returned by DynamoDB
+        url: Requested URL (for logging)
+
+    Returns:
+        requests.Response object, or None if the item has expired or its
+        chunks are missing
+    """
+    # Check if cache entry is still valid (manual TTL check)
+    current_time = int(datetime.now().timestamp())
+    if current_time >= cached_item.get('ttl', 0):
+        print(f"Cache expired for URL: {url}")
+        stats.record_expiration(endpoint_family(url))
+        return None
+
+    decoded = _decode_cached_item(cached_item)
+    if decoded is None:
+        # Chunks not written yet (or lost): treat as a miss
+        print(f"Cache entry incomplete for URL: {url}")
+        return None
+    status_code, content, cached_headers = decoded
+
+    print(f"Cache hit for URL: {url}")
+    stats.record_hit(endpoint_family(url), 'dynamodb', cache_key, len(content))
+
+    # Promote to the container-local tiers with the same expiry
+    _local_put(cache_key, int(cached_item['ttl']), status_code, content, cached_headers)
+
+    return build_response(status_code, content, cached_headers)
+
+
+def cached_item_response(cache_key: str, cached_item: Dict[str, Any], url: str, headers: Dict[str, str],
+                         cache_ttl_hours: float, stale_while_revalidate: bool,
+                         projection: Optional[Projection] = None) -> Optional[requests.Response]:
+    """
+    Serve a request from its DynamoDB cache item: the item itself if it has
+    not expired, otherwise, with stale_while_revalidate, the expired copy
+    while the entry is refreshed in the background.
+
+    Returns:
+        requests.Response object, or None if the item cannot be served
+    """
+    cached_response = _read_cached_item(cache_key, cached_item, url)
+    if cached_response is not None or not stale_while_revalidate:
+        return cached_response
+
+    stale = _decode_cached_item(cached_item)
+    if stale is None:
+        return None
+
+    print(f"Serving stale cache entry and revalidating in background for URL: {url}")
+    stats.record_hit(endpoint_family(url), 'stale', cache_key, len(stale[1]))
+    _schedule_revalidation(url, headers, cache_key, cache_ttl_hours, cached_item, projection)
+    return build_response(*stale)
+
+
+def _binary_value(attribute: Any) -> bytes:
+    """
+    Return the raw bytes of a DynamoDB binary attribute (boto3 wraps them in Binary).
+    """
+    return attribute.value if hasattr(attribute, 'value') else bytes(attribute)
+
+
+def _chunk_key(cache_key: str, index: int) -> str:
+    """Cache table key of one chunk of an oversized payload."""
+    return f"{cache_key}#chunk{index}"
+
+
+def _decode_cached_item(cached_item: Dict[str, Any]) -> Optional[Tuple[int, bytes, Dict[str, str]]]:
+    """
+    Extract (status_code, content, headers) from a DynamoDB cache item.
+
+    Handles compressed single-item bodies, compressed bodies split across chunk
+    items, and legacy items that stored the body as a plain string.
+
+    Returns:
+        Tuple of (status_code, content, headers), or None if a chunked body
+        could not be reassembled (missing or mismatched chunks)
+    """
+    status_code = int(cached_item['status_code'])
+    cached_headers = dict(cached_item.get('headers', {}))
+
+    if 'content' in cached_item:
+        # Legacy plain-text item
+        return status_code, cached_item['content'].encode('utf-8'), cached_headers
+
+    if 'body' in cached_item:
+        compressed = _binary_value(cached_item['body'])
+    else:
+        compressed = _read_chunks(cached_item)
+        if compressed is None:
+            return None
+
+    return status_code, zlib.decompress(compressed), cached_headers
+
+
+def _read_chunks(cached_item: Dict[str, Any]) -> Optional[bytes]:
+    """
+    Fetch and join the chunks of an oversized payload.
+
+    Returns:
+        Compressed body, or None if any chunk is missing or belongs to a
+        different write of the entry
+    """
+    table_name = os.environ.get('API_CACHE_TABLE')
+    chunk_count = int(cached_item['chunks'])
+    chunk_keys = [_chunk_key(cached_item['cacheKey'], i) for i in range(chunk_count)]
+
+    try:
+        chunk_items = batch_get_cached_items(table_name, chunk_keys)
+    except Exception as e:
+        print(f"Warning: Failed to read cache chunks: {str(e)}")
+        return None
+
+    parts = []
+    for key in chunk_keys:
+        chunk = chunk_items.get(key)
+        if chunk is None or chunk.get('chunkVersion') != cached_item.get('chunkVersion'):
+            return None
+        parts.append(_binary_value(chunk['body']))
+
+    return b''.join(parts)
+
+
+def _build_cache_item(cache_key: str, url: str, response: requests.Response, cache_ttl_hours: float) -> List[Dict[str, Any]]:
+    """
+    Build the DynamoDB items for a fresh response and add it to the container-local tiers.
+
+    The body is stored zlib-compressed as binary. If the compressed body does not
+    fit in one item, it is split into chunk items that share a version tag with
+    the primary item, so readers never stitch together chunks from different writes.
+    Chunks come before the primary item, so a write cut short leaves orphaned
+    chunks (which expire) rather than a primary item pointing at missing ones.
+
+    Args:
+        cache_key: Cache key of the request
+        url: Requested URL
+        response: Fresh upstream response
+        cache_ttl_hours: Time-to-live for the entry in hours
+
+    Returns:
+        List of items ready for put_item / batch writes, primary item last
+    """
+    # Calculate TTL as Unix timestamp
+    ttl_timestamp = int((datetime.now() + timedelta(hours=cache_ttl_hours)).timestamp())
+
+    cached_headers = {name: response.headers[name] for name in _CACHED_HEADERS if name in response.headers}
+
+    _local_put(cache_key, ttl_timestamp, response.status_code, response.content, cached_headers)
+
+    compressed = zlib.compress(response.content, _COMPRESSION_LEVEL)
+
+    item = {
+        'cacheKey': cache_key,
+        'url': url,
+        'timestamp': datetime.now().isoformat(),
+        'status_code': response.status_code,
+        'headers': cached_headers,
+        'encoding': 'zlib',
+        'size': len(response.content),
+        'negative': _is_negative(response),
+        'ttl': ttl_timestamp
+    }
+
+    if len(compressed) <= _CHUNK_BYTES:
+        item['body'] = compressed
+        return [item]
+
+    chunk_version = uuid.uuid4().hex
+    chunk_items = [
+        {
+            'cacheKey': _chunk_key(cache_key, index),
+            'body': compressed[start:start + _CHUNK_BYTES],
+            'chunkVersion': chunk_version,
+            'ttl': ttl_timestamp
+        }
+        for index, start in enumerate(range(0, len(compressed), _CHUNK_BYTES))
+    ]
+    item['chunks'] = len(chunk_items)
+    item['chunkVersion'] = chunk_version
+
+    return chunk_items + [item]
+
+
+def _write_cache_items(table, items: List[Dict[str, Any]]) -> None:
+    """
+    Write cache items, using a single put_item when possible and the batch
+    writer (which groups puts by 25 and resends unprocessed items) otherwise.
+    """
+    if len(items) == 1:
+        table.put_item(Item=items[0])
+        return
+
+    with table.batch_writer(overwrite_by_pkeys=['cacheKey']) as batch:
+        for item in items:
+            batch.put_item(Item=item)
+
+
+def _fetch_upstream(url: str, headers: Dict[str, str],
+                    projection: Optional[Projection] = None) -> requests.Response:
+    """
+    Make a fresh API request over the shared transport (connection pool,
+    timeouts, retries and circuit breaking). Successful responses are reduced
+    to the projection, if given, so every cache tier stores the projected form.
+
+    Raises:
+        requests.RequestException: If API request fails
+    """
+    print(f"Making REST API request: {url}")
+    start = time.perf_counter()
+    response = transport.get(url, headers)
+    stats.record_upstream(endpoint_family(url), (time.perf_counter() - start) * 1000, len(response.content))
+
+    # 404s are returned (not raised) so they can be negative-cached;
+    # callers raise them through raise_for_negative
+    if response.status_code != HTTPStatus.NOT_FOUND:
+        response.raise_for_status()
+
+    if projection and response.status_code == HTTPStatus.OK:
+        project_response(response, projection, url)
+    return response
+
+
+def project_response(response: requests.Response, projection: Projection, url: str) -> None:
+    """
+    Replace a response body with its projection. Bodies that cannot be
+    projected (not a JSON object) are left whole.
     """
-    Make a cached API request using DynamoDB for cache storage.
+    try:
+        response._content = json_projection.apply(response.content, projection)
+        response.headers['Content-Type'] = 'application/json'
+        response.headers.pop('Content-Length', None)
+    except ValueError as e:
+        print(f"Warning: Could not project response for URL {url}: {str(e)}")
+
+
+def _is_negative(response: requests.Response) -> bool:
+    """
+    Whether a response is a negative result: a 404, or an empty 'articles' list.
+    """
+    if response.status_code == HTTPStatus.NOT_FOUND:
+        return True
+
+    # Empty article lists are tiny; skip parsing anything that could be large
+    content = response.content
+    if len(content) > 1024 or b'"articles"' not in content:
+        return False
+
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return False
+    return isinstance(data, dict) and not data.get('articles')
+
+
+def _is_cacheable(response: requests.Response) -> bool:
+    """Cache successful responses (2xx status codes) and 404s."""
+    return 200 <= response.status_code < 300 or response.status_code == HTTPStatus.NOT_FOUND
+
+
+def _cache_ttl_hours_for(response: requests.Response, cache_ttl_hours: float) -> float:
+    """TTL for a response: the short negative TTL for negative results."""
+    if _is_negative(response):
+        return _NEGATIVE_TTL_MINUTES / 60
+    return cache_ttl_hours
+
+
+def raise_for_negative(response: requests.Response, url: str) -> None:
+    """
+    Raise requests.HTTPError for a (possibly cached) error response, matching
+    what the upstream call would have raised.
+    """
+    if response.status_code >= 400:
+        response.url = url
+        if not response.reason:
+            response.reason = HTTPStatus(response.status_code).phrase
+        response.raise_for_status()
+
+
+def store_response(table, cache_key: str, url: str, response: requests.Response,
+                    cache_ttl_hours: float, lease_owner: Optional[str] = None) -> None:
+    """
+    Cache a fresh upstream response in process memory and queue its DynamoDB
+    write, releasing the refresh lease once the write lands. Cache write
+    failures are logged and ignored.
+    """
+    lease = (cache_key, lease_owner) if lease_owner is not None else None
+
+    items = None
+    if _is_cacheable(response):
+        items = _build_cache_item(cache_key, url, response, _cache_ttl_hours_for(response, cache_ttl_hours))
+
+    if table is None:
+        return
+
+    if items is None:
+        if lease is not None:
+            _release_lease(table, *lease)
+        return
+
+    # Written by the background writer, off the request path
+    _write_queue.put(table, items, lease)
+    print(f"Queued cache write for URL: {url} (expires: {datetime.fromtimestamp(items[-1]['ttl']).isoformat()})")
+
+
+def _lease_key(cache_key: str) -> str:
+    """Cache table key of the refresh lease for a cache key."""
+    return f"lease#{cache_key}"
+
+
+def _acquire_lease(table, cache_key: str) -> Optional[str]:
+    """
+    Try to take the refresh lease for a cache key with a conditional write,
+    so only one container refreshes an entry from upstream at a time.
 
     Args:
+        table: DynamoDB cache table
+        cache_key: Cache key to refresh
+
+    Returns:
+        Lease owner token if this caller may refresh the entry, or None if
+        another container holds a live lease. If the lease cannot be written
+        for any other reason the caller proceeds as the holder.
+    """
+    now = int(datetime.now().timestamp())
+    owner = uuid.uuid4().hex
+
+    try:
+        table.put_item(
+            Item={
+                'cacheKey': _lease_key(cache_key),
+                'leaseOwner': owner,
+                'leaseExpires': now + _LEASE_SECONDS,
+                'ttl': now + _LEASE_SECONDS
+            },
+            ConditionExpression='attribute_not_exists(cacheKey) OR leaseExpires < :now',
+            ExpressionAttributeValues={':now': now}
+        )
+        return owner
+
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+            return None
+        print(f"Warning: Failed to acquire refresh lease: {str(e)}")
+        return owner
+
+    except Exception as e:
+        print(f"Warning: Failed to acquire refresh lease: {str(e)}")
+        return owner
+
+
+def _release_lease(table, cache_key: str, owner: str) -> None:
+    """
+    Release a refresh lease if this caller still owns it.
+    """
+    try:
+        table.delete_item(
+            Key={'cacheKey': _lease_key(cache_key)},
+            ConditionExpression='leaseOwner = :owner',
+            ExpressionAttributeValues={':owner': owner}
+        )
+    except Exception:
+        # Lease already expired/taken over, or release failed; it expires on its own
+        pass
+
+
+def _wait_for_refresh(table, cache_key: str, url: str) -> Optional[requests.Response]:
+    """
+    Poll the cache table until another container's refresh of a key lands.
+
+    Returns:
+        requests.Response object, or None if nothing arrived in time
+    """
+    deadline = time.monotonic() + _LEASE_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(_LEASE_POLL_SECONDS)
+        try:
+            cache_response = table.get_item(Key={'cacheKey': cache_key}, ConsistentRead=True)
+        except Exception as e:
+            print(f"Warning: Failed to read from cache: {str(e)}")
+            return None
+
+        if 'Item' in cache_response:
+            current_time = int(datetime.now().timestamp())
+            if current_time < cache_response['Item'].get('ttl', 0):
+                return _read_cached_item(cache_key, cache_response['Item'], url)
+
+    return None
+
+
+def _refresh_entry(table, cache_key: str, url: str, headers: Dict[str, str],
+                   stale_item: Optional[Dict[str, Any]],
+                   projection: Optional[Projection] = None) -> Tuple[requests.Response, Optional[str], bool]:
+    """
+    Refresh a missing or expired entry. Expired entries are guarded by the
+    cross-container lease; cold misses go straight upstream, since the lease
+    would cost two DynamoDB writes on the request path for every new URL.
+
+    The lease holder fetches from upstream. Other containers serve the stale
+    copy if it can be decoded, otherwise wait briefly for the holder's write
+    and only fetch themselves if it does not arrive.
+
+    Args:
+        table: DynamoDB cache table, or None if the cache is unavailable
+        cache_key: Cache key of the request
         url: The full URL to request
         headers: Request headers dictionary
-        cache_ttl_hours: Time-to-live for cache entries in hours (default: 24)
+        stale_item: Expired DynamoDB item for the key, if any
+        projection: Fields to reduce a fresh response to, if any
+
+    Returns:
+        Tuple of (response, lease_owner, is_fresh). The caller must pass fresh
+        responses and lease_owner to store_response, which releases the lease.
+
+    Raises:
+        requests.RequestException: If API request fails
+    """
+    if table is None or stale_item is None:
+        return _fetch_upstream(url, headers, projection), None, True
+
+    lease_owner = _acquire_lease(table, cache_key)
+    if lease_owner is None:
+        stale = _decode_cached_item(stale_item)
+        if stale is not None:
+            print(f"Serving stale cache entry while another container refreshes URL: {url}")
+            stats.record_hit(endpoint_family(url), 'stale', cache_key, len(stale[1]))
+            return build_response(*stale), None, False
+
+        refreshed = _wait_for_refresh(table, cache_key, url)
+        if refreshed is not None:
+            return refreshed, None, False
+
+        print(f"Timed out waiting for refresh lease holder, fetching URL: {url}")
+
+    try:
+        return _fetch_upstream(url, headers, projection), lease_owner, True
+    except Exception:
+        if lease_owner is not None:
+            _release_lease(table, cache_key, lease_owner)
+        raise
+
+
+def _cached_api_request(url: str, headers: Dict[str, str], cache_ttl_hours: Optional[float] = None,
+                        stale_while_revalidate: bool = False,
+                        projection: Optional[Projection] = None) -> requests.Response:
+    """
+    Make a cached API request using an in-process LRU tier backed by DynamoDB.
+
+    Lookups check process memory first, then DynamoDB, then the upstream API.
+    Both tiers share the same expiry timestamp. Concurrent callers for the same
+    cache key share a single DynamoDB read and upstream request. 404s and empty
+    article lists are negative-cached for API_CACHE_NEGATIVE_TTL_MINUTES.
+
+    With API_CACHE_MODE=replay, responses come only from the api_cache.json-format
+    snapshot at API_CACHE_SNAPSHOT; with API_CACHE_MODE=record, every response
+    is also added to that snapshot, written out by _flush_cache_writes.
+
+    Args:
+        url: The full URL to request
+        headers: Request headers dictionary
+        cache_ttl_hours: Time-to-live for cache entries in hours (default: the
+            endpoint family's policy in _ENDPOINT_POLICIES)
+        stale_while_revalidate: If True, an expired DynamoDB entry is returned
+            immediately and refreshed in the background
+        projection: Top-level keys and fields to keep (see lib.projection);
+            the response and its cache entries hold only those
 
     Returns:
         requests.Response object (either from cache or fresh API call)
 
+    Raises:
+        requests.RequestException: If API request fails (including cached 404s)
+    """
+    snapshot_mode = snapshot.mode()
+    if snapshot_mode == snapshot.REPLAY:
+        response = snapshot.replay(url)
+        stats.record_hit(endpoint_family(url), 'snapshot', None, len(response.content))
+        raise_for_negative(response, url)
+        if projection and response.status_code == HTTPStatus.OK:
+            project_response(response, projection, url)
+        return response
+
+    cache_key = make_cache_key(url, headers, projection)
+    cache_ttl_hours = resolve_ttl_hours(url, cache_ttl_hours)
+    response = _resolve_request(url, headers, cache_key, cache_ttl_hours, stale_while_revalidate, projection)
+
+    if snapshot_mode == snapshot.RECORD:
+        snapshot.record(cache_key, url, response)
+
+    raise_for_negative(response, url)
+    return response
+
+
+def _resolve_request(url: str, headers: Dict[str, str], cache_key: str,
+                     cache_ttl_hours: float, stale_while_revalidate: bool,
+                     projection: Optional[Projection] = None) -> requests.Response:
+    """
+    Resolve a request from process memory, or through the coalesced
+    DynamoDB/upstream path.
+
     Raises:
         requests.RequestException: If API request fails
     """
-    # Generate cache key from URL and sorted headers
-    cache_key_content = url + json.dumps(sorted(headers.items()))
-    cache_key = hashlib.md5(cache_key_content.encode()).hexdigest()
+    # Check the container-local tiers before going over the network
+    local_hit = local_response(cache_key, url)
+    if local_hit is not None:
+        return local_hit
+
+    response, shared = _single_flight.do(
+        cache_key,
+        lambda: _load_through_cache(url, headers, cache_key, cache_ttl_hours, stale_while_revalidate, projection)
+    )
+
+    if shared:
+        # Give each waiter its own Response object
+        print(f"Coalesced request for URL: {url}")
+        stats.record_coalesced(endpoint_family(url), len(response.content))
+        return build_response(response.status_code, response.content, dict(response.headers))
+
+    return response
+
 
+def _load_through_cache(url: str, headers: Dict[str, str], cache_key: str,
+                        cache_ttl_hours: float, stale_while_revalidate: bool,
+                        projection: Optional[Projection] = None) -> requests.Response:
+    """
+    Resolve a request from DynamoDB or, on a miss, from the upstream API,
+    writing fresh responses back to the cache.
+
+    Raises:
+        requests.RequestException: If API request fails
+    """
     # Get DynamoDB table name from environment
     table_name = os.environ.get('API_CACHE_TABLE')
     if not table_name:
         print("Warning: API_CACHE_TABLE not set, skipping cache")
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response
+        stats.record_miss(endpoint_family(url))
+        return _fetch_upstream(url, headers, projection)
 
+    table = None
+    stale_item = None
     try:
         # Initialize DynamoDB client
         dynamodb = boto3.resource('dynamodb')
@@ -44,22 +1090,11 @@ def _cached_api_request(url: str, headers: Dict[str, str], cache_ttl_hours: int
             cache_response = table.get_item(Key={'cacheKey': cache_key})
 
             if 'Item' in cache_response:
-                cached_item = cache_response['Item']
-
-                # Check if cache entry is still valid (manual TTL check)
-                current_time = int(datetime.now().timestamp())
-                if current_time < cached_item.get('ttl', 0):
-                    print(f"Cache hit for URL: {url}")
-
-                    # Create a Response object from cached data
-                    cached_response = requests.Response()
-                    cached_response.status_code = int(cached_item['status_code'])
-                    cached_response._content = cached_item['content'].encode('utf-8')
-                    cached_response.headers.update(cached_item['headers'])
-
+                cached_response = cached_item_response(cache_key, cache_response['Item'], url, headers,
+                                                       cache_ttl_hours, stale_while_revalidate, projection)
+                if cached_response is not None:
                     return cached_response
-                else:
-                    print(f"Cache expired for URL: {url}")
+                stale_item = cache_response['Item']
 
         except Exception as e:
             print(f"Warning: Failed to read from cache: {str(e)}")
@@ -69,33 +1104,369 @@ def _cached_api_request(url: str, headers: Dict[str, str], cache_ttl_hours: int
         print(f"Warning: DynamoDB cache initialization failed: {str(e)}")
         # Continue without cache if DynamoDB setup fails
 
-    # Make fresh API request
-    print(f"Making REST API request: {url}")
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
+    stats.record_miss(endpoint_family(url))
+
+    # Make fresh API request (or reuse another container's refresh)
+    response, lease_owner, is_fresh = _refresh_entry(table, cache_key, url, headers, stale_item, projection)
+    if is_fresh:
+        store_response(table, cache_key, url, response, cache_ttl_hours, lease_owner)
 
-    # Only cache successful responses (2xx status codes)
-    if 200 <= response.status_code < 300:
+    return response
+
+
+def _schedule_revalidation(url: str, headers: Dict[str, str], cache_key: str,
+                           cache_ttl_hours: float, stale_item: Dict[str, Any],
+                           projection: Optional[Projection] = None) -> None:
+    """
+    Refresh an expired entry on the background executor, at most once at a
+    time per cache key in this process.
+    """
+    with _revalidating_done:
+        if cache_key in _revalidating:
+            return
+        _revalidating.add(cache_key)
+
+    _revalidation_executor.submit(_revalidate, url, headers, cache_key, cache_ttl_hours, stale_item, projection)
+
+
+def _revalidate(url: str, headers: Dict[str, str], cache_key: str,
+                cache_ttl_hours: float, stale_item: Dict[str, Any],
+                projection: Optional[Projection] = None) -> None:
+    """
+    Background refresh of an expired entry, guarded by the cross-container lease.
+    If another container holds the lease, it is left to that container.
+    """
+    try:
+        table = boto3.resource('dynamodb').Table(os.environ.get('API_CACHE_TABLE'))
+        response, lease_owner, is_fresh = _refresh_entry(table, cache_key, url, headers, stale_item, projection)
+        if is_fresh:
+            store_response(table, cache_key, url, response, cache_ttl_hours, lease_owner)
+
+    except Exception as e:
+        print(f"Warning: Background revalidation failed for URL {url}: {str(e)}")
+
+    finally:
+        with _revalidating_done:
+            _revalidating.discard(cache_key)
+            _revalidating_done.notify_all()
+
+
+# DynamoDB limits per BatchGetItem / BatchWriteItem call
+_BATCH_GET_LIMIT = 100
+_BATCH_GET_MAX_ATTEMPTS = 5
+
+
+def batch_get_cached_items(table_name: str, cache_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Read many cache items with DynamoDB BatchGetItem, retrying unprocessed keys.
+
+    Args:
+        table_name: DynamoDB cache table name
+        cache_keys: Cache keys to read
+
+    Returns:
+        Dictionary mapping cache key to item for every key found in the table
+    """
+    dynamodb = boto3.resource('dynamodb')
+    items = {}
+
+    for start in range(0, len(cache_keys), _BATCH_GET_LIMIT):
+        request_items = {
+            table_name: {'Keys': [{'cacheKey': key} for key in cache_keys[start:start + _BATCH_GET_LIMIT]]}
+        }
+
+        for attempt in range(_BATCH_GET_MAX_ATTEMPTS):
+            batch_response = dynamodb.batch_get_item(RequestItems=request_items)
+            for item in batch_response.get('Responses', {}).get(table_name, []):
+                items[item['cacheKey']] = item
+
+            request_items = batch_response.get('UnprocessedKeys') or {}
+            if not request_items:
+                break
+
+            # Back off briefly before retrying throttled keys
+            time.sleep(0.05 * 2 ** attempt)
+
+    return items
+
+
+def _cached_api_requests(urls: List[str], headers: Dict[str, str], cache_ttl_hours: Optional[float] = None,
+                         max_workers: int = 10, raise_on_error: bool = True,
+                         stale_while_revalidate: bool = False,
+                         projection: Optional[Projection] = None) -> Dict[str, requests.Response]:
+    """
+    Make many cached API requests sharing the same headers.
+
+    All cache keys are resolved with one BatchGetItem round trip (per 100 keys)
+    after the in-process and disk tiers, only the misses are fetched from upstream
+    (concurrently, coalesced with any identical in-flight request), and the
+    fresh responses are queued for the background writer, which writes them
+    back with BatchWriteItem.
+
+    Args:
+        urls: Full URLs to request (duplicates are requested once)
+        headers: Request headers dictionary shared by every URL
+        cache_ttl_hours: Time-to-live for cache entries in hours (default: the
+            endpoint family's policy in _ENDPOINT_POLICIES)
+        max_workers: Maximum concurrent upstream requests for cache misses
+        raise_on_error: If True, re-raise the first upstream failure; if False,
+            failed URLs (including cached 404s) are logged and left out of the result
+        stale_while_revalidate: If True, expired DynamoDB entries are returned
+            immediately and refreshed in the background
+        projection: Top-level keys and fields to keep from every response
+            (see lib.projection)
+
+    Returns:
+        Dictionary mapping each URL to its requests.Response object
+
+    Raises:
+        requests.RequestException: If an API request fails and raise_on_error is True
+    """
+    unique_urls = list(dict.fromkeys(urls))
+
+    if snapshot.mode() == snapshot.REPLAY:
+        responses = {}
+        for url in unique_urls:
+            try:
+                responses[url] = snapshot.replay(url)
+                stats.record_hit(endpoint_family(url), 'snapshot', None, len(responses[url].content))
+                if projection and responses[url].status_code == HTTPStatus.OK:
+                    project_response(responses[url], projection, url)
+            except snapshot.SnapshotMissError as e:
+                if raise_on_error:
+                    raise
+                print(f"Warning: {str(e)}")
+        return _drop_negative_responses(responses, raise_on_error)
+
+    url_to_key = {url: make_cache_key(url, headers, projection) for url in unique_urls}
+    url_to_ttl = {url: resolve_ttl_hours(url, cache_ttl_hours) for url in unique_urls}
+    responses = {}
+
+    # Check the container-local tiers before going over the network
+    pending_urls = []
+    for url in unique_urls:
+        local_hit = local_response(url_to_key[url], url)
+        if local_hit is not None:
+            responses[url] = local_hit
+        else:
+            pending_urls.append(url)
+
+    table_name = os.environ.get('API_CACHE_TABLE')
+    if not table_name:
+        print("Warning: API_CACHE_TABLE not set, skipping cache")
+
+    stale_items = {}
+    if table_name and pending_urls:
         try:
-            # Calculate TTL as Unix timestamp
-            ttl_timestamp = int((datetime.now() + timedelta(hours=cache_ttl_hours)).timestamp())
-
-            # Store in DynamoDB
-            table.put_item(
-                Item={
-                    'cacheKey': cache_key,
-                    'url': url,
-                    'timestamp': datetime.now().isoformat(),
-                    'status_code': response.status_code,
-                    'content': response.text,
-                    'headers': dict(response.headers),
-                    'ttl': ttl_timestamp
-                }
-            )
-            print(f"Cached response for URL: {url} (expires: {datetime.fromtimestamp(ttl_timestamp).isoformat()})")
+            cached_items = batch_get_cached_items(table_name, [url_to_key[url] for url in pending_urls])
+
+            missed_urls = []
+            for url in pending_urls:
+                cached_item = cached_items.get(url_to_key[url])
+                cached_response = None
+                if cached_item is not None:
+                    cached_response = cached_item_response(url_to_key[url], cached_item, url, headers,
+                                                           url_to_ttl[url], stale_while_revalidate, projection)
+
+                if cached_response is not None:
+                    responses[url] = cached_response
+                    continue
+
+                missed_urls.append(url)
+                if cached_item is not None:
+                    stale_items[url] = cached_item
+            pending_urls = missed_urls
 
         except Exception as e:
-            print(f"Warning: Failed to write to cache: {str(e)}")
-            # Continue even if cache write fails
+            print(f"Warning: Failed to batch read from cache: {str(e)}")
+            # Continue to make API requests if cache read fails
 
-    return response
+    if not pending_urls:
+        return finish_batch(responses, url_to_key, raise_on_error)
+
+    for url in pending_urls:
+        stats.record_miss(endpoint_family(url))
+
+    table = None
+    if table_name:
+        try:
+            table = boto3.resource('dynamodb').Table(table_name)
+        except Exception as e:
+            print(f"Warning: DynamoDB cache initialization failed: {str(e)}")
+
+    # Fetch only the misses from upstream; the background writer batches
+    # their cache writes together
+    first_error = None
+
+    def refresh(url: str) -> requests.Response:
+        cache_key = url_to_key[url]
+        response, lease_owner, is_fresh = _refresh_entry(table, cache_key, url, headers,
+                                                         stale_items.get(url), projection)
+        if is_fresh:
+            store_response(table, cache_key, url, response, url_to_ttl[url], lease_owner)
+        return response
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending_urls)))) as executor:
+        future_to_url = {
+            executor.submit(_single_flight.do, url_to_key[url], lambda url=url: refresh(url)): url
+            for url in pending_urls
+        }
+
+        for future in as_completed(future_to_url):
+            url = future_to_url[future]
+            try:
+                response, shared = future.result()
+            except requests.RequestException as e:
+                print(f"Warning: REST API request failed for URL {url}: {str(e)}")
+                if first_error is None:
+                    first_error = e
+                continue
+
+            if shared:
+                # Another caller fetched (and caches) this URL; take a private copy
+                stats.record_coalesced(endpoint_family(url), len(response.content))
+                responses[url] = build_response(response.status_code, response.content,
+                                                 dict(response.headers))
+                continue
+
+            responses[url] = response
+
+    if first_error is not None and raise_on_error:
+        raise first_error
+
+    return finish_batch(responses, url_to_key, raise_on_error)
+
+
+def finish_batch(responses: Dict[str, requests.Response], url_to_key: Dict[str, str],
+                  raise_on_error: bool) -> Dict[str, requests.Response]:
+    """
+    Record a batch result to the snapshot when recording, then raise or drop
+    its error responses.
+    """
+    if snapshot.mode() == snapshot.RECORD:
+        for url, response in responses.items():
+            snapshot.record(url_to_key[url], url, response)
+
+    return _drop_negative_responses(responses, raise_on_error)
+
+
+def _drop_negative_responses(responses: Dict[str, requests.Response],
+                             raise_on_error: bool) -> Dict[str, requests.Response]:
+    """
+    Raise or drop error responses (cached or fresh 404s) from a batch result.
+
+    Raises:
+        requests.HTTPError: For the first error response if raise_on_error is True
+    """
+    for url in [url for url, response in responses.items() if response.status_code >= 400]:
+        try:
+            raise_for_negative(responses[url], url)
+        except requests.HTTPError as e:
+            if raise_on_error:
+                raise
+            print(f"Warning: REST API request failed for URL {url}: {str(e)}")
+            del responses[url]
+
+    return responses
+
+
+def _cached_api_data(url: str, headers: Dict[str, str], cache_ttl_hours: Optional[float] = None,
+                     stale_while_revalidate: bool = False, projection: Optional[Projection] = None) -> Any:
+    """
+    Like _cached_api_request, but return the decoded JSON body.
+
+    The decoded object is kept with the in-process cache entry, so repeat hits
+    in a warm container skip building a Response and parsing JSON. The object
+    is shared between callers and must not be modified.
+
+    Args:
+        url: The full URL to request
+        headers: Request headers dictionary
+        cache_ttl_hours: Time-to-live for cache entries in hours (default: the
+            endpoint family's policy in _ENDPOINT_POLICIES)
+        stale_while_revalidate: If True, an expired DynamoDB entry is returned
+            immediately and refreshed in the background
+        projection: Top-level keys and fields to keep (see lib.projection)
+
+    Returns:
+        Decoded JSON response body
+
+    Raises:
+        requests.RequestException: If API request fails (including cached 404s)
+        ValueError: If the response body is not valid JSON
+    """
+    if snapshot.mode() == snapshot.REPLAY:
+        return _cached_api_request(url, headers, cache_ttl_hours, stale_while_revalidate, projection).json()
+
+    cache_key = make_cache_key(url, headers, projection)
+    decoded_hit = memory_cache.get_decoded(cache_key)
+    if decoded_hit is not None:
+        stats.record_hit(endpoint_family(url), 'memory', cache_key, decoded_hit[1])
+        return decoded_hit[0]
+
+    response = _cached_api_request(url, headers, cache_ttl_hours, stale_while_revalidate, projection)
+    data = response.json()
+    memory_cache.set_decoded(cache_key, response.content, data)
+    return data
+
+
+def _cached_api_data_many(urls: List[str], headers: Dict[str, str], cache_ttl_hours: Optional[float] = None,
+                          max_workers: int = 10, raise_on_error: bool = True,
+                          stale_while_revalidate: bool = False,
+                          projection: Optional[Projection] = None) -> Dict[str, Any]:
+    """
+    Like _cached_api_requests, but return decoded JSON bodies, serving repeat
+    hits from the decoded objects kept in process memory (shared, must not be
+    modified).
+
+    Args:
+        urls: Full URLs to request (duplicates are requested once)
+        headers: Request headers dictionary shared by every URL
+        cache_ttl_hours: Time-to-live for cache entries in hours (default: the
+            endpoint family's policy in _ENDPOINT_POLICIES)
+        max_workers: Maximum concurrent upstream requests for cache misses
+        raise_on_error: If True, re-raise the first failure; if False, failed
+            URLs (including invalid JSON) are logged and left out of the result
+        stale_while_revalidate: If True, expired DynamoDB entries are returned
+            immediately and refreshed in the background
+        projection: Top-level keys and fields to keep from every response
+
+    Returns:
+        Dictionary mapping each URL to its decoded JSON body
+
+    Raises:
+        requests.RequestException: If an API request fails and raise_on_error is True
+        ValueError: If a response is not valid JSON and raise_on_error is True
+    """
+    unique_urls = list(dict.fromkeys(urls))
+    results = {}
+    url_to_key = {}
+
+    if snapshot.mode() != snapshot.REPLAY:
+        for url in unique_urls:
+            url_to_key[url] = make_cache_key(url, headers, projection)
+            decoded_hit = memory_cache.get_decoded(url_to_key[url])
+            if decoded_hit is not None:
+                stats.record_hit(endpoint_family(url), 'memory', url_to_key[url], decoded_hit[1])
+                results[url] = decoded_hit[0]
+
+    pending_urls = [url for url in unique_urls if url not in results]
+    if not pending_urls:
+        return results
+
+    responses = _cached_api_requests(pending_urls, headers, cache_ttl_hours, max_workers=max_workers,
+                                     raise_on_error=raise_on_error,
+                                     stale_while_revalidate=stale_while_revalidate, projection=projection)
+    for url, response in responses.items():
+        try:
+            results[url] = response.json()
+        except ValueError as e:
+            if raise_on_error:
+                raise
+            print(f"Warning: Invalid JSON response for URL {url}: {str(e)}")
+            continue
+
+        if url in url_to_key:
+            memory_cache.set_decoded(url_to_key[url], response.content, results[url])
+
+    return results
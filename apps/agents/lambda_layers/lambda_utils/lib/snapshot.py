@@ -0,0 +1,170 @@
+import atexit
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+import requests
+
+
+# API_CACHE_MODE selects how restapi uses the snapshot file at API_CACHE_SNAPSHOT:
+#   record - behave normally and also add every response to the snapshot, which
+#            is written out by flush (on handler exit and at process exit)
+#   replay - serve only from the snapshot (no network, no DynamoDB)
+RECORD = 'record'
+REPLAY = 'replay'
+
+# A relative API_CACHE_SNAPSHOT is resolved against API_CACHE_SNAPSHOT_DIR,
+# else the Lambda code directory, else the working directory at import
+_DEFAULT_SNAPSHOT_PATH = 'api_cache.json'
+_START_DIR = os.getcwd()
+
+
+class SnapshotMissError(requests.RequestException):
+    """Raised in replay mode when a URL is not in the snapshot."""
+    pass
+
+
+class _Snapshot:
+    """
+    API responses in the api_cache.json format: a JSON object keyed by cache key,
+    each entry holding url, timestamp, status_code and content.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._key_by_url: Dict[str, str] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self._entries = json.load(f)
+            self._key_by_url = {entry['url']: key for key, entry in self._entries.items()}
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the entry for a URL, or None."""
+        key = self._key_by_url.get(url)
+        return self._entries.get(key) if key is not None else None
+
+    def add(self, cache_key: str, url: str, status_code: int, content: str) -> None:
+        """Add or replace an entry in memory; save writes it out."""
+        entry = {
+            'url': url,
+            'timestamp': datetime.now().isoformat(),
+            'status_code': status_code,
+            'content': content
+        }
+
+        with self._lock:
+            # Replay looks entries up by URL, so keep one entry per URL
+            stale_key = self._key_by_url.get(url)
+            if stale_key is not None and stale_key != cache_key:
+                del self._entries[stale_key]
+
+            self._entries[cache_key] = entry
+            self._key_by_url[url] = cache_key
+            self._dirty = True
+
+    def save(self) -> None:
+        """Rewrite the file atomically if entries were added since the last save."""
+        with self._lock:
+            if not self._dirty:
+                return
+
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+_snapshots: Dict[str, _Snapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def mode() -> str:
+    """
+    Return the configured snapshot mode ('record', 'replay' or '' for off).
+    Read on every call so benchmarks can switch modes at runtime.
+    """
+    return os.environ.get('API_CACHE_MODE', '').strip().lower()
+
+
+def _snapshot_path() -> str:
+    """Return the configured snapshot file as an absolute path."""
+    directory = (os.environ.get('API_CACHE_SNAPSHOT_DIR') or os.environ.get('LAMBDA_TASK_ROOT')
+                 or _START_DIR)
+    return os.path.join(directory, os.environ.get('API_CACHE_SNAPSHOT', _DEFAULT_SNAPSHOT_PATH))
+
+
+def _get_snapshot() -> _Snapshot:
+    """Load the configured snapshot file once per path."""
+    path = _snapshot_path()
+
+    with _snapshots_lock:
+        if path not in _snapshots:
+            _snapshots[path] = _Snapshot(path)
+        return _snapshots[path]
+
+
+def replay(url: str) -> requests.Response:
+    """
+    Serve a response for a URL from the snapshot.
+
+    Args:
+        url: The full URL to request
+
+    Returns:
+        requests.Response object built from the snapshot entry
+
+    Raises:
+        SnapshotMissError: If the URL is not in the snapshot
+    """
+    entry = _get_snapshot().get(url)
+    if entry is None:
+        raise SnapshotMissError(f"URL not found in API snapshot: {url}")
+
+    print(f"Snapshot replay for URL: {url}")
+    response = requests.Response()
+    response.status_code = int(entry['status_code'])
+    response._content = entry['content'].encode('utf-8')
+    response.headers['Content-Type'] = 'application/json'
+    response.url = url
+    return response
+
+
+def record(cache_key: str, url: str, response: requests.Response) -> None:
+    """
+    Add a response to the snapshot, written out by flush. Failures are
+    logged and ignored.
+
+    Args:
+        cache_key: Cache key of the request
+        url: The full URL requested
+        response: Response returned to the caller
+    """
+    try:
+        _get_snapshot().add(cache_key, url, response.status_code, response.text)
+    except Exception as e:
+        print(f"Warning: Failed to record API snapshot: {str(e)}")
+
+
+def flush() -> None:
+    """
+    Write recorded responses to their snapshot files. Called by
+    restapi._flush_cache_writes and at process exit. Failures are logged
+    and ignored.
+    """
+    with _snapshots_lock:
+        snapshots = list(_snapshots.values())
+
+    for recorded in snapshots:
+        try:
+            recorded.save()
+        except Exception as e:
+            print(f"Warning: Failed to write API snapshot {recorded.path}: {str(e)}")
+
+
+atexit.register(flush)
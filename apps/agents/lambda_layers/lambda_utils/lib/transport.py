@@ -0,0 +1,196 @@
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Keep-alive pool per host, sized to the 10-worker thread pools used by the agents
+_POOL_SIZE = int(os.environ.get('API_HTTP_POOL_SIZE', '10'))
+
+# (connect, read) timeouts in seconds
+_TIMEOUT = (float(os.environ.get('API_HTTP_CONNECT_TIMEOUT', '3.05')),
+            float(os.environ.get('API_HTTP_READ_TIMEOUT', '20')))
+
+# Retries for throttling and server errors, with full-jitter exponential backoff
+_MAX_RETRIES = int(os.environ.get('API_HTTP_MAX_RETRIES', '3'))
+_BACKOFF_BASE_SECONDS = 0.5
+_BACKOFF_MAX_SECONDS = 8.0
+_RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Circuit breaker: open after this many consecutive failed requests to a host,
+# and let a single trial request through after the cooldown
+_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('API_HTTP_BREAKER_THRESHOLD', '5'))
+_BREAKER_COOLDOWN_SECONDS = float(os.environ.get('API_HTTP_BREAKER_COOLDOWN_SECONDS', '30'))
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised without making a request when a host's circuit breaker is open."""
+    pass
+
+
+class _CircuitBreaker:
+    """
+    Per-host consecutive-failure circuit breaker.
+
+    Closed: requests flow. Open: requests fail fast until the cooldown ends.
+    Half-open: one trial request is allowed; success closes the breaker,
+    failure re-opens it for another cooldown.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._trial_in_flight: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def before_request(self, host: str) -> bool:
+        """
+        Returns:
+            True if the request is the half-open trial, which the caller must
+            end with end_trial once it finishes, however it finishes
+
+        Raises:
+            CircuitOpenError: If the host's breaker is open
+        """
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return False
+
+            if time.monotonic() - opened_at < self.cooldown_seconds or self._trial_in_flight.get(host):
+                raise CircuitOpenError(f"Circuit breaker open for host {host}, failing fast")
+
+            # Half-open: let this request through as the trial
+            self._trial_in_flight[host] = True
+            return True
+
+    def end_trial(self, host: str) -> None:
+        """Let the next request after the cooldown be a trial, even if this one recorded nothing."""
+        with self._lock:
+            self._trial_in_flight.pop(host, None)
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+            self._trial_in_flight.pop(host, None)
+
+    def record_failure(self, host: str) -> None:
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            self._trial_in_flight.pop(host, None)
+
+            if failures >= self.failure_threshold or host in self._opened_at:
+                if host not in self._opened_at:
+                    print(f"Warning: Opening circuit breaker for host {host} after {failures} failures")
+                self._opened_at[host] = time.monotonic()
+
+
+_breaker = _CircuitBreaker(_BREAKER_FAILURE_THRESHOLD, _BREAKER_COOLDOWN_SECONDS)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Return the process-wide requests.Session with a keep-alive connection pool,
+    so warm containers and worker threads reuse TLS connections.
+
+    Returns:
+        Shared requests.Session object
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=_POOL_SIZE, pool_maxsize=_POOL_SIZE, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+
+    return _session
+
+
+def _backoff_seconds(attempt: int, response: Optional[requests.Response]) -> float:
+    """
+    Delay before the next retry: Retry-After if the server sent a numeric one,
+    otherwise full-jitter exponential backoff.
+    """
+    if response is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(float(retry_after), _BACKOFF_MAX_SECONDS)
+
+    return random.uniform(0, min(_BACKOFF_MAX_SECONDS, _BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def get(url: str, headers: Dict[str, str],
+        timeout: Optional[Tuple[float, float]] = None) -> requests.Response:
+    """
+    GET a URL over the shared connection pool with timeouts, jittered retries
+    on 429/5xx and connection errors, and per-host circuit breaking.
+
+    The final response is returned as-is (callers decide whether to
+    raise_for_status); only transport failures raise.
+
+    Args:
+        url: The full URL to request
+        headers: Request headers dictionary
+        timeout: Optional (connect, read) timeout override in seconds
+
+    Returns:
+        requests.Response object
+
+    Raises:
+        CircuitOpenError: If the host's circuit breaker is open
+        requests.RequestException: If the request fails after all retries
+    """
+    host = urlparse(url).netloc
+    session = get_session()
+
+    for attempt in range(_MAX_RETRIES + 1):
+        trial = _breaker.before_request(host)
+
+        response = None
+        try:
+            response = session.get(url, headers=headers, timeout=timeout or _TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            _breaker.record_failure(host)
+            if attempt == _MAX_RETRIES:
+                raise
+            print(f"Warning: Request to {host} failed ({type(e).__name__}), retrying")
+        except Exception:
+            # Not worth retrying (bad encoding, redirect loop), but still a failed request
+            _breaker.record_failure(host)
+            raise
+        else:
+            if response.status_code not in _RETRY_STATUS_CODES:
+                _breaker.record_success(host)
+                return response
+
+            # Throttling means the host is up; only server errors count against it
+            if response.status_code >= 500:
+                _breaker.record_failure(host)
+            else:
+                _breaker.record_success(host)
+
+            if attempt == _MAX_RETRIES:
+                return response
+            print(f"Warning: Request to {host} returned {response.status_code}, retrying")
+        finally:
+            if trial:
+                _breaker.end_trial(host)
+
+        time.sleep(_backoff_seconds(attempt, response))
+
+    return response
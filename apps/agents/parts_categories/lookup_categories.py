@@ -1,11 +1,18 @@
+import bisect
 import json
 import os
-from typing import Dict, Any, Optional
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from lib.secrets import load_secrets
-from lib.restapi import _cached_api_request
+from lib import cache_stats
+from lib.restapi import _cached_api_data, _cached_api_data_many, _flush_cache_writes
+from lib import memo
 from lib import openai_client
+from lib import registry
 
 
 # Constants
@@ -13,41 +20,122 @@ RAPIDAPI_HOST = "auto-parts-catalog.p.rapidapi.com"
 TYPE_ID = 1  # Passenger cars
 LANG_ID = 4  # English
 
-
-def _load_prompts() -> Dict[str, str]:
+# Fields kept from the vehicle responses (see lib.projection); the cache stores
+# only these, so changing them starts a fresh set of cache entries
+VEHICLE_LIST_PROJECTION = {
+    "countModelTypes": None,
+    "modelTypes": ["vehicleId", "modelName"]
+}
+VEHICLE_DETAILS_PROJECTION = {
+    "vehicleTypeDetails": [
+        "manufacturerName", "modelType", "typeEngineName",
+        "constructionIntervalStart", "constructionIntervalEnd",
+        "powerKw", "powerPs", "capacityLt", "capacityTech", "numberOfCylinders",
+        "fuelType", "engineType", "driveType"
+    ]
+}
+
+
+# Loaded once per container through lib.registry
+_PROMPTS_PATH = os.path.join(os.path.dirname(__file__), 'prompts.json')
+_COUNTRY_ID_LOOKUP_PATH = os.path.join(os.path.dirname(__file__), 'countryId_lookup.json')
+_MANUFACTURER_ALIASES_PATH = os.path.join(os.path.dirname(__file__), 'manufacturer_aliases.json')
+
+# Minimum token overlap (shared / all distinct tokens) for a fuzzy manufacturer match
+MANUFACTURER_MIN_SIMILARITY = 0.5
+
+# Model selection: the top-scored model is taken without an LLM call when its
+# score and lead over the runner-up reach these; otherwise only the top
+# MODEL_LLM_TOP_K candidates are sent to the LLM
+MODEL_CONFIDENT_SCORE = 2.0
+MODEL_CONFIDENT_MARGIN = 0.5
+MODEL_LLM_TOP_K = int(os.environ.get('MODEL_LLM_TOP_K', '8'))
+
+# Vehicle selection: same idea over engine specs; when not confident, the
+# candidates within VEHICLE_LLM_SCORE_WINDOW of the best are sent to the LLM:
+# every one tied for the best, plus the others up to VEHICLE_LLM_TOP_K in total
+VEHICLE_CONFIDENT_SCORE = 2.0
+VEHICLE_CONFIDENT_MARGIN = 1.0
+VEHICLE_LLM_SCORE_WINDOW = 1.0
+VEHICLE_LLM_TOP_K = int(os.environ.get('VEHICLE_LLM_TOP_K', '10'))
+
+# While the LLM picks a model, list-vehicles-id and the first wave of vehicle
+# details are prefetched for the top SPECULATIVE_MODELS candidates; while it
+# picks a vehicle, the leading candidate's categories are prefetched
+SPECULATIVE_PREFETCH = os.environ.get('SPECULATIVE_PREFETCH', 'true').lower() in ('1', 'true', 'yes')
+SPECULATIVE_MODELS = int(os.environ.get('SPECULATIVE_MODELS', '2'))
+
+# Optional VIN fields given to the LLM (with model, series, trim and year) to
+# select a model, and to select a vehicle; the latter also cover every spec
+# the vehicle filters and scoring read
+_MODEL_PROMPT_FIELDS = (
+    "body_class", "doors", "steering_location", "number_of_seats", "number_of_seat_rows",
+    "transmission_style", "transmission_speeds", "drive_type", "engine_number_of_cylinders",
+    "fuel_type_-_primary"
+)
+_VEHICLE_PROMPT_FIELDS = (
+    "displacement_(l)", "engine_number_of_cylinders", "fuel_type_-_primary", "fuel_type_-_secondary",
+    "electrification_level", "engine_power_(kw)", "engine_configuration", "engine_model",
+    "transmission_style", "transmission_speeds", "drive_type", "body_class", "doors"
+)
+
+# Every VIN field the model and vehicle selection stages read (matching,
+# filters, scoring and prompts), besides make and plant country
+_MODEL_STAGE_FIELDS = ("model", "series", "trim", "model_year") + _MODEL_PROMPT_FIELDS
+_VEHICLE_STAGE_FIELDS = ("model", "series", "trim", "model_year") + _VEHICLE_PROMPT_FIELDS
+
+# Resolutions of VIN attributes to catalog IDs are memoized in the API cache
+# table, keyed by every field that can change them; bump the version when the
+# selection logic changes their outcome
+_RESOLUTION_MEMO = 'vehicle-resolution'
+_RESOLUTION_VERSION = 2
+_RESOLUTION_KEY_FIELDS = ("make", "plant_country") + tuple(dict.fromkeys(_MODEL_STAGE_FIELDS + _VEHICLE_STAGE_FIELDS))
+VEHICLE_RESOLUTION_TTL_HOURS = float(os.environ.get('VEHICLE_RESOLUTION_TTL_HOURS', str(24 * 30)))
+
+# Serve requests with the asyncio implementation in lookup_categories_async
+ASYNC_WORKFLOW = os.environ.get('PARTS_CATEGORIES_ASYNC', 'false').lower() in ('1', 'true', 'yes')
+
+# Vehicle details are fetched in waves of this size, in likely-match order,
+# with the next wave prefetched while the current one is filtered
+VEHICLE_DETAILS_WAVE_SIZE = int(os.environ.get('VEHICLE_DETAILS_WAVE_SIZE', '10'))
+
+# Words in VIN model fields that never appear in catalog model names ("5-Series", "C-Class")
+_GENERIC_MODEL_WORDS = {"SERIES", "CLASS"}
+
+# Body styles named in catalog model names and in the VIN body_class field
+_BODY_STYLES = {
+    "TOURING": "wagon", "ESTATE": "wagon", "WAGON": "wagon", "AVANT": "wagon", "VARIANT": "wagon",
+    "KOMBI": "wagon", "SPORTSWAGON": "wagon", "SHOOTING": "wagon",
+    "CONVERTIBLE": "convertible", "CABRIOLET": "convertible", "CABRIO": "convertible",
+    "ROADSTER": "convertible", "SPIDER": "convertible", "SPYDER": "convertible",
+    "COUPE": "coupe",
+    "VAN": "van", "BUS": "van",
+    "HATCHBACK": "hatchback", "COMPACT": "hatchback", "SPORTBACK": "hatchback", "LIFTBACK": "hatchback",
+    "PICKUP": "pickup", "PLATFORM": "pickup",
+    "SUV": "suv",
+    "SEDAN": "sedan", "SALOON": "sedan", "LIMOUSINE": "sedan"
+}
+
+
+def _api_headers() -> Dict[str, str]:
     """
-    Load prompts from prompts.json file.
-
-    Returns:
-        Dictionary containing prompt templates
-
-    Raises:
-        RuntimeError: If prompts file cannot be loaded
+    Build the RapidAPI request headers.
     """
-    try:
-        prompts_path = os.path.join(os.path.dirname(__file__), 'prompts.json')
-        with open(prompts_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        raise RuntimeError(f"Failed to load prompts: {str(e)}")
+    return {
+        "x-rapidapi-host": RAPIDAPI_HOST,
+        "x-rapidapi-key": os.environ.get('RAPIDAPI_KEY', '')
+    }
 
 
-def _load_country_id_lookup() -> Dict[str, Any]:
+def _check_required_fields(vehicle_info: Dict[str, Any]) -> None:
     """
-    Load country ID lookup from JSON file.
-
-    Returns:
-        Dictionary with lowercase country names as keys
-
     Raises:
-        RuntimeError: If country lookup file cannot be loaded
+        ValueError: If a field main needs is missing from vehicle_info
     """
-    try:
-        lookup_path = os.path.join(os.path.dirname(__file__), 'countryId_lookup.json')
-        with open(lookup_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        raise RuntimeError(f"Failed to load country ID lookup: {str(e)}")
+    required_fields = ["make", "model", "model_year", "plant_country"]
+    for field in required_fields:
+        if field not in vehicle_info or not vehicle_info[field]:
+            raise ValueError(f"Required field '{field}' is missing from vehicle_info")
 
 
 def _get_country_filter_id(plant_country: str) -> int:
@@ -63,7 +151,7 @@ def _get_country_filter_id(plant_country: str) -> int:
     Raises:
         ValueError: If country not found in lookup
     """
-    country_lookup = _load_country_id_lookup()
+    country_lookup = registry.load_json(_COUNTRY_ID_LOOKUP_PATH)
     country_key = plant_country.lower()
 
     if country_key not in country_lookup:
@@ -72,9 +160,117 @@ def _get_country_filter_id(plant_country: str) -> int:
     return country_lookup[country_key]["id"]
 
 
+def _normalize_make(name: str) -> str:
+    """
+    Normalize a manufacturer name for matching: accents stripped, upper case,
+    punctuation as spaces (e.g. "Citroën" -> "CITROEN", "ROLLS-ROYCE" -> "ROLLS ROYCE").
+    """
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c if c.isalnum() else " " for c in name if not unicodedata.combining(c))
+    return " ".join(name.upper().split())
+
+
+class _ManufacturerIndex:
+    """
+    Hash index over the manufacturer list. Names are matched on their
+    normalized form with spaces removed ("LAND ROVER" == "LANDROVER"), then
+    through manufacturer_aliases.json, then by token overlap with the part of
+    the name before any parenthesized regional suffix ("BMW (BRILLIANCE)").
+    """
+
+    def __init__(self, manufacturers: List[Dict[str, Any]], aliases: Dict[str, str]):
+        self._by_key: Dict[str, Dict[str, Any]] = {}
+        self._by_token: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._tokens: Dict[int, frozenset] = {}
+        self._aliases = {_normalize_make(alias).replace(" ", ""): _normalize_make(name).replace(" ", "")
+                         for alias, name in aliases.items()}
+
+        for manufacturer in manufacturers:
+            name = manufacturer["manufacturerName"]
+            self._by_key.setdefault(_normalize_make(name).replace(" ", ""), manufacturer)
+
+            tokens = frozenset(_normalize_make(name.split("(")[0]).split())
+            self._tokens[manufacturer["manufacturerId"]] = tokens
+            for token in tokens:
+                self._by_token[token].append(manufacturer)
+
+    def lookup(self, make: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Find the manufacturer for a make.
+
+        Returns:
+            (manufacturer, how it matched: "exact", "alias" or "fuzzy"), or (None, "")
+        """
+        normalized = _normalize_make(make)
+        key = normalized.replace(" ", "")
+
+        if key in self._by_key:
+            return self._by_key[key], "exact"
+        if self._aliases.get(key) in self._by_key:
+            return self._by_key[self._aliases[key]], "alias"
+
+        tokens = frozenset(normalized.split())
+        best, best_rank = None, None
+        for manufacturer in {id(m): m for t in tokens for m in self._by_token.get(t, [])}.values():
+            candidate = self._tokens[manufacturer["manufacturerId"]]
+            similarity = len(tokens & candidate) / len(tokens | candidate)
+            if similarity < MANUFACTURER_MIN_SIMILARITY:
+                continue
+            # Prefer overlap, then the main brand over regional variants, then the shorter name
+            name = manufacturer["manufacturerName"]
+            rank = (-similarity, "(" in name, len(name), name)
+            if best_rank is None or rank < best_rank:
+                best, best_rank = manufacturer, rank
+
+        return best, "fuzzy" if best is not None else ""
+
+
+# (manufacturers response, its index); rebuilt only when the cached response changes
+_manufacturer_index: Optional[Tuple[Any, _ManufacturerIndex]] = None
+
+
+def _get_manufacturer_index(data: Dict[str, Any]) -> _ManufacturerIndex:
+    """Return the index for a manufacturers response, building it once per response."""
+    global _manufacturer_index
+    cached = _manufacturer_index
+    if cached is not None and cached[0] is data:
+        return cached[1]
+
+    index = _ManufacturerIndex(data["manufacturers"], registry.load_json(_MANUFACTURER_ALIASES_PATH))
+    _manufacturer_index = (data, index)
+    return index
+
+
+def _manufacturers_url(type_id: int) -> str:
+    """
+    Build the manufacturers list URL for a vehicle type.
+    """
+    return f"https://{RAPIDAPI_HOST}/manufacturers/list/type-id/{type_id}"
+
+
+def _match_manufacturer(data: Dict[str, Any], make: str) -> int:
+    """
+    Match a make against a manufacturers response.
+
+    Returns:
+        Manufacturer ID
+
+    Raises:
+        ValueError: If manufacturer not found
+    """
+    print(f"Found {data['countManufactures']} manufacturers")
+
+    manufacturer, match = _get_manufacturer_index(data).lookup(make)
+    if manufacturer is None:
+        raise ValueError(f"Manufacturer '{make}' not found in API response")
+
+    print(f"Matched manufacturer ({match}): {manufacturer['manufacturerName']} (ID: {manufacturer['manufacturerId']})")
+    return manufacturer["manufacturerId"]
+
+
 def _get_manufacturer_id(make: str, type_id: int, country_filter_id: int) -> int:
     """
-    Get manufacturer ID by matching manufacturer name.
+    Get manufacturer ID by matching manufacturer name (normalized, alias or fuzzy).
 
     Args:
         make: Manufacturer name from VIN (e.g., "MERCEDES-BENZ")
@@ -89,24 +285,8 @@ def _get_manufacturer_id(make: str, type_id: int, country_filter_id: int) -> int
         ValueError: If manufacturer not found
     """
     try:
-        url = f"https://{RAPIDAPI_HOST}/manufacturers/list/type-id/{type_id}"
-        headers = {
-            "x-rapidapi-host": RAPIDAPI_HOST,
-            "x-rapidapi-key": os.environ.get('RAPIDAPI_KEY', '')
-        }
-
-        response = _cached_api_request(url, headers)
-        data = response.json()
-        print(f"Found {data['countManufactures']} manufacturers")
-
-        # Match manufacturer name (case-insensitive)
-        make_upper = make.upper()
-        for manufacturer in data["manufacturers"]:
-            if manufacturer["manufacturerName"].upper() == make_upper:
-                print(f"Matched manufacturer: {manufacturer['manufacturerName']} (ID: {manufacturer['manufacturerId']})")
-                return manufacturer["manufacturerId"]
-
-        raise ValueError(f"Manufacturer '{make}' not found in API response")
+        data = _cached_api_data(_manufacturers_url(type_id), _api_headers(), stale_while_revalidate=True)
+        return _match_manufacturer(data, make)
 
     except requests.RequestException as e:
         raise RuntimeError(f"Manufacturer API request failed: {str(e)}")
@@ -114,6 +294,305 @@ def _get_manufacturer_id(make: str, type_id: int, country_filter_id: int) -> int
         raise RuntimeError(f"Manufacturer lookup failed: {str(e)}")
 
 
+class _ModelYearIndex:
+    """
+    Models of one manufacturer indexed by production years. The sorted year
+    boundaries split the timeline into segments with a fixed set of models
+    alive in each, so a year query is one bisect. Years are parsed once, when
+    the index is built; models with malformed years are left out.
+    """
+
+    def __init__(self, models: List[Dict[str, Any]]):
+        spans = []
+        for model in models:
+            try:
+                # Extract year from date string using partition (e.g., "2016-09-01" -> "2016")
+                year_from = int(model["modelYearFrom"].partition("-")[0])
+                # modelYearTo is None while the model is still in production
+                year_to = int(model["modelYearTo"].partition("-")[0]) if model["modelYearTo"] is not None else None
+                spans.append((year_from, year_to, model))
+            except (ValueError, KeyError, AttributeError, TypeError) as e:
+                # Skip entries with malformed data (e.g., invalid date format, missing fields)
+                print(f"Skipping model due to error: {e} - Model: {model.get('modelName', 'Unknown')}")
+
+        self.models = models
+        # Segment i covers [_bounds[i], _bounds[i + 1]); models keep their API order
+        self._bounds = sorted({year_from for year_from, _, _ in spans} |
+                              {year_to + 1 for _, year_to, _ in spans if year_to is not None})
+        self._alive = [tuple(model for year_from, year_to, model in spans
+                             if year_from <= bound and (year_to is None or bound <= year_to))
+                       for bound in self._bounds]
+
+    def alive_in(self, model_year: int) -> List[Dict[str, Any]]:
+        """Return the models whose production years include model_year."""
+        i = bisect.bisect_right(self._bounds, model_year) - 1
+        return list(self._alive[i]) if i >= 0 else []
+
+
+# Year indexes keyed by models URL, each kept with the response it was built
+# from and rebuilt when the cached response changes; least recently used dropped
+_MODEL_INDEX_MAX_ENTRIES = 256
+_model_year_indexes: "OrderedDict[str, Tuple[Any, _ModelYearIndex]]" = OrderedDict()
+_model_year_indexes_lock = threading.Lock()
+
+
+def _get_models(type_id: int, lang_id: int, country_filter_id: int, manufacturer_id: int,
+                stale_while_revalidate: bool = True) -> _ModelYearIndex:
+    """
+    Get all models of a manufacturer, indexed by production years.
+
+    Args:
+        type_id: Vehicle type ID
+        lang_id: Language ID
+        country_filter_id: Country filter ID
+        manufacturer_id: Manufacturer ID
+        stale_while_revalidate: Serve expired cache entries while refreshing them
+
+    Returns:
+        Year index over the model dictionaries (modelId, modelName, modelYearFrom, modelYearTo)
+
+    Raises:
+        requests.RequestException: If API call fails
+    """
+    url = _models_url(type_id, lang_id, country_filter_id, manufacturer_id)
+    data = _cached_api_data(url, _api_headers(), stale_while_revalidate=stale_while_revalidate)
+    return _index_models(url, data)
+
+
+def _models_url(type_id: int, lang_id: int, country_filter_id: int, manufacturer_id: int) -> str:
+    """
+    Build the models list URL for a manufacturer.
+    """
+    return (f"https://{RAPIDAPI_HOST}/models/list/type-id/{type_id}/"
+            f"manufacturer-id/{manufacturer_id}/lang-id/{lang_id}/"
+            f"country-filter-id/{country_filter_id}")
+
+
+def _index_models(url: str, data: Dict[str, Any]) -> _ModelYearIndex:
+    """
+    Return the year index for a models response, building it once per response.
+    """
+    print(f"Found {data['countModels']} models")
+
+    with _model_year_indexes_lock:
+        cached = _model_year_indexes.get(url)
+        if cached is not None and cached[0] is data:
+            _model_year_indexes.move_to_end(url)
+            return cached[1]
+
+    index = _ModelYearIndex(data["models"])
+    with _model_year_indexes_lock:
+        _model_year_indexes[url] = (data, index)
+        _model_year_indexes.move_to_end(url)
+        while len(_model_year_indexes) > _MODEL_INDEX_MAX_ENTRIES:
+            _model_year_indexes.popitem(last=False)
+    return index
+
+
+def _model_tokens(name: str) -> Tuple[List[str], set, Optional[str]]:
+    """
+    Split a catalog model name such as "5 Touring (G31)" into its family tokens
+    (["5"]), series codes in parentheses ({"G31"}) and body style ("wagon").
+    """
+    base, _, codes = name.partition("(")
+    tokens = _normalize_make(base).split()
+    family = [t for t in tokens if t not in _BODY_STYLES and t not in ("GRAN", "TURISMO", "TOURER", "ACTIVE")]
+    # The last style word wins: "Touring Van" is a van
+    styles = [_BODY_STYLES[t] for t in tokens if t in _BODY_STYLES]
+    return family, set(_normalize_make(codes).split()), styles[-1] if styles else None
+
+
+def _vin_body_style(body_class: str) -> Optional[str]:
+    """Map a VIN body_class (e.g. "Sedan/Saloon", "Sport Utility Vehicle (SUV)") to a body style."""
+    for token in _normalize_make(body_class).split():
+        if token in _BODY_STYLES:
+            return _BODY_STYLES[token]
+    return None
+
+
+def _score_model(model: Dict[str, Any], vin_tokens: List[str], vin_codes: set,
+                 body_style: Optional[str]) -> float:
+    """
+    Score how well a catalog model matches the VIN fields:
+    up to 2 for the model family, 1.5 for a series code, +/-0.5 for the body style.
+    """
+    family, codes, style = _model_tokens(model.get("modelName", ""))
+    score = 0.0
+
+    if vin_tokens and family:
+        if "".join(vin_tokens) == "".join(family):
+            score += 2.0
+        else:
+            # Per VIN token: 1 for an exact family token, 0.5 for a prefix ("530I" of "5")
+            matched = 0.0
+            for token in vin_tokens:
+                if token in family:
+                    matched += 1.0
+                elif any(token.startswith(f) or f.startswith(token) for f in family):
+                    matched += 0.5
+            score += 2.0 * matched / max(len(vin_tokens), len(family))
+
+    if codes & vin_codes:
+        score += 1.5
+
+    if body_style is not None:
+        if style == body_style or (style is None and body_style == "sedan"):
+            score += 0.5
+        elif style is not None:
+            score -= 0.5
+
+    return score
+
+
+def _rank_models(vehicle_info: Dict[str, Any], models: List[Dict[str, Any]]) -> List[Tuple[float, Dict[str, Any]]]:
+    """
+    Rank models by _score_model against the VIN model, series, trim and body class.
+
+    Returns:
+        (score, model) pairs, best first; ties keep the API order
+    """
+    vin_tokens = [t for t in _normalize_make(vehicle_info.get("model") or "").split()
+                  if t not in _GENERIC_MODEL_WORDS]
+    vin_codes = set(_normalize_make(f"{vehicle_info.get('series') or ''} {vehicle_info.get('trim') or ''}").split())
+    body_style = _vin_body_style(vehicle_info.get("body_class") or "")
+
+    scored = [(_score_model(model, vin_tokens, vin_codes, body_style), model) for model in models]
+    return sorted(scored, key=lambda pair: -pair[0])
+
+
+# Runs speculative prefetches; their results reach the caller through the API
+# cache (and single-flight, if the caller asks while one is still running)
+_speculation_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='speculative')
+
+
+def _speculate(label: str, fn, *args) -> Optional[Future]:
+    """
+    Start fn(*args) in the background when speculative prefetch is enabled.
+    Failures are logged and ignored; the main path repeats the call anyway.
+    """
+    if not SPECULATIVE_PREFETCH:
+        return None
+
+    def run():
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"Warning: Speculative prefetch of {label} failed: {str(e)}")
+
+    return _speculation_executor.submit(run)
+
+
+def _discard_speculation(futures: Dict[int, Future], keep: Optional[int]) -> None:
+    """
+    Cancel the prefetches of losing candidates (all of them if keep is None,
+    i.e. the selection failed) that have not started yet. Prefetches already
+    running cannot be interrupted and run to completion; they only warm the
+    cache, and _speculate logs their failures.
+    """
+    cancelled = [candidate for candidate, future in futures.items() if candidate != keep and future.cancel()]
+    if cancelled:
+        print(f"Cancelled speculative prefetch for {cancelled}")
+
+
+def _prefetch_model(type_id: int, model_id: int, lang_id: int, country_filter_id: int) -> None:
+    """Fetch what _get_vehicle_id needs first for a model: its vehicle list and first details wave."""
+    vehicle_ids = _get_vehicle_ids(type_id, model_id, lang_id, country_filter_id)
+    _get_vehicle_details_batch(vehicle_ids[:VEHICLE_DETAILS_WAVE_SIZE], type_id, lang_id, country_filter_id)
+
+
+def _model_candidates(vehicle_info: Dict[str, Any],
+                      models: _ModelYearIndex) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+    """
+    Shortlist a manufacturer's models for the VIN: filter them by year range,
+    then score them locally.
+
+    Returns:
+        (model ID, []) when one model is a confident match, otherwise
+        (None, the candidates to send to the LLM)
+
+    Raises:
+        ValueError: If no model matches the year
+    """
+    model_year = int(vehicle_info.get("model_year", "0"))
+
+    # Step 1: Filter models by year range
+    year_filtered = models.alive_in(model_year)
+
+    if not year_filtered:
+        raise ValueError(f"No models found for year {model_year}")
+
+    print(f"Shortlisted {len(year_filtered)} models matching year {model_year}:")
+    for model in year_filtered:
+        year_range = f"{model['modelYearFrom']} to {model['modelYearTo']}" if model['modelYearTo'] else f"{model['modelYearFrom']}+"
+        print(f"  - {model['modelName']} (ID: {model['modelId']}, Years: {year_range})")
+
+    # Step 2: Score the models locally; a confident winner skips the LLM
+    ranked = _rank_models(vehicle_info, year_filtered)
+    best_score, best_model = ranked[0]
+    runner_up = ranked[1][0] if len(ranked) > 1 else float("-inf")
+    if best_score >= MODEL_CONFIDENT_SCORE and best_score - runner_up >= MODEL_CONFIDENT_MARGIN:
+        print(f"Selected model without LLM: {best_model['modelName']} (ID: {best_model['modelId']}, "
+              f"score {best_score:.2f} vs {runner_up:.2f})")
+        return best_model["modelId"], []
+
+    # Step 3 goes to the LLM with the best candidates (all of them if nothing scored)
+    candidates = [model for _, model in ranked[:MODEL_LLM_TOP_K]] if best_score > 0 else year_filtered
+    print(f"Sending {len(candidates)} of {len(year_filtered)} models to the LLM (best score {best_score:.2f})")
+    return None, candidates
+
+
+def _select_model_prompt(vehicle_info: Dict[str, Any], candidates: List[Dict[str, Any]]) -> str:
+    """
+    Build the select_model prompt for the candidate models.
+    """
+    # Prepare shortlisted models as a formatted string
+    shortlisted_models = "\n".join([
+        f"- {model['modelName']} (ID: {model['modelId']})"
+        for model in candidates
+    ])
+
+    # Prepare vehicle info for prompt - include only available fields
+    vehicle_info_for_prompt = {
+        "model": vehicle_info.get("model", ""),
+        "series": vehicle_info.get("series", ""),
+        "trim": vehicle_info.get("trim", ""),
+        "year": int(vehicle_info.get("model_year", "0"))
+    }
+
+    # Add optional fields if available
+    for field in _MODEL_PROMPT_FIELDS:
+        if field in vehicle_info and vehicle_info[field]:
+            vehicle_info_for_prompt[field] = vehicle_info[field]
+
+    prompts = registry.load_prompts(_PROMPTS_PATH)
+    return prompts["select_model"].format(
+        vehicle_info=json.dumps(vehicle_info_for_prompt, indent=2),
+        models=shortlisted_models
+    )
+
+
+def _parse_model_choice(response_text: str, models: _ModelYearIndex) -> int:
+    """
+    Get the model ID from the select_model response.
+
+    Raises:
+        ValueError: If the response has no modelId
+    """
+    print(f"OpenAI response: {response_text}")
+
+    # Extract modelId from XML tags
+    model_id = int(openai_client._parse_xml_tag(response_text, "modelId"))
+
+    # Find the selected model for logging
+    selected_model = next((m for m in models.models if m["modelId"] == model_id), None)
+    if selected_model:
+        print(f"Selected model: {selected_model['modelName']} (ID: {model_id})")
+    else:
+        print(f"Selected model ID: {model_id}")
+
+    return model_id
+
+
 def _get_model_id(vehicle_info: Dict[str, Any], type_id: int, lang_id: int,
                   country_filter_id: int, manufacturer_id: int) -> int:
     """
@@ -134,114 +613,30 @@ def _get_model_id(vehicle_info: Dict[str, Any], type_id: int, lang_id: int,
         ValueError: If model not found
     """
     try:
-        url = (f"https://{RAPIDAPI_HOST}/models/list/type-id/{type_id}/"
-               f"manufacturer-id/{manufacturer_id}/lang-id/{lang_id}/"
-               f"country-filter-id/{country_filter_id}")
-        headers = {
-            "x-rapidapi-host": RAPIDAPI_HOST,
-            "x-rapidapi-key": os.environ.get('RAPIDAPI_KEY', '')
-        }
-
-        response = _cached_api_request(url, headers)
-        data = response.json()
-        print(f"Found {data['countModels']} models")
-
-        model_year = int(vehicle_info.get("model_year", "0"))
-
-        # Step 1: Filter models by year range
-        # Go through each model and check if input model_year is within its year range
-        year_filtered = []
-        for model in data["models"]:
-            try:
-                # Extract year from date string using partition (e.g., "2016-09-01" -> "2016")
-                year_from = int(model["modelYearFrom"].partition("-")[0])
-
-                # Handle modelYearTo - can be None (ongoing) or a date string
-                if model["modelYearTo"] is None:
-                    year_to = None
-                else:
-                    year_to = int(model["modelYearTo"].partition("-")[0])
-
-                # Check if input model_year is within this model's year range
-                # If year_to is None, the model is still in production (no end date)
-                is_within_range = False
-                if year_to is None:
-                    # Model has no end date, check if model_year >= year_from
-                    is_within_range = (model_year >= year_from)
-                else:
-                    # Model has both start and end dates, check if model_year is between them
-                    is_within_range = (year_from <= model_year <= year_to)
-
-                # Shortlist if within range, otherwise discard
-                if is_within_range:
-                    year_filtered.append(model)
+        models = _get_models(type_id, lang_id, country_filter_id, manufacturer_id)
 
-            except (ValueError, KeyError, AttributeError, TypeError) as e:
-                # Skip entries with malformed data (e.g., invalid date format, missing fields)
-                print(f"Skipping model due to error: {e} - Model: {model.get('modelName', 'Unknown')}")
-                continue
+        model_id, candidates = _model_candidates(vehicle_info, models)
+        if model_id is not None:
+            return model_id
 
-        if not year_filtered:
-            raise ValueError(f"No models found for year {model_year}")
-
-        print(f"Shortlisted {len(year_filtered)} models matching year {model_year}:")
-        for model in year_filtered:
-            year_range = f"{model['modelYearFrom']} to {model['modelYearTo']}" if model['modelYearTo'] else f"{model['modelYearFrom']}+"
-            print(f"  - {model['modelName']} (ID: {model['modelId']}, Years: {year_range})")
-
-        # Step 2: Use Bedrock to select the best matching model
-        # Prepare shortlisted models as a formatted string
-        shortlisted_models = "\n".join([
-            f"- {model['modelName']} (ID: {model['modelId']})"
-            for model in year_filtered
-        ])
-
-        # Prepare vehicle info for prompt - include only available fields
-        vehicle_info_for_prompt = {
-            "model": vehicle_info.get("model", ""),
-            "series": vehicle_info.get("series", ""),
-            "trim": vehicle_info.get("trim", ""),
-            "year": model_year
-        }
+        # Step 3: Use the LLM to select among the candidates
+        prompt = _select_model_prompt(vehicle_info, candidates)
 
-        # Add optional fields if available
-        optional_fields = [
-            "body_class",
-            "doors",
-            "steering_location",
-            "number_of_seats",
-            "number_of_seat_rows",
-            "transmission_style",
-            "transmission_speeds",
-            "drive_type",
-            "engine_number_of_cylinders",
-            "fuel_type_-_primary"
-        ]
-
-        for field in optional_fields:
-            if field in vehicle_info and vehicle_info[field]:
-                vehicle_info_for_prompt[field] = vehicle_info[field]
-
-        prompts = _load_prompts()
-        prompt = prompts["select_model"].format(
-            vehicle_info=json.dumps(vehicle_info_for_prompt, indent=2),
-            models=shortlisted_models
-        )
+        # Prefetch the next stage for the likeliest models while the LLM decides
+        speculation = {}
+        for model in candidates[:SPECULATIVE_MODELS]:
+            future = _speculate(f"model {model['modelId']}", _prefetch_model,
+                                type_id, model["modelId"], lang_id, country_filter_id)
+            if future is not None:
+                speculation[model["modelId"]] = future
 
         messages = [{"role": "user", "content": prompt}]
         print(f"Calling OpenAI to select best model...")
-        response_text = openai_client.invoke_model_text(messages)
-        print(f"OpenAI response: {response_text}")
-
-        # Extract modelId from XML tags
-        model_id = int(openai_client._parse_xml_tag(response_text, "modelId"))
-
-        # Find the selected model for logging
-        selected_model = next((m for m in year_filtered if m["modelId"] == model_id), None)
-        if selected_model:
-            print(f"Selected model: {selected_model['modelName']} (ID: {model_id})")
-        else:
-            print(f"Selected model ID: {model_id}")
+        model_id = None
+        try:
+            model_id = _parse_model_choice(openai_client.invoke_model_text(messages), models)
+        finally:
+            _discard_speculation(speculation, model_id)
 
         return model_id
 
@@ -251,6 +646,15 @@ def _get_model_id(vehicle_info: Dict[str, Any], type_id: int, lang_id: int,
         raise RuntimeError(f"Model lookup failed: {str(e)}")
 
 
+def _vehicle_details_url(vehicle_id: int, type_id: int, lang_id: int, country_filter_id: int) -> str:
+    """
+    Build the vehicle-type-details URL for a vehicle ID.
+    """
+    return (f"https://{RAPIDAPI_HOST}/types/type-id/{type_id}/"
+            f"vehicle-type-details/{vehicle_id}/lang-id/{lang_id}/"
+            f"country-filter-id/{country_filter_id}")
+
+
 def _get_vehicle_details(vehicle_id: int, type_id: int, lang_id: int,
                         country_filter_id: int) -> Dict[str, Any]:
     """
@@ -269,16 +673,11 @@ def _get_vehicle_details(vehicle_id: int, type_id: int, lang_id: int,
         RuntimeError: If API call fails
     """
     try:
-        url = (f"https://{RAPIDAPI_HOST}/types/type-id/{type_id}/"
-               f"vehicle-type-details/{vehicle_id}/lang-id/{lang_id}/"
-               f"country-filter-id/{country_filter_id}")
-        headers = {
-            "x-rapidapi-host": RAPIDAPI_HOST,
-            "x-rapidapi-key": os.environ.get('RAPIDAPI_KEY', '')
-        }
+        url = _vehicle_details_url(vehicle_id, type_id, lang_id, country_filter_id)
+        headers = _api_headers()
 
-        response = _cached_api_request(url, headers)
-        data = response.json()
+        data = _cached_api_data(url, headers, stale_while_revalidate=True,
+                                projection=VEHICLE_DETAILS_PROJECTION)
         return data.get("vehicleTypeDetails", {})
 
     except requests.RequestException as e:
@@ -287,17 +686,104 @@ def _get_vehicle_details(vehicle_id: int, type_id: int, lang_id: int,
         raise RuntimeError(f"Vehicle details lookup failed: {str(e)}")
 
 
-def _process_vehicle(vehicle_id: int, type_id: int, lang_id: int,
-                    country_filter_id: int, model_year: int,
-                    input_cylinders: Optional[int], input_fuel_type: str) -> Optional[tuple]:
+# Details of every vehicle seen in this container, per (vehicle ID, country
+# filter ID), so later lookups prune candidates without fetching them again
+_VEHICLE_SUMMARY_MAX_ENTRIES = 20000
+_vehicle_summaries: "OrderedDict[Tuple[int, int], Dict[str, Any]]" = OrderedDict()
+_vehicle_summaries_lock = threading.Lock()
+
+# Prefetches the next wave of vehicle details (see _iter_vehicle_details)
+_details_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='vehicle-details')
+
+
+def _remember_vehicles(details_by_id: Dict[int, Dict[str, Any]], country_filter_id: int) -> None:
+    """Record fetched vehicle details, dropping the least recently used beyond the limit."""
+    with _vehicle_summaries_lock:
+        for vid, details in details_by_id.items():
+            _vehicle_summaries[(vid, country_filter_id)] = details
+            _vehicle_summaries.move_to_end((vid, country_filter_id))
+        while len(_vehicle_summaries) > _VEHICLE_SUMMARY_MAX_ENTRIES:
+            _vehicle_summaries.popitem(last=False)
+
+
+def _known_vehicles(vehicle_ids: List[int], country_filter_id: int) -> Dict[int, Dict[str, Any]]:
+    """Return the details already seen for any of the vehicle IDs."""
+    with _vehicle_summaries_lock:
+        return {vid: _vehicle_summaries[(vid, country_filter_id)]
+                for vid in vehicle_ids if (vid, country_filter_id) in _vehicle_summaries}
+
+
+def _get_vehicle_details_batch(vehicle_ids: List[int], type_id: int, lang_id: int, country_filter_id: int,
+                               stale_while_revalidate: bool = True) -> Dict[int, Dict[str, Any]]:
     """
-    Fetch vehicle details and apply filters.
+    Get detailed vehicle specifications for many vehicle IDs at once.
+
+    Cache lookups and writes are batched; only cache misses hit the API.
+    Vehicles whose details cannot be fetched or parsed are skipped.
 
     Args:
-        vehicle_id: Vehicle ID to process
+        vehicle_ids: Vehicle IDs
         type_id: Vehicle type ID
         lang_id: Language ID
         country_filter_id: Country filter ID
+        stale_while_revalidate: Serve expired cache entries while refreshing them
+
+    Returns:
+        Dictionary mapping vehicle ID to its vehicle type details
+    """
+    headers = _api_headers()
+    url_to_vehicle_id = {
+        _vehicle_details_url(vid, type_id, lang_id, country_filter_id): vid
+        for vid in vehicle_ids
+    }
+
+    results = _cached_api_data_many(list(url_to_vehicle_id.keys()), headers, raise_on_error=False,
+                                    stale_while_revalidate=stale_while_revalidate,
+                                    projection=VEHICLE_DETAILS_PROJECTION)
+
+    details_by_id = {
+        url_to_vehicle_id[url]: data.get("vehicleTypeDetails", {})
+        for url, data in results.items()
+    }
+    _remember_vehicles(details_by_id, country_filter_id)
+    return details_by_id
+
+
+def _iter_vehicle_details(vehicle_ids: List[int], type_id: int, lang_id: int, country_filter_id: int,
+                          wave_size: Optional[int] = None) -> Iterator[Dict[int, Dict[str, Any]]]:
+    """
+    Fetch vehicle details in waves of wave_size IDs (default
+    VEHICLE_DETAILS_WAVE_SIZE), in the given order, yielding each wave's
+    details as it lands. The next wave is fetched in the background meanwhile;
+    closing the iterator cancels it if it has not started.
+    """
+    wave_size = max(1, VEHICLE_DETAILS_WAVE_SIZE if wave_size is None else wave_size)
+    waves = [vehicle_ids[i:i + wave_size] for i in range(0, len(vehicle_ids), wave_size)]
+    if not waves:
+        return
+
+    future = _details_executor.submit(_get_vehicle_details_batch, waves[0], type_id, lang_id, country_filter_id)
+    try:
+        for i in range(len(waves)):
+            details_by_id = future.result()
+            future = None
+            if i + 1 < len(waves):
+                future = _details_executor.submit(_get_vehicle_details_batch, waves[i + 1],
+                                                  type_id, lang_id, country_filter_id)
+            yield details_by_id
+    finally:
+        if future is not None:
+            future.cancel()
+
+
+def _process_vehicle(vehicle_id: int, vehicle_details: Dict[str, Any], model_year: int,
+                    input_cylinders: Optional[int], input_fuel_type: str) -> Optional[tuple]:
+    """
+    Apply year, cylinder and fuel type filters to a vehicle's details.
+
+    Args:
+        vehicle_id: Vehicle ID to process
+        vehicle_details: Vehicle type details for the vehicle ID
         model_year: Target model year to match
         input_cylinders: Target number of cylinders (None if not specified)
         input_fuel_type: Target fuel type
@@ -306,8 +792,6 @@ def _process_vehicle(vehicle_id: int, type_id: int, lang_id: int,
         Tuple of (vehicle_id, vehicle_details) if all filters pass, None otherwise
     """
     try:
-        vehicle_details = _get_vehicle_details(vehicle_id, type_id, lang_id, country_filter_id)
-
         # Filter 1: Check year range
         try:
             construction_start = vehicle_details.get("constructionIntervalStart", "")
@@ -366,6 +850,436 @@ def _process_vehicle(vehicle_id: int, type_id: int, lang_id: int,
         return None
 
 
+def _get_vehicle_ids(type_id: int, model_id: int, lang_id: int, country_filter_id: int,
+                     stale_while_revalidate: bool = True) -> List[int]:
+    """
+    Get the unique vehicle IDs of a model.
+
+    Args:
+        type_id: Vehicle type ID
+        model_id: Model ID
+        lang_id: Language ID
+        country_filter_id: Country filter ID
+        stale_while_revalidate: Serve expired cache entries while refreshing them
+
+    Returns:
+        List of vehicle IDs
+
+    Raises:
+        requests.RequestException: If API call fails
+        ValueError: If the model has no vehicles
+    """
+    data = _cached_api_data(_vehicle_ids_url(type_id, model_id, lang_id, country_filter_id), _api_headers(),
+                            stale_while_revalidate=stale_while_revalidate, projection=VEHICLE_LIST_PROJECTION)
+    return _vehicle_ids_from(data, model_id)
+
+
+def _vehicle_ids_url(type_id: int, model_id: int, lang_id: int, country_filter_id: int) -> str:
+    """
+    Build the list-vehicles-id URL for a model.
+    """
+    return (f"https://{RAPIDAPI_HOST}/types/type-id/{type_id}/"
+            f"list-vehicles-id/{model_id}/lang-id/{lang_id}/"
+            f"country-filter-id/{country_filter_id}")
+
+
+def _vehicle_ids_from(data: Dict[str, Any], model_id: int) -> List[int]:
+    """
+    Get the unique vehicle IDs, in API order, from a list-vehicles-id response.
+
+    Raises:
+        ValueError: If the model has no vehicles
+    """
+    print(f"Found {data.get('countModelTypes', 0)} model types")
+
+    # Get all unique vehicle IDs from modelTypes array
+    model_types = data.get("modelTypes", [])
+
+    if not model_types:
+        raise ValueError(f"No model types found for model ID {model_id}")
+
+    # Non-repeating vehicle IDs, in API order
+    vehicle_ids = list(dict.fromkeys(mt.get("vehicleId") for mt in model_types if mt.get("vehicleId")))
+    print(f"Found {len(vehicle_ids)} unique vehicle IDs: {vehicle_ids}")
+    return vehicle_ids
+
+
+def _vehicle_filters(vehicle_info: Dict[str, Any]) -> Tuple[int, Optional[int], str]:
+    """
+    Get the model year, cylinder count (None if not specified) and fuel type
+    that _process_vehicle filters on from vehicle_info.
+    """
+    model_year = int(vehicle_info.get("model_year", "0"))
+    engine_cylinders = vehicle_info.get("engine_number_of_cylinders", "")
+    input_fuel_type = vehicle_info.get("fuel_type_-_primary", "")
+
+    # Convert cylinders to int if available
+    input_cylinders = None
+    if engine_cylinders:
+        try:
+            input_cylinders = int(engine_cylinders)
+        except (ValueError, TypeError):
+            print(f"Warning: Could not parse engine_number_of_cylinders: {engine_cylinders}")
+
+    return model_year, input_cylinders, input_fuel_type
+
+
+def _shortlist_vehicles(vehicle_info: Dict[str, Any], vehicle_ids: List[int],
+                        details_by_id: Dict[int, Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """
+    Filter vehicles by the year, cylinder count and fuel type in vehicle_info.
+
+    Args:
+        vehicle_info: Vehicle information containing model year and specs
+        vehicle_ids: Candidate vehicle IDs, in order
+        details_by_id: Vehicle type details per vehicle ID
+
+    Returns:
+        Dictionary mapping each matching vehicle ID to its details
+    """
+    model_year, input_cylinders, input_fuel_type = _vehicle_filters(vehicle_info)
+
+    shortlisted_vehicles = {}
+    for vid in vehicle_ids:
+        if vid not in details_by_id:
+            continue
+        result = _process_vehicle(vid, details_by_id[vid], model_year,
+                                  input_cylinders, input_fuel_type)
+        if result:
+            vehicle_id, vehicle_details = result
+            shortlisted_vehicles[vehicle_id] = vehicle_details
+
+    return shortlisted_vehicles
+
+
+def _likely_match_order(vehicle_ids: List[int], matched_ids: List[int]) -> List[int]:
+    """
+    Order vehicle IDs nearest first to IDs already known to match. Catalog IDs
+    are assigned in sequence, so variants of the same generation sit close together.
+    """
+    if not matched_ids:
+        return list(vehicle_ids)
+
+    matched = sorted(matched_ids)
+
+    def distance(vid: int) -> int:
+        i = bisect.bisect_left(matched, vid)
+        return min(abs(vid - matched[j]) for j in (i - 1, i) if 0 <= j < len(matched))
+
+    return sorted(vehicle_ids, key=distance)
+
+
+def _find_vehicle_candidates(vehicle_info: Dict[str, Any], vehicle_ids: List[int], type_id: int,
+                             lang_id: int, country_filter_id: int) -> Dict[int, Dict[str, Any]]:
+    """
+    Shortlist vehicles like _shortlist_vehicles, fetching as few details as possible.
+
+    Vehicles whose details were already seen in this container are filtered
+    without a fetch. The rest are fetched lazily in waves (see
+    _iter_vehicle_details), nearest to known matches first. Fetching stops,
+    cancelling the prefetched wave, only once the VIN's named engine clearly
+    leads (see _shortlist_decided); otherwise every wave is fetched.
+
+    Args:
+        vehicle_info: Vehicle information containing model year and specs
+        vehicle_ids: Candidate vehicle IDs, in order
+        type_id: Vehicle type ID
+        lang_id: Language ID
+        country_filter_id: Country filter ID
+
+    Returns:
+        Dictionary mapping each matching vehicle ID to its details, in vehicle_ids order
+    """
+    model_year, input_cylinders, input_fuel_type = _vehicle_filters(vehicle_info)
+    perfect_score = _max_vehicle_score(vehicle_info)
+
+    def shortlist(details_by_id: Dict[int, Dict[str, Any]]) -> bool:
+        """Add the matching vehicles; return True once the shortlist is decided."""
+        for vid, details in details_by_id.items():
+            if _process_vehicle(vid, details, model_year, input_cylinders, input_fuel_type):
+                shortlisted[vid] = details
+        return _shortlist_decided(vehicle_info, shortlisted, perfect_score)
+
+    shortlisted: Dict[int, Dict[str, Any]] = {}
+    known = _known_vehicles(vehicle_ids, country_filter_id)
+    decided = shortlist(known)
+    unknown = _likely_match_order([vid for vid in vehicle_ids if vid not in known], list(shortlisted))
+    print(f"Vehicle details: {len(known)} already known ({len(known) - len(shortlisted)} pruned), "
+          + ("the named engine clearly leads" if decided else f"{len(unknown)} to fetch"))
+
+    if unknown and not decided:
+        waves = _iter_vehicle_details(unknown, type_id, lang_id, country_filter_id)
+        try:
+            fetched = 0
+            for details_by_id in waves:
+                fetched += len(details_by_id)
+                if shortlist(details_by_id):
+                    print(f"The named engine clearly leads; skipped {len(unknown) - fetched} detail fetches")
+                    break
+        finally:
+            waves.close()
+
+    return {vid: shortlisted[vid] for vid in vehicle_ids if vid in shortlisted}
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """Parse a numeric API or VIN field ("2.0000", "1998", 4), or None."""
+    try:
+        return float(value) if value not in (None, "") else None
+    except (ValueError, TypeError):
+        return None
+
+
+def _fuel_family(fuel: str) -> Optional[str]:
+    """Map a fuel description (VIN "Gasoline", catalog "Petrol/Electric") to petrol, diesel or electric."""
+    fuel = (fuel or "").upper()
+    if "DIESEL" in fuel:
+        return "diesel"
+    if "PETROL" in fuel or "GASOLINE" in fuel or "FLEX" in fuel:
+        return "petrol"
+    if "ELECTRIC" in fuel:
+        return "electric"
+    return None
+
+
+def _drive_family(drive: str) -> Optional[str]:
+    """Map a drive description (VIN "AWD/All-Wheel Drive", catalog "Rear-Wheel Drive") to awd, rwd or fwd."""
+    drive = _normalize_make(drive or "")
+    if "ALL WHEEL" in drive or "AWD" in drive.split() or "4WD" in drive.split() or "4X4" in drive or "FOUR WHEEL" in drive:
+        return "awd"
+    if "REAR WHEEL" in drive or "RWD" in drive.split():
+        return "rwd"
+    if "FRONT WHEEL" in drive or "FWD" in drive.split():
+        return "fwd"
+    return None
+
+
+def _score_vehicle(details: Dict[str, Any], vehicle_info: Dict[str, Any]) -> float:
+    """
+    Score how well a vehicle's details match the VIN specs: displacement
+    (+2 within 0.05 L, +1 within 0.15 L, -1 otherwise), fuel, hybrid
+    electrification, drive type and power (+1 each on a match, -1 on a mismatch).
+    Specs missing on either side do not count.
+    """
+    score = 0.0
+
+    vin_litres = _to_float(vehicle_info.get("displacement_(l)"))
+    litres = _to_float(details.get("capacityLt"))
+    if vin_litres and litres:
+        difference = abs(vin_litres - litres)
+        score += 2.0 if difference <= 0.05 else 1.0 if difference <= 0.15 else -1.0
+
+    vin_fuel = _fuel_family(vehicle_info.get("fuel_type_-_primary", ""))
+    fuel = _fuel_family(details.get("fuelType", ""))
+    if vin_fuel and fuel:
+        score += 1.0 if vin_fuel == fuel else -1.0
+
+    # Hybrids show as an electric secondary fuel or an electrification level on the VIN
+    secondary = vehicle_info.get("fuel_type_-_secondary", "") or ""
+    electrification = vehicle_info.get("electrification_level", "") or ""
+    if secondary or electrification:
+        vin_hybrid = "ELECTRIC" in secondary.upper() or "HEV" in electrification.upper()
+        hybrid = "/" in (details.get("fuelType") or "") or "HYBRID" in (details.get("engineType") or "").upper()
+        score += 1.0 if vin_hybrid == hybrid else -1.0
+
+    vin_drive = _drive_family(vehicle_info.get("drive_type", ""))
+    drive = _drive_family(details.get("driveType", ""))
+    if vin_drive and drive:
+        score += 1.0 if vin_drive == drive else -1.0
+
+    vin_kw = _to_float(vehicle_info.get("engine_power_(kw)"))
+    kw = _to_float(details.get("powerKw"))
+    if vin_kw and kw:
+        score += 1.0 if abs(vin_kw - kw) <= 0.05 * kw else -1.0
+
+    return score
+
+
+def _max_vehicle_score(vehicle_info: Dict[str, Any]) -> float:
+    """Return the _score_vehicle of a vehicle matching every spec the VIN gives."""
+    score = 2.0 if _to_float(vehicle_info.get("displacement_(l)")) else 0.0
+    score += 1.0 if _fuel_family(vehicle_info.get("fuel_type_-_primary", "")) else 0.0
+    score += 1.0 if vehicle_info.get("fuel_type_-_secondary") or vehicle_info.get("electrification_level") else 0.0
+    score += 1.0 if _drive_family(vehicle_info.get("drive_type", "")) else 0.0
+    score += 1.0 if _to_float(vehicle_info.get("engine_power_(kw)")) else 0.0
+    return score
+
+
+def _matches_vin_engine_name(details: Dict[str, Any], vehicle_info: Dict[str, Any]) -> bool:
+    """
+    Return True if the vehicle's engine name ("520 d xDrive") is the VIN series
+    or trim ("520d xDrive"), ignoring case and spacing.
+    """
+    engine_name = "".join(_normalize_make(details.get("typeEngineName") or "").split())
+    vin_names = {"".join(_normalize_make(vehicle_info.get(field) or "").split()) for field in ("series", "trim")}
+    return bool(engine_name) and engine_name in vin_names
+
+
+def _shortlist_decided(vehicle_info: Dict[str, Any], shortlisted: Dict[int, Dict[str, Any]],
+                       perfect_score: float) -> bool:
+    """
+    Return True once the vehicles shortlisted so far settle the pick, so the
+    remaining details need not be fetched: the best one matches every spec the
+    VIN gives (perfect_score, see _max_vehicle_score), those specs are enough
+    for a confident pick, it beats the runner-up by VEHICLE_CONFIDENT_MARGIN,
+    and its engine name is the one the VIN names (see _matches_vin_engine_name).
+
+    Displacement, fuel, drive and power are shared by many variants, so an
+    unfetched vehicle could tie a leader that only matches those; the engine
+    name is what singles one variant out. Without it every wave is fetched.
+    """
+    if perfect_score < VEHICLE_CONFIDENT_SCORE or len(shortlisted) < 2:
+        return False
+
+    ranked = sorted(((_score_vehicle(details, vehicle_info), details) for details in shortlisted.values()),
+                    key=lambda scored: scored[0], reverse=True)
+    (best_score, best), (runner_up_score, _) = ranked[0], ranked[1]
+    return (best_score >= perfect_score and best_score - runner_up_score >= VEHICLE_CONFIDENT_MARGIN
+            and _matches_vin_engine_name(best, vehicle_info))
+
+
+def _rank_vehicles(vehicle_info: Dict[str, Any],
+                   vehicles: Dict[int, Dict[str, Any]]) -> List[Tuple[float, int]]:
+    """
+    Rank shortlisted vehicles by _score_vehicle.
+
+    Returns:
+        (score, vehicle_id) pairs, best first; ties put engine names matching
+        the VIN series or trim first, then go by vehicle ID, so the order never
+        depends on the order the API listed them in
+    """
+    keys = {
+        vid: (-_score_vehicle(details, vehicle_info), not _matches_vin_engine_name(details, vehicle_info), vid)
+        for vid, details in vehicles.items()
+    }
+    return [(-keys[vid][0], vid) for vid in sorted(keys, key=keys.get)]
+
+
+def _vehicle_candidates(vehicle_info: Dict[str, Any], shortlisted_vehicles: Dict[int, Dict[str, Any]]
+                        ) -> Tuple[Optional[int], Dict[int, Dict[str, Any]], Optional[int]]:
+    """
+    Decide among the shortlisted vehicles locally where possible: a single
+    match, or a clear winner on engine specs.
+
+    Returns:
+        (vehicle ID, {}, None) when decided, otherwise (None, the candidates
+        to send to the LLM, the leading candidate's ID)
+
+    Raises:
+        ValueError: If no vehicle is shortlisted
+    """
+    model_year = int(vehicle_info.get("model_year", "0"))
+
+    if not shortlisted_vehicles:
+        filters = [f"year {model_year}"]
+        if vehicle_info.get("engine_number_of_cylinders"):
+            filters.append(f"{vehicle_info['engine_number_of_cylinders']} cylinders")
+        if vehicle_info.get("fuel_type_-_primary"):
+            filters.append(f"fuel type {vehicle_info['fuel_type_-_primary']}")
+        raise ValueError(f"No vehicles found matching {', '.join(filters)}")
+
+    print(f"\nShortlisted {len(shortlisted_vehicles)} vehicles matching year {model_year}:")
+    for vehicle_id, details in shortlisted_vehicles.items():
+        print(f"  Vehicle ID: {vehicle_id}")
+        print(f"    Model: {details.get('manufacturerName')} {details.get('modelType')}")
+        print(f"    Engine: {details.get('typeEngineName')}")
+        print(f"    Construction: {details.get('constructionIntervalStart')} to {details.get('constructionIntervalEnd')}")
+        print(f"    Capacity: {details.get('capacityLt')}L, Cylinders: {details.get('numberOfCylinders')}, {details.get('fuelType')}")
+        print()
+
+    # Early return if only one vehicle matches
+    if len(shortlisted_vehicles) == 1:
+        selected_vehicle_id = next(iter(shortlisted_vehicles.keys()))
+        print(f"Only one vehicle matches, selected vehicle ID: {selected_vehicle_id}")
+        return selected_vehicle_id, {}, None
+
+    # Step 2: Score the vehicles on engine specs; a clear winner skips the LLM
+    ranked = _rank_vehicles(vehicle_info, shortlisted_vehicles)
+    best_score, best_vehicle_id = ranked[0]
+    runner_up = ranked[1][0]
+    if best_score >= VEHICLE_CONFIDENT_SCORE and best_score - runner_up >= VEHICLE_CONFIDENT_MARGIN:
+        print(f"Selected vehicle without LLM: ID {best_vehicle_id} "
+              f"(score {best_score:.2f} vs {runner_up:.2f})")
+        return best_vehicle_id, {}, None
+
+    # Step 3 goes to the LLM with the vehicles scoring close to the best; the
+    # top-K cap never splits a tie for the best score
+    if best_score != ranked[-1][0]:
+        tied = [vid for score, vid in ranked if score == best_score]
+        below = [vid for score, vid in ranked if best_score - VEHICLE_LLM_SCORE_WINDOW <= score < best_score]
+        kept = tied + below[:max(0, VEHICLE_LLM_TOP_K - len(tied))]
+        if len(kept) < len(tied) + len(below):
+            print(f"Dropped {len(tied) + len(below) - len(kept)} vehicles scoring below the best "
+                  f"(VEHICLE_LLM_TOP_K={VEHICLE_LLM_TOP_K})")
+        shortlisted_vehicles = {vid: shortlisted_vehicles[vid] for vid in kept}
+        print(f"Sending {len(shortlisted_vehicles)} of {len(ranked)} vehicles to the LLM "
+              f"(best score {best_score:.2f})")
+
+    return None, shortlisted_vehicles, best_vehicle_id
+
+
+def _select_vehicle_prompt(vehicle_info: Dict[str, Any], candidates: Dict[int, Dict[str, Any]]) -> str:
+    """
+    Build the select_vehicle prompt for the candidate vehicles.
+    """
+    # Prepare shortlisted vehicles as a formatted string with detailed specs
+    shortlisted_vehicles_text = "\n".join([
+        f"- Vehicle ID: {vid}\n"
+        f"  Model: {details.get('manufacturerName', 'N/A')} {details.get('modelType', 'N/A')}\n"
+        f"  Engine: {details.get('typeEngineName', 'N/A')}\n"
+        f"  Construction: {details.get('constructionIntervalStart', 'N/A')} to {details.get('constructionIntervalEnd', 'N/A')}\n"
+        f"  Power: {details.get('powerKw', 'N/A')} kW / {details.get('powerPs', 'N/A')} PS\n"
+        f"  Capacity: {details.get('capacityLt', 'N/A')} L ({details.get('capacityTech', 'N/A')} cc)\n"
+        f"  Cylinders: {details.get('numberOfCylinders', 'N/A')}\n"
+        f"  Fuel: {details.get('fuelType', 'N/A')}\n"
+        f"  Engine Type: {details.get('engineType', 'N/A')}\n"
+        f"  Drive: {details.get('driveType', 'N/A')}"
+        for vid, details in candidates.items()
+    ])
+
+    # Prepare vehicle info for prompt - include all available discriminating fields
+    vehicle_info_for_prompt = {
+        "model": vehicle_info.get("model", ""),
+        "series": vehicle_info.get("series", ""),
+        "trim": vehicle_info.get("trim", ""),
+        "year": int(vehicle_info.get("model_year", "0"))
+    }
+
+    # Add optional fields if available
+    for field in _VEHICLE_PROMPT_FIELDS:
+        if field in vehicle_info and vehicle_info[field]:
+            vehicle_info_for_prompt[field] = vehicle_info[field]
+
+    prompts = registry.load_prompts(_PROMPTS_PATH)
+    return prompts["select_vehicle"].format(
+        vehicle_info=json.dumps(vehicle_info_for_prompt, indent=2),
+        vehicles=shortlisted_vehicles_text
+    )
+
+
+def _parse_vehicle_choice(response_text: str, candidates: Dict[int, Dict[str, Any]]) -> int:
+    """
+    Get the vehicle ID from the select_vehicle response.
+
+    Raises:
+        ValueError: If the response has no vehicleId
+    """
+    print(f"OpenAI response: {response_text}")
+
+    # Extract vehicleId from XML tags
+    selected_vehicle_id = int(openai_client._parse_xml_tag(response_text, "vehicleId"))
+
+    # Find the selected vehicle for logging
+    selected_vehicle = candidates.get(selected_vehicle_id)
+    if selected_vehicle:
+        print(f"Selected vehicle: {selected_vehicle.get('manufacturerName')} {selected_vehicle.get('modelType')} "
+              f"{selected_vehicle.get('typeEngineName')} (ID: {selected_vehicle_id})")
+    else:
+        print(f"Selected vehicle ID: {selected_vehicle_id}")
+
+    return selected_vehicle_id
+
+
 def _get_vehicle_id(vehicle_info: Dict[str, Any], type_id: int, model_id: int,
                     lang_id: int, country_filter_id: int) -> int:
     """
@@ -386,144 +1300,33 @@ def _get_vehicle_id(vehicle_info: Dict[str, Any], type_id: int, model_id: int,
         ValueError: If vehicle not found
     """
     try:
-        url = (f"https://{RAPIDAPI_HOST}/types/type-id/{type_id}/"
-               f"list-vehicles-id/{model_id}/lang-id/{lang_id}/"
-               f"country-filter-id/{country_filter_id}")
-        headers = {
-            "x-rapidapi-host": RAPIDAPI_HOST,
-            "x-rapidapi-key": os.environ.get('RAPIDAPI_KEY', '')
-        }
-
-        response = _cached_api_request(url, headers)
-        data = response.json()
-        print(f"Found {data.get('countModelTypes', 0)} model types")
-
-        # Get all unique vehicle IDs from modelTypes array
-        model_types = data.get("modelTypes", [])
-
-        if not model_types:
-            raise ValueError(f"No model types found for model ID {model_id}")
+        vehicle_ids = _get_vehicle_ids(type_id, model_id, lang_id, country_filter_id)
 
-        # Create non-repeating set of vehicle IDs
-        vehicle_ids = list(set([mt.get("vehicleId") for mt in model_types if mt.get("vehicleId")]))
-        print(f"Found {len(vehicle_ids)} unique vehicle IDs: {vehicle_ids}")
+        # Filter the vehicles, fetching details only until the shortlist is decided
+        shortlisted_vehicles = _find_vehicle_candidates(vehicle_info, vehicle_ids, type_id, lang_id,
+                                                        country_filter_id)
 
-        # Get vehicle year, cylinder count, and fuel type from input
-        model_year = int(vehicle_info.get("model_year", "0"))
-        engine_cylinders = vehicle_info.get("engine_number_of_cylinders", "")
-        input_fuel_type = vehicle_info.get("fuel_type_-_primary", "")
+        vehicle_id, candidates, best_vehicle_id = _vehicle_candidates(vehicle_info, shortlisted_vehicles)
+        if vehicle_id is not None:
+            return vehicle_id
 
-        # Convert cylinders to int if available
-        input_cylinders = None
-        if engine_cylinders:
-            try:
-                input_cylinders = int(engine_cylinders)
-            except (ValueError, TypeError):
-                print(f"Warning: Could not parse engine_number_of_cylinders: {engine_cylinders}")
-
-        # Fetch details for each vehicle ID and filter with max concurrency of 10
-        shortlisted_vehicles = {}
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            # Submit all tasks - call module-level _process_vehicle function
-            future_to_vehicle_id = {
-                executor.submit(_process_vehicle, vid, type_id, lang_id, country_filter_id,
-                              model_year, input_cylinders, input_fuel_type): vid
-                for vid in vehicle_ids
-            }
-
-            # Process results as they complete
-            for future in as_completed(future_to_vehicle_id):
-                result = future.result()
-                if result:
-                    vehicle_id, vehicle_details = result
-                    shortlisted_vehicles[vehicle_id] = vehicle_details
-
-        if not shortlisted_vehicles:
-            filters = [f"year {model_year}"]
-            if input_cylinders:
-                filters.append(f"{input_cylinders} cylinders")
-            if input_fuel_type:
-                filters.append(f"fuel type {input_fuel_type}")
-            raise ValueError(f"No vehicles found matching {', '.join(filters)}")
-
-        print(f"\nShortlisted {len(shortlisted_vehicles)} vehicles matching year {model_year}:")
-        for vehicle_id, details in shortlisted_vehicles.items():
-            print(f"  Vehicle ID: {vehicle_id}")
-            print(f"    Model: {details.get('manufacturerName')} {details.get('modelType')}")
-            print(f"    Engine: {details.get('typeEngineName')}")
-            print(f"    Construction: {details.get('constructionIntervalStart')} to {details.get('constructionIntervalEnd')}")
-            print(f"    Capacity: {details.get('capacityLt')}L, Cylinders: {details.get('numberOfCylinders')}, {details.get('fuelType')}")
-            print()
-
-        # Early return if only one vehicle matches
-        if len(shortlisted_vehicles) == 1:
-            selected_vehicle_id = next(iter(shortlisted_vehicles.keys()))
-            print(f"Only one vehicle matches, selected vehicle ID: {selected_vehicle_id}")
-            return selected_vehicle_id
-
-        # Step 2: Use Bedrock to select the best matching vehicle
-        # Prepare shortlisted vehicles as a formatted string with detailed specs
-        shortlisted_vehicles_text = "\n".join([
-            f"- Vehicle ID: {vid}\n"
-            f"  Model: {details.get('manufacturerName', 'N/A')} {details.get('modelType', 'N/A')}\n"
-            f"  Engine: {details.get('typeEngineName', 'N/A')}\n"
-            f"  Construction: {details.get('constructionIntervalStart', 'N/A')} to {details.get('constructionIntervalEnd', 'N/A')}\n"
-            f"  Power: {details.get('powerKw', 'N/A')} kW / {details.get('powerPs', 'N/A')} PS\n"
-            f"  Capacity: {details.get('capacityLt', 'N/A')} L ({details.get('capacityTech', 'N/A')} cc)\n"
-            f"  Cylinders: {details.get('numberOfCylinders', 'N/A')}\n"
-            f"  Fuel: {details.get('fuelType', 'N/A')}\n"
-            f"  Engine Type: {details.get('engineType', 'N/A')}\n"
-            f"  Drive: {details.get('driveType', 'N/A')}"
-            for vid, details in shortlisted_vehicles.items()
-        ])
-
-        # Prepare vehicle info for prompt - include all available discriminating fields
-        vehicle_info_for_prompt = {
-            "model": vehicle_info.get("model", ""),
-            "series": vehicle_info.get("series", ""),
-            "trim": vehicle_info.get("trim", ""),
-            "year": model_year
-        }
+        # Step 3: Use the LLM to select among the candidates
+        prompt = _select_vehicle_prompt(vehicle_info, candidates)
 
-        # Add optional fields if available
-        optional_fields = [
-            "displacement_(l)",
-            "engine_number_of_cylinders",
-            "fuel_type_-_primary",
-            "engine_configuration",
-            "engine_model",
-            "transmission_style",
-            "transmission_speeds",
-            "drive_type",
-            "body_class",
-            "doors"
-        ]
-
-        for field in optional_fields:
-            if field in vehicle_info and vehicle_info[field]:
-                vehicle_info_for_prompt[field] = vehicle_info[field]
-
-        prompts = _load_prompts()
-        prompt = prompts["select_vehicle"].format(
-            vehicle_info=json.dumps(vehicle_info_for_prompt, indent=2),
-            vehicles=shortlisted_vehicles_text
-        )
+        # Prefetch the categories of the leading candidate while the LLM decides
+        speculation = {}
+        future = _speculate(f"categories of vehicle {best_vehicle_id}", _get_categories,
+                            type_id, lang_id, best_vehicle_id)
+        if future is not None:
+            speculation[best_vehicle_id] = future
 
         messages = [{"role": "user", "content": prompt}]
-        print(f"Calling OpenAI to select best vehicle from {len(shortlisted_vehicles)} candidates...")
-        response_text = openai_client.invoke_model_text(messages)
-        print(f"OpenAI response: {response_text}")
-
-        # Extract vehicleId from XML tags
-        selected_vehicle_id = int(openai_client._parse_xml_tag(response_text, "vehicleId"))
-
-        # Find the selected vehicle for logging
-        selected_vehicle = shortlisted_vehicles.get(selected_vehicle_id)
-        if selected_vehicle:
-            print(f"Selected vehicle: {selected_vehicle.get('manufacturerName')} {selected_vehicle.get('modelType')} "
-                  f"{selected_vehicle.get('typeEngineName')} (ID: {selected_vehicle_id})")
-        else:
-            print(f"Selected vehicle ID: {selected_vehicle_id}")
+        print(f"Calling OpenAI to select best vehicle from {len(candidates)} candidates...")
+        selected_vehicle_id = None
+        try:
+            selected_vehicle_id = _parse_vehicle_choice(openai_client.invoke_model_text(messages), candidates)
+        finally:
+            _discard_speculation(speculation, selected_vehicle_id)
 
         return selected_vehicle_id
 
@@ -533,7 +1336,16 @@ def _get_vehicle_id(vehicle_info: Dict[str, Any], type_id: int, model_id: int,
         raise RuntimeError(f"Vehicle lookup failed: {str(e)}")
 
 
-def _get_categories(type_id: int, lang_id: int, vehicle_id: int) -> Dict[str, Any]:
+def _categories_url(type_id: int, lang_id: int, vehicle_id: int) -> str:
+    """
+    Build the parts categories URL for a vehicle ID.
+    """
+    return (f"https://{RAPIDAPI_HOST}/category/type-id/{type_id}/"
+            f"products-groups-variant-3/{vehicle_id}/lang-id/{lang_id}")
+
+
+def _get_categories(type_id: int, lang_id: int, vehicle_id: int,
+                    stale_while_revalidate: bool = True) -> Dict[str, Any]:
     """
     Get parts categories for the vehicle.
 
@@ -541,6 +1353,7 @@ def _get_categories(type_id: int, lang_id: int, vehicle_id: int) -> Dict[str, An
         type_id: Vehicle type ID
         lang_id: Language ID
         vehicle_id: Vehicle ID from previous step
+        stale_while_revalidate: Serve expired cache entries while refreshing them
 
     Returns:
         Raw API response containing product groups
@@ -549,15 +1362,8 @@ def _get_categories(type_id: int, lang_id: int, vehicle_id: int) -> Dict[str, An
         RuntimeError: If API call fails
     """
     try:
-        url = (f"https://{RAPIDAPI_HOST}/category/type-id/{type_id}/"
-               f"products-groups-variant-3/{vehicle_id}/lang-id/{lang_id}")
-        headers = {
-            "x-rapidapi-host": RAPIDAPI_HOST,
-            "x-rapidapi-key": os.environ.get('RAPIDAPI_KEY', '')
-        }
-
-        response = _cached_api_request(url, headers)
-        data = response.json()
+        data = _cached_api_data(_categories_url(type_id, lang_id, vehicle_id), _api_headers(),
+                                stale_while_revalidate=stale_while_revalidate)
         print(f"Retrieved product groups")
 
         return data
@@ -568,6 +1374,98 @@ def _get_categories(type_id: int, lang_id: int, vehicle_id: int) -> Dict[str, An
         raise RuntimeError(f"Categories lookup failed: {str(e)}")
 
 
+def _normalized_fields(vehicle_info: Dict[str, Any], fields: Tuple[str, ...]) -> List[Any]:
+    """
+    Normalize VIN attributes for use in keys, so equivalent decodes (case,
+    punctuation, "2.0" vs "2") compare equal.
+    """
+    key: List[Any] = []
+    for field in fields:
+        value = vehicle_info.get(field)
+        number = _to_float(value)
+        if field in ("model_year", "engine_number_of_cylinders", "displacement_(l)", "engine_power_(kw)") \
+                and number is not None:
+            key.append(round(number, 1))
+        else:
+            key.append(_normalize_make(str(value)) if value else "")
+    return key
+
+
+def _resolution_key(vehicle_info: Dict[str, Any]) -> List[Any]:
+    """
+    Normalize the VIN attributes that decide a resolution, so equivalent
+    decodes share one memo entry.
+    """
+    return [_RESOLUTION_VERSION] + _normalized_fields(vehicle_info, _RESOLUTION_KEY_FIELDS)
+
+
+def _resolve_vehicle(vehicle_info: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Resolve a vehicle to its catalog IDs (steps 1-3 of main), answering
+    repeat vehicles from the resolution memo.
+
+    Args:
+        vehicle_info: Dictionary from VIN lookup (see main)
+
+    Returns:
+        Dictionary with countryFilterId, manufacturerId, modelId and vehicleId
+
+    Raises:
+        ValueError: If the vehicle cannot be matched
+        RuntimeError: If any API call fails
+    """
+    resolution_key = _resolution_key(vehicle_info)
+    metadata = memo.get(_RESOLUTION_MEMO, resolution_key)
+    if metadata is not None:
+        print(f"Resolved vehicle from memo: {metadata}")
+        return metadata
+
+    # Get country filter ID
+    print(f"\n=== Getting country filter ID for {vehicle_info['plant_country']} ===")
+    country_filter_id = _get_country_filter_id(vehicle_info["plant_country"])
+    print(f"Country filter ID: {country_filter_id}")
+
+    # Step 1: Get manufacturer ID
+    print(f"\n=== Step 1: Getting manufacturer ID for {vehicle_info['make']} ===")
+    manufacturer_id = _get_manufacturer_id(
+        vehicle_info["make"],
+        TYPE_ID,
+        country_filter_id
+    )
+    print(f"Manufacturer ID: {manufacturer_id}")
+
+    # Step 2: Get model ID
+    print(f"\n=== Step 2: Getting model ID for {vehicle_info['model']} ({vehicle_info['model_year']}) ===")
+    model_id = _get_model_id(
+        vehicle_info,
+        TYPE_ID,
+        LANG_ID,
+        country_filter_id,
+        manufacturer_id
+    )
+    print(f"Model ID: {model_id}")
+
+    # Step 3: Get vehicle ID
+    print(f"\n=== Step 3: Getting vehicle ID ===")
+    vehicle_id = _get_vehicle_id(
+        vehicle_info,
+        TYPE_ID,
+        model_id,
+        LANG_ID,
+        country_filter_id
+    )
+    print(f"Vehicle ID: {vehicle_id}")
+
+    metadata = {
+        "countryFilterId": country_filter_id,
+        "manufacturerId": manufacturer_id,
+        "modelId": model_id,
+        "vehicleId": vehicle_id
+    }
+    memo.put(_RESOLUTION_MEMO, resolution_key, metadata, VEHICLE_RESOLUTION_TTL_HOURS)
+    return metadata
+
+
 def main(vehicle_info: Dict[str, Any]) -> Dict[str, Any]:
     """
     Get parts categories for a vehicle through a 4-step API workflow.
@@ -596,64 +1494,23 @@ def main(vehicle_info: Dict[str, Any]) -> Dict[str, Any]:
         RuntimeError: If any API call fails
     """
     # Validate required fields
-    required_fields = ["make", "model", "model_year", "plant_country"]
-    for field in required_fields:
-        if field not in vehicle_info or not vehicle_info[field]:
-            raise ValueError(f"Required field '{field}' is missing from vehicle_info")
+    _check_required_fields(vehicle_info)
 
     try:
-        # Get country filter ID
-        print(f"\n=== Getting country filter ID for {vehicle_info['plant_country']} ===")
-        country_filter_id = _get_country_filter_id(vehicle_info["plant_country"])
-        print(f"Country filter ID: {country_filter_id}")
-
-        # Step 1: Get manufacturer ID
-        print(f"\n=== Step 1: Getting manufacturer ID for {vehicle_info['make']} ===")
-        manufacturer_id = _get_manufacturer_id(
-            vehicle_info["make"],
-            TYPE_ID,
-            country_filter_id
-        )
-        print(f"Manufacturer ID: {manufacturer_id}")
-
-        # Step 2: Get model ID
-        print(f"\n=== Step 2: Getting model ID for {vehicle_info['model']} ({vehicle_info['model_year']}) ===")
-        model_id = _get_model_id(
-            vehicle_info,
-            TYPE_ID,
-            LANG_ID,
-            country_filter_id,
-            manufacturer_id
-        )
-        print(f"Model ID: {model_id}")
-
-        # Step 3: Get vehicle ID
-        print(f"\n=== Step 3: Getting vehicle ID ===")
-        vehicle_id = _get_vehicle_id(
-            vehicle_info,
-            TYPE_ID,
-            model_id,
-            LANG_ID,
-            country_filter_id
-        )
-        print(f"Vehicle ID: {vehicle_id}")
+        # Steps 1-3: Resolve the vehicle's catalog IDs (memoized per VIN attributes)
+        metadata = _resolve_vehicle(vehicle_info)
 
         # Step 4: Get categories
         print(f"\n=== Step 4: Getting parts categories ===")
         categories = _get_categories(
             TYPE_ID,
             LANG_ID,
-            vehicle_id
+            metadata["vehicleId"]
         )
 
         # Return structured response with metadata and categories
         return {
-            "metadata": {
-                "countryFilterId": country_filter_id,
-                "manufacturerId": manufacturer_id,
-                "modelId": model_id,
-                "vehicleId": vehicle_id
-            },
+            "metadata": metadata,
             "categories": categories
         }
 
@@ -661,6 +1518,17 @@ def main(vehicle_info: Dict[str, Any]) -> Dict[str, Any]:
         raise RuntimeError(f"Parts categories lookup failed: {str(e)}")
 
 
+def _main_async(vehicle_info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run lookup_categories_async.main on the container's event loop.
+    """
+    # Imported on first use: the async workflow builds on this module
+    from lib import async_restapi
+    import lookup_categories_async
+
+    return async_restapi.run(lookup_categories_async.main(vehicle_info))
+
+
 def lambda_handler(event, context):
     """
     AWS Lambda handler for parts categories lookup.
@@ -700,7 +1568,7 @@ def lambda_handler(event, context):
             }
 
         # Process parts categories lookup
-        result = main(vehicle_info)
+        result = _main_async(vehicle_info) if ASYNC_WORKFLOW else main(vehicle_info)
 
         return {
             'statusCode': 200,
@@ -726,3 +1594,8 @@ def lambda_handler(event, context):
                 'details': str(e)
             })
         }
+    finally:
+        # Land queued cache writes before the container is frozen, then
+        # emit per-invocation API cache metrics
+        _flush_cache_writes()
+        cache_stats.end_invocation(context)
@@ -0,0 +1,428 @@
+import asyncio
+import contextvars
+import os
+from typing import Any, Coroutine, Dict, List, Optional, Set
+import requests
+from lib import async_restapi
+from lib import memo
+from lib import openai_client
+from lookup_categories import (
+    TYPE_ID,
+    LANG_ID,
+    VEHICLE_LIST_PROJECTION,
+    VEHICLE_DETAILS_PROJECTION,
+    SPECULATIVE_PREFETCH,
+    SPECULATIVE_MODELS,
+    VEHICLE_DETAILS_WAVE_SIZE,
+    VEHICLE_RESOLUTION_TTL_HOURS,
+    _RESOLUTION_MEMO,
+    _ModelYearIndex,
+    _api_headers,
+    _categories_url,
+    _check_required_fields,
+    _get_country_filter_id,
+    _index_models,
+    _known_vehicles,
+    _likely_match_order,
+    _manufacturers_url,
+    _match_manufacturer,
+    _max_vehicle_score,
+    _model_candidates,
+    _models_url,
+    _parse_model_choice,
+    _parse_vehicle_choice,
+    _process_vehicle,
+    _remember_vehicles,
+    _resolution_key,
+    _select_model_prompt,
+    _select_vehicle_prompt,
+    _shortlist_decided,
+    _vehicle_candidates,
+    _vehicle_details_url,
+    _vehicle_filters,
+    _vehicle_ids_from,
+    _vehicle_ids_url
+)
+
+
+# asyncio implementation of the lookup_categories workflow. Stage logic
+# (matching, scoring, prompts) is shared with lookup_categories; here the
+# catalog API, DynamoDB and the LLM are awaited on one event loop, each behind
+# its own semaphore: API_ASYNC_HOST_CONCURRENCY and API_ASYNC_DYNAMODB_CONCURRENCY
+# (see lib.async_restapi) and LLM_ASYNC_CONCURRENCY below.
+
+# Concurrent LLM calls on the event loop
+LLM_CONCURRENCY = int(os.environ.get('LLM_ASYNC_CONCURRENCY', '4'))
+
+# Speculative prefetches started by the current main() call, cancelled when it
+# returns. Unset elsewhere (resolve_batch), where _speculate starts nothing.
+_speculation: contextvars.ContextVar[Optional[Set[asyncio.Task]]] = contextvars.ContextVar('speculation',
+                                                                                             default=None)
+
+
+def _speculate(label: str, coro: Coroutine[Any, Any, Any]) -> Optional[asyncio.Task]:
+    """
+    Start coro as a task when speculative prefetch is enabled. Failures are
+    logged and ignored; the main path repeats the call anyway.
+    """
+    tasks = _speculation.get()
+    if not SPECULATIVE_PREFETCH or tasks is None:
+        coro.close()
+        return None
+
+    async def run():
+        try:
+            await coro
+        except Exception as e:
+            print(f"Warning: Speculative prefetch of {label} failed: {str(e)}")
+
+    task = asyncio.ensure_future(run())
+    tasks.add(task)
+    task.add_done_callback(tasks.discard)
+    return task
+
+
+def _discard_speculation(tasks: Dict[int, asyncio.Task], keep: Optional[int]) -> None:
+    """
+    Cancel the prefetches of losing candidates (all of them if keep is None,
+    i.e. the selection failed), including requests already in flight.
+    """
+    cancelled = [candidate for candidate, task in tasks.items() if candidate != keep and task.cancel()]
+    if cancelled:
+        print(f"Cancelled speculative prefetch for {cancelled}")
+
+
+async def _invoke_llm(prompt: str) -> str:
+    """Send a single-message prompt to the LLM, at most LLM_CONCURRENCY at a time."""
+    async with async_restapi.semaphore('openai', LLM_CONCURRENCY):
+        return await openai_client.invoke_model_text_async([{"role": "user", "content": prompt}])
+
+
+async def _get_manufacturer_id(make: str, type_id: int, country_filter_id: int) -> int:
+    """
+    Async counterpart of lookup_categories._get_manufacturer_id.
+
+    Raises:
+        RuntimeError: If API call fails or manufacturer not found
+    """
+    try:
+        data = await async_restapi.cached_api_data(_manufacturers_url(type_id), _api_headers(),
+                                                   stale_while_revalidate=True)
+        return _match_manufacturer(data, make)
+
+    except requests.RequestException as e:
+        raise RuntimeError(f"Manufacturer API request failed: {str(e)}")
+    except Exception as e:
+        raise RuntimeError(f"Manufacturer lookup failed: {str(e)}")
+
+
+async def _get_models(type_id: int, lang_id: int, country_filter_id: int,
+                      manufacturer_id: int) -> _ModelYearIndex:
+    """
+    Async counterpart of lookup_categories._get_models.
+
+    Raises:
+        requests.RequestException: If API call fails
+    """
+    url = _models_url(type_id, lang_id, country_filter_id, manufacturer_id)
+    data = await async_restapi.cached_api_data(url, _api_headers(), stale_while_revalidate=True)
+    return _index_models(url, data)
+
+
+async def _prefetch_model(type_id: int, model_id: int, lang_id: int, country_filter_id: int) -> None:
+    """Fetch what _get_vehicle_id needs first for a model: its vehicle list and first details wave."""
+    vehicle_ids = await _get_vehicle_ids(type_id, model_id, lang_id, country_filter_id)
+    await _get_vehicle_details_batch(vehicle_ids[:VEHICLE_DETAILS_WAVE_SIZE], type_id, lang_id, country_filter_id)
+
+
+async def _get_model_id(vehicle_info: Dict[str, Any], type_id: int, lang_id: int,
+                        country_filter_id: int, manufacturer_id: int) -> int:
+    """
+    Async counterpart of lookup_categories._get_model_id. Speculative
+    prefetches for losing candidates are cancelled once the LLM has chosen.
+
+    Raises:
+        RuntimeError: If API call fails or model not found
+    """
+    try:
+        models = await _get_models(type_id, lang_id, country_filter_id, manufacturer_id)
+
+        model_id, candidates = _model_candidates(vehicle_info, models)
+        if model_id is not None:
+            return model_id
+
+        # Step 3: Use the LLM to select among the candidates
+        prompt = _select_model_prompt(vehicle_info, candidates)
+
+        # Prefetch the next stage for the likeliest models while the LLM decides
+        speculation = {}
+        for model in candidates[:SPECULATIVE_MODELS]:
+            task = _speculate(f"model {model['modelId']}",
+                              _prefetch_model(type_id, model["modelId"], lang_id, country_filter_id))
+            if task is not None:
+                speculation[model["modelId"]] = task
+
+        print(f"Calling OpenAI to select best model...")
+        model_id = None
+        try:
+            model_id = _parse_model_choice(await _invoke_llm(prompt), models)
+        finally:
+            _discard_speculation(speculation, model_id)
+
+        return model_id
+
+    except requests.RequestException as e:
+        raise RuntimeError(f"Model API request failed: {str(e)}")
+    except Exception as e:
+        raise RuntimeError(f"Model lookup failed: {str(e)}")
+
+
+async def _get_vehicle_ids(type_id: int, model_id: int, lang_id: int, country_filter_id: int) -> List[int]:
+    """
+    Async counterpart of lookup_categories._get_vehicle_ids.
+
+    Raises:
+        requests.RequestException: If API call fails
+        ValueError: If the model has no vehicles
+    """
+    data = await async_restapi.cached_api_data(_vehicle_ids_url(type_id, model_id, lang_id, country_filter_id),
+                                               _api_headers(), stale_while_revalidate=True,
+                                               projection=VEHICLE_LIST_PROJECTION)
+    return _vehicle_ids_from(data, model_id)
+
+
+async def _get_vehicle_details_batch(vehicle_ids: List[int], type_id: int, lang_id: int,
+                                     country_filter_id: int) -> Dict[int, Dict[str, Any]]:
+    """
+    Async counterpart of lookup_categories._get_vehicle_details_batch: cache
+    misses are fetched concurrently, bounded by the RapidAPI host semaphore.
+    Vehicles whose details cannot be fetched or parsed are skipped.
+
+    Returns:
+        Dictionary mapping vehicle ID to its vehicle type details
+    """
+    url_to_vehicle_id = {
+        _vehicle_details_url(vid, type_id, lang_id, country_filter_id): vid
+        for vid in vehicle_ids
+    }
+
+    results = await async_restapi.cached_api_data_many(list(url_to_vehicle_id.keys()), _api_headers(),
+                                                       raise_on_error=False, stale_while_revalidate=True,
+                                                       projection=VEHICLE_DETAILS_PROJECTION)
+
+    details_by_id = {
+        url_to_vehicle_id[url]: data.get("vehicleTypeDetails", {})
+        for url, data in results.items()
+    }
+    _remember_vehicles(details_by_id, country_filter_id)
+    return details_by_id
+
+
+async def _find_vehicle_candidates(vehicle_info: Dict[str, Any], vehicle_ids: List[int], type_id: int,
+                                   lang_id: int, country_filter_id: int) -> Dict[int, Dict[str, Any]]:
+    """
+    Async counterpart of lookup_categories._find_vehicle_candidates. The next
+    wave of details is fetched as a task while the current one is filtered,
+    and is cancelled, along with its in-flight requests, once the shortlist
+    is decided.
+
+    Returns:
+        Dictionary mapping each matching vehicle ID to its details, in vehicle_ids order
+    """
+    model_year, input_cylinders, input_fuel_type = _vehicle_filters(vehicle_info)
+    perfect_score = _max_vehicle_score(vehicle_info)
+
+    def shortlist(details_by_id: Dict[int, Dict[str, Any]]) -> bool:
+        """Add the matching vehicles; return True once the shortlist is decided."""
+        for vid, details in details_by_id.items():
+            if _process_vehicle(vid, details, model_year, input_cylinders, input_fuel_type):
+                shortlisted[vid] = details
+        return _shortlist_decided(vehicle_info, shortlisted, perfect_score)
+
+    shortlisted: Dict[int, Dict[str, Any]] = {}
+    known = _known_vehicles(vehicle_ids, country_filter_id)
+    decided = shortlist(known)
+    unknown = _likely_match_order([vid for vid in vehicle_ids if vid not in known], list(shortlisted))
+    print(f"Vehicle details: {len(known)} already known ({len(known) - len(shortlisted)} pruned), "
+          + ("the named engine clearly leads" if decided else f"{len(unknown)} to fetch"))
+
+    if unknown and not decided:
+        wave_size = max(1, VEHICLE_DETAILS_WAVE_SIZE)
+        waves = [unknown[i:i + wave_size] for i in range(0, len(unknown), wave_size)]
+        next_wave = asyncio.ensure_future(_get_vehicle_details_batch(waves[0], type_id, lang_id, country_filter_id))
+        try:
+            fetched = 0
+            for i in range(len(waves)):
+                details_by_id = await next_wave
+                next_wave = None
+                if i + 1 < len(waves):
+                    next_wave = asyncio.ensure_future(_get_vehicle_details_batch(waves[i + 1], type_id, lang_id,
+                                                                                 country_filter_id))
+                fetched += len(details_by_id)
+                if shortlist(details_by_id):
+                    print(f"The named engine clearly leads; skipped {len(unknown) - fetched} detail fetches")
+                    break
+        finally:
+            if next_wave is not None:
+                next_wave.cancel()
+
+    return {vid: shortlisted[vid] for vid in vehicle_ids if vid in shortlisted}
+
+
+async def _get_vehicle_id(vehicle_info: Dict[str, Any], type_id: int, model_id: int,
+                          lang_id: int, country_filter_id: int) -> int:
+    """
+    Async counterpart of lookup_categories._get_vehicle_id.
+
+    Raises:
+        RuntimeError: If API call fails or vehicle not found
+    """
+    try:
+        vehicle_ids = await _get_vehicle_ids(type_id, model_id, lang_id, country_filter_id)
+
+        # Filter the vehicles, fetching details only until the shortlist is decided
+        shortlisted_vehicles = await _find_vehicle_candidates(vehicle_info, vehicle_ids, type_id, lang_id,
+                                                              country_filter_id)
+
+        vehicle_id, candidates, best_vehicle_id = _vehicle_candidates(vehicle_info, shortlisted_vehicles)
+        if vehicle_id is not None:
+            return vehicle_id
+
+        # Step 3: Use the LLM to select among the candidates
+        prompt = _select_vehicle_prompt(vehicle_info, candidates)
+
+        # Prefetch the categories of the leading candidate while the LLM decides
+        speculation = {}
+        task = _speculate(f"categories of vehicle {best_vehicle_id}",
+                          _get_categories(type_id, lang_id, best_vehicle_id))
+        if task is not None:
+            speculation[best_vehicle_id] = task
+
+        print(f"Calling OpenAI to select best vehicle from {len(candidates)} candidates...")
+        selected_vehicle_id = None
+        try:
+            selected_vehicle_id = _parse_vehicle_choice(await _invoke_llm(prompt), candidates)
+        finally:
+            _discard_speculation(speculation, selected_vehicle_id)
+
+        return selected_vehicle_id
+
+    except requests.RequestException as e:
+        raise RuntimeError(f"Vehicle API request failed: {str(e)}")
+    except Exception as e:
+        raise RuntimeError(f"Vehicle lookup failed: {str(e)}")
+
+
+async def _get_categories(type_id: int, lang_id: int, vehicle_id: int) -> Dict[str, Any]:
+    """
+    Async counterpart of lookup_categories._get_categories.
+
+    Raises:
+        RuntimeError: If API call fails
+    """
+    try:
+        data = await async_restapi.cached_api_data(_categories_url(type_id, lang_id, vehicle_id), _api_headers(),
+                                                   stale_while_revalidate=True)
+        print(f"Retrieved product groups")
+
+        return data
+
+    except requests.RequestException as e:
+        raise RuntimeError(f"Categories API request failed: {str(e)}")
+    except Exception as e:
+        raise RuntimeError(f"Categories lookup failed: {str(e)}")
+
+
+async def _resolve_vehicle(vehicle_info: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Async counterpart of lookup_categories._resolve_vehicle, sharing its
+    resolution memo.
+
+    Returns:
+        Dictionary with countryFilterId, manufacturerId, modelId and vehicleId
+
+    Raises:
+        ValueError: If the vehicle cannot be matched
+        RuntimeError: If any API call fails
+    """
+    resolution_key = _resolution_key(vehicle_info)
+    metadata = await async_restapi.in_thread(memo.get, _RESOLUTION_MEMO, resolution_key)
+    if metadata is not None:
+        print(f"Resolved vehicle from memo: {metadata}")
+        return metadata
+
+    # Get country filter ID
+    print(f"\n=== Getting country filter ID for {vehicle_info['plant_country']} ===")
+    country_filter_id = _get_country_filter_id(vehicle_info["plant_country"])
+    print(f"Country filter ID: {country_filter_id}")
+
+    # Step 1: Get manufacturer ID
+    print(f"\n=== Step 1: Getting manufacturer ID for {vehicle_info['make']} ===")
+    manufacturer_id = await _get_manufacturer_id(vehicle_info["make"], TYPE_ID, country_filter_id)
+    print(f"Manufacturer ID: {manufacturer_id}")
+
+    # Step 2: Get model ID
+    print(f"\n=== Step 2: Getting model ID for {vehicle_info['model']} ({vehicle_info['model_year']}) ===")
+    model_id = await _get_model_id(vehicle_info, TYPE_ID, LANG_ID, country_filter_id, manufacturer_id)
+    print(f"Model ID: {model_id}")
+
+    # Step 3: Get vehicle ID
+    print(f"\n=== Step 3: Getting vehicle ID ===")
+    vehicle_id = await _get_vehicle_id(vehicle_info, TYPE_ID, model_id, LANG_ID, country_filter_id)
+    print(f"Vehicle ID: {vehicle_id}")
+
+    metadata = {
+        "countryFilterId": country_filter_id,
+        "manufacturerId": manufacturer_id,
+        "modelId": model_id,
+        "vehicleId": vehicle_id
+    }
+    await async_restapi.in_thread(memo.put, _RESOLUTION_MEMO, resolution_key, metadata, VEHICLE_RESOLUTION_TTL_HOURS)
+    return metadata
+
+
+async def main(vehicle_info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async counterpart of lookup_categories.main: the same 4-step workflow and
+    result. Run it with lib.async_restapi.run (or await it from other
+    coroutines on the same loop); speculative prefetches still running when
+    it returns are cancelled.
+
+    Args:
+        vehicle_info: Dictionary from VIN lookup (see lookup_categories.main)
+
+    Returns:
+        Dictionary containing parts categories tree
+
+    Raises:
+        ValueError: If required fields are missing or invalid
+        RuntimeError: If any API call fails
+    """
+    # Validate required fields
+    _check_required_fields(vehicle_info)
+
+    speculation: Set[asyncio.Task] = set()
+    token = _speculation.set(speculation)
+    try:
+        # Steps 1-3: Resolve the vehicle's catalog IDs (memoized per VIN attributes)
+        metadata = await _resolve_vehicle(vehicle_info)
+
+        # Step 4: Get categories
+        print(f"\n=== Step 4: Getting parts categories ===")
+        categories = await _get_categories(TYPE_ID, LANG_ID, metadata["vehicleId"])
+
+        # Return structured response with metadata and categories
+        return {
+            "metadata": metadata,
+            "categories": categories
+        }
+
+    except Exception as e:
+        raise RuntimeError(f"Parts categories lookup failed: {str(e)}")
+
+    finally:
+        _speculation.reset(token)
+        pending = list(speculation)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import os
+import sys
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+from lib.secrets import load_secrets
+from lib import async_restapi
+from lib import cache_stats
+from lib import memo
+from lib.restapi import _flush_cache_writes
+from lookup_categories import (
+    TYPE_ID,
+    LANG_ID,
+    VEHICLE_RESOLUTION_TTL_HOURS,
+    _MODEL_STAGE_FIELDS,
+    _RESOLUTION_MEMO,
+    _VEHICLE_STAGE_FIELDS,
+    _check_required_fields,
+    _get_country_filter_id,
+    _normalize_make,
+    _normalized_fields,
+    _resolution_key
+)
+from lookup_categories_async import (
+    _get_categories,
+    _get_manufacturer_id,
+    _get_model_id,
+    _get_vehicle_id
+)
+
+
+# Largest batch accepted in one request; bigger fleets are split by the caller
+MAX_VEHICLES = int(os.environ.get('RESOLVE_BATCH_MAX_VEHICLES', '200'))
+
+
+class _SharedStages:
+    """
+    Runs each distinct stage of a batch once, keyed by the inputs that decide
+    its result, and hands the same task to every vehicle that needs it, so a
+    failed stage fails exactly the vehicles depending on it.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.counts: Counter = Counter()
+
+    def run(self, stage: str, key: Hashable, start: Callable[[], Awaitable[Any]]) -> Awaitable[Any]:
+        """Return the task for (stage, key), starting it on first request."""
+        task = self._tasks.get((stage, key))
+        if task is None:
+            task = self._tasks[(stage, key)] = asyncio.ensure_future(start())
+            self.counts[stage] += 1
+        return task
+
+
+async def _resolve_one(vehicle_info: Dict[str, Any], stages: _SharedStages) -> Dict[str, int]:
+    """
+    Resolve one vehicle like lookup_categories_async._resolve_vehicle, through
+    the batch's shared memo lookups and stages.
+
+    Raises:
+        ValueError: If the vehicle cannot be matched
+        RuntimeError: If any API call fails
+    """
+    _check_required_fields(vehicle_info)
+
+    resolution_key = _resolution_key(vehicle_info)
+    metadata = await stages.run("memo", json.dumps(resolution_key),
+                                lambda: async_restapi.in_thread(memo.get, _RESOLUTION_MEMO, resolution_key))
+    if metadata is not None:
+        return metadata
+
+    country_filter_id = _get_country_filter_id(vehicle_info["plant_country"])
+
+    manufacturer_id = await stages.run(
+        "manufacturer", (_normalize_make(vehicle_info["make"]), country_filter_id),
+        lambda: _get_manufacturer_id(vehicle_info["make"], TYPE_ID, country_filter_id)
+    )
+
+    model_id = await stages.run(
+        "model", (manufacturer_id, country_filter_id, tuple(_normalized_fields(vehicle_info, _MODEL_STAGE_FIELDS))),
+        lambda: _get_model_id(vehicle_info, TYPE_ID, LANG_ID, country_filter_id, manufacturer_id)
+    )
+
+    vehicle_id = await stages.run(
+        "vehicle", (model_id, country_filter_id, tuple(_normalized_fields(vehicle_info, _VEHICLE_STAGE_FIELDS))),
+        lambda: _get_vehicle_id(vehicle_info, TYPE_ID, model_id, LANG_ID, country_filter_id)
+    )
+
+    metadata = {
+        "countryFilterId": country_filter_id,
+        "manufacturerId": manufacturer_id,
+        "modelId": model_id,
+        "vehicleId": vehicle_id
+    }
+    await async_restapi.in_thread(memo.put, _RESOLUTION_MEMO, resolution_key, metadata, VEHICLE_RESOLUTION_TTL_HOURS)
+    return metadata
+
+
+async def main(vehicles: List[Dict[str, Any]], include_categories: bool = False) -> Dict[str, Any]:
+    """
+    Resolve many vehicles to their catalog IDs at once, as in fleet imports.
+
+    Vehicles are resolved concurrently on the async workflow
+    (lookup_categories_async). Each distinct stage runs once for the whole
+    batch: a memo lookup per resolution key, the manufacturer lookup per make,
+    the model selection per manufacturer and model fields, the vehicle selection
+    per model and engine fields, and the categories per vehicle ID. Failures
+    are reported per vehicle and do not stop the others.
+
+    Speculative prefetch (see lookup_categories_async._speculate) is off:
+    while one vehicle waits on the LLM, the others keep the per-host
+    semaphore busy with requests the batch needs, which guesses would only
+    delay.
+
+    Args:
+        vehicles: vehicle_info dictionaries (see lookup_categories.main)
+        include_categories: Also return each vehicle's parts categories tree
+
+    Returns:
+        Dictionary with resolved/failed totals, the number of distinct stages
+        run, and a result per vehicle, in input order, holding its metadata
+        (and categories) or an error
+    """
+    stages = _SharedStages()
+
+    async def resolve(index: int, vehicle_info: Any) -> Dict[str, Any]:
+        try:
+            if not isinstance(vehicle_info, dict):
+                raise ValueError("vehicle_info must be an object")
+
+            result = {"index": index, "metadata": await _resolve_one(vehicle_info, stages)}
+            if include_categories:
+                vehicle_id = result["metadata"]["vehicleId"]
+                result["categories"] = await stages.run("categories", vehicle_id,
+                                                        lambda: _get_categories(TYPE_ID, LANG_ID, vehicle_id))
+            return result
+
+        except Exception as e:
+            print(f"Warning: Failed to resolve vehicle {index}: {str(e)}")
+            return {"index": index, "error": str(e)}
+
+    results = await asyncio.gather(*(resolve(index, vehicle) for index, vehicle in enumerate(vehicles)))
+
+    failed = sum(1 for result in results if "error" in result)
+    print(f"Resolved {len(results) - failed} of {len(results)} vehicles with stages {dict(stages.counts)}")
+    return {
+        "resolved": len(results) - failed,
+        "failed": failed,
+        "stages": dict(stages.counts),
+        "results": results
+    }
+
+
+def lambda_handler(event, context):
+    """
+    AWS Lambda handler for bulk vehicle resolution.
+
+    Args:
+        event: API Gateway event (or direct invocation) with
+            {"vehicles": [vehicle_info, ...], "include_categories": false}
+        context: Lambda context object
+
+    Returns:
+        Response with the per-vehicle results; partial failures still return 200
+    """
+    # CORS headers
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Credentials': True,
+        'Content-Type': 'application/json'
+    }
+
+    try:
+        # Load secrets from Secrets Manager
+        secret_arn = os.environ.get('SECRET_ARN')
+        if secret_arn:
+            load_secrets(secret_arn)
+
+        # Parse request body (API Gateway) or take the event itself (direct invocation)
+        try:
+            body = json.loads(event['body']) if isinstance(event.get('body'), str) else event
+            vehicles = body['vehicles']
+            include_categories = bool(body.get('include_categories', False))
+        except json.JSONDecodeError as e:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': f'Invalid JSON in request body: {str(e)}'})
+            }
+        except KeyError:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': 'Missing required field: vehicles'})
+            }
+        except (TypeError, AttributeError):
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': 'Request body must be a JSON object'})
+            }
+
+        if not vehicles or not isinstance(vehicles, list):
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': 'Field vehicles must be a non-empty list of vehicle_info objects'})
+            }
+        if len(vehicles) > MAX_VEHICLES:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': f'Too many vehicles: {len(vehicles)} (maximum {MAX_VEHICLES})'})
+            }
+
+        result = async_restapi.run(main(vehicles, include_categories))
+
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': json.dumps(result)
+        }
+
+    except Exception as e:
+        print(f"Error in bulk vehicle resolution: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': json.dumps({'error': 'Bulk vehicle resolution failed', 'details': str(e)})
+        }
+    finally:
+        # Land queued cache and memo writes before the container is frozen
+        _flush_cache_writes()
+        cache_stats.end_invocation(context)
+
+
+if __name__ == '__main__':
+    # Usage (from this directory, with the layer on PYTHONPATH):
+    #   PYTHONPATH=../lambda_layers/lambda_utils python resolve_batch.py vehicles.json
+    with open(sys.argv[1], 'r') as f:
+        print(json.dumps(async_restapi.run(main(json.load(f))), indent=2))
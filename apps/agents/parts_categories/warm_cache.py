@@ -0,0 +1,193 @@
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Union
+import requests
+from lib.secrets import load_secrets
+from lib import cache_stats
+from lib.restapi import _flush_cache_writes
+from lookup_categories import (
+    TYPE_ID,
+    LANG_ID,
+    _get_country_filter_id,
+    _get_manufacturer_id,
+    _ModelYearIndex,
+    _get_models,
+    _get_vehicle_ids,
+    _get_vehicle_details_batch,
+    _model_candidates,
+    _shortlist_vehicles,
+    _get_categories
+)
+
+
+# Vehicles warmed concurrently; each one already fans out its vehicle-detail
+# requests, so keep this low to stay within the HTTP connection pool
+MAX_WORKERS = int(os.environ.get('CACHE_WARMER_WORKERS', '2'))
+
+# Fields of a positional [make, model, model_year, plant_country] entry
+_TUPLE_FIELDS = ("make", "model", "model_year", "plant_country")
+
+
+def _to_vehicle_info(vehicle: Union[Dict[str, Any], List[Any]]) -> Dict[str, Any]:
+    """
+    Accept a vehicle_info dictionary (as sent to lookup_categories) or a
+    [make, model, model_year, plant_country] list.
+
+    Raises:
+        ValueError: If required fields are missing
+    """
+    if isinstance(vehicle, (list, tuple)):
+        vehicle = dict(zip(_TUPLE_FIELDS, vehicle))
+
+    for field in _TUPLE_FIELDS:
+        if not vehicle.get(field):
+            raise ValueError(f"Required field '{field}' is missing from vehicle")
+
+    return {**vehicle, "model_year": str(vehicle["model_year"])}
+
+
+def _match_models(vehicle_info: Dict[str, Any], models: _ModelYearIndex) -> List[Dict[str, Any]]:
+    """
+    Return the models lookup_categories could pick for the vehicle, matched
+    the same way (see lookup_categories._model_candidates): its confident
+    match, or the candidates it would send to the LLM.
+
+    Raises:
+        ValueError: If no model matches the year
+    """
+    model_id, candidates = _model_candidates(vehicle_info, models)
+    if model_id is None:
+        return candidates
+    return [model for model in models.alive_in(int(vehicle_info["model_year"])) if model["modelId"] == model_id]
+
+
+def warm_vehicle(vehicle_info: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Fetch and cache everything lookup_categories needs for one vehicle:
+    manufacturers, models, vehicle lists and details for every candidate
+    model, and categories for every vehicle passing the year/spec filters.
+
+    No LLM calls are made; all candidates the LLM could pick are warmed instead.
+    Expired entries are refreshed synchronously rather than served stale.
+
+    Args:
+        vehicle_info: Vehicle information (make, model, model_year,
+            plant_country and optionally engine_number_of_cylinders and
+            fuel_type_-_primary to narrow the vehicles)
+
+    Returns:
+        Counts of models, vehicles and category trees warmed
+
+    Raises:
+        ValueError: If the vehicle cannot be resolved to any model
+        RuntimeError: If the manufacturer or model lookup fails
+    """
+    country_filter_id = _get_country_filter_id(vehicle_info["plant_country"])
+    manufacturer_id = _get_manufacturer_id(vehicle_info["make"], TYPE_ID, country_filter_id)
+
+    models = _get_models(TYPE_ID, LANG_ID, country_filter_id, manufacturer_id,
+                         stale_while_revalidate=False)
+    models = _match_models(vehicle_info, models)
+
+    counts = {"models": len(models), "vehicles": 0, "categories": 0}
+    for model in models:
+        try:
+            vehicle_ids = _get_vehicle_ids(TYPE_ID, model["modelId"], LANG_ID, country_filter_id,
+                                           stale_while_revalidate=False)
+        except (ValueError, requests.RequestException) as e:
+            print(f"Skipping model {model['modelName']}: {str(e)}")
+            continue
+
+        details_by_id = _get_vehicle_details_batch(vehicle_ids, TYPE_ID, LANG_ID, country_filter_id,
+                                                   stale_while_revalidate=False)
+        counts["vehicles"] += len(details_by_id)
+
+        for vehicle_id in _shortlist_vehicles(vehicle_info, vehicle_ids, details_by_id):
+            try:
+                _get_categories(TYPE_ID, LANG_ID, vehicle_id, stale_while_revalidate=False)
+                counts["categories"] += 1
+            except RuntimeError as e:
+                print(f"Warning: Skipping categories for vehicle ID {vehicle_id}: {str(e)}")
+
+    return counts
+
+
+def main(vehicles: List[Union[Dict[str, Any], List[Any]]], max_workers: int = MAX_WORKERS) -> Dict[str, Any]:
+    """
+    Warm the API cache for a list of popular vehicles. Failures are reported
+    per vehicle and do not stop the others.
+
+    Args:
+        vehicles: vehicle_info dictionaries or [make, model, model_year, plant_country] lists
+        max_workers: Vehicles warmed concurrently
+
+    Returns:
+        Dictionary with warmed/failed totals and a result per vehicle
+    """
+    def warm(vehicle):
+        label = vehicle if isinstance(vehicle, (list, tuple)) else [vehicle.get(f) for f in _TUPLE_FIELDS]
+        label = " ".join(str(part) for part in label)
+        try:
+            counts = warm_vehicle(_to_vehicle_info(vehicle))
+            print(f"Warmed {label}: {counts}")
+            return {"vehicle": label, **counts}
+        except Exception as e:
+            print(f"Warning: Failed to warm {label}: {str(e)}")
+            return {"vehicle": label, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        results = list(executor.map(warm, vehicles))
+
+    failed = sum(1 for result in results if "error" in result)
+    return {"warmed": len(results) - failed, "failed": failed, "results": results}
+
+
+def lambda_handler(event, context):
+    """
+    AWS Lambda handler for the cache warmer. Nothing schedules it; invoke it
+    directly (e.g. aws lambda invoke) with the vehicles to warm.
+
+    Args:
+        event: {"vehicles": [...]}, directly or as a JSON body
+        context: Lambda context object
+
+    Returns:
+        Response with the warm-up summary
+    """
+    try:
+        # Load secrets from Secrets Manager
+        secret_arn = os.environ.get('SECRET_ARN')
+        if secret_arn:
+            load_secrets(secret_arn)
+
+        body = json.loads(event['body']) if isinstance(event.get('body'), str) else event
+        vehicles = body.get('vehicles')
+        if not vehicles:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': 'Missing required field: vehicles'})
+            }
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps(main(vehicles))
+        }
+
+    except Exception as e:
+        print(f"Error in cache warmer: {str(e)}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': 'Cache warm-up failed', 'details': str(e)})
+        }
+    finally:
+        _flush_cache_writes()
+        cache_stats.end_invocation(context)
+
+
+if __name__ == '__main__':
+    # Usage (from this directory, with the layer on PYTHONPATH):
+    #   PYTHONPATH=../lambda_layers/lambda_utils python warm_cache.py vehicles.json
+    with open(sys.argv[1], 'r') as f:
+        print(json.dumps(main(json.load(f)), indent=2))
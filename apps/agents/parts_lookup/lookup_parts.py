@@ -3,6 +3,8 @@ import os
 from typing import List, Dict, Any
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from lib.secrets import load_secrets
+from lib import cache_stats
+from lib.restapi import _flush_cache_writes
 from parts_agent import run_workflow
 
 
@@ -419,3 +421,8 @@ def lambda_handler(event, context):
                 'details': str(e)
             })
         }
+    finally:
+        # Land queued cache writes before the container is frozen, then
+        # emit per-invocation API cache metrics
+        _flush_cache_writes()
+        cache_stats.end_invocation(context)
@@ -1,25 +1,18 @@
-import json
 import os
 from lib import openai_client
-from lib.restapi import _cached_api_request
+from lib import registry
+from lib.restapi import _cached_api_data
 
 
-def _load_prompts() -> dict:
-    """
-    Load prompts from prompts.json file.
+# Only these article fields are used by the agent; the cache stores just these
+ARTICLES_PROJECTION = {
+    'countArticles': None,
+    'articles': ['articleId', 'articleProductName']
+}
 
-    Returns:
-        Dictionary containing prompt templates
 
-    Raises:
-        RuntimeError: If prompts file cannot be loaded
-    """
-    try:
-        prompts_path = os.path.join(os.path.dirname(__file__), 'prompts.json')
-        with open(prompts_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        raise RuntimeError(f"Failed to load prompts: {str(e)}")
+# Loaded once per container through lib.registry
+_PROMPTS_PATH = os.path.join(os.path.dirname(__file__), 'prompts.json')
 
 
 def infer_category_node(state):
@@ -33,7 +26,7 @@ def infer_category_node(state):
         Updated state with category_id
     """
     try:
-        prompts = _load_prompts()
+        prompts = registry.load_prompts(_PROMPTS_PATH)
 
         # Build the user prompt with part description and categories
         # Categories are already in markdown format from lookup_parts.py
@@ -145,8 +138,8 @@ def get_parts_list_node(state):
         print(f"Calling REST API for category ID: {category_id}")
 
         # Make cached API request
-        response = _cached_api_request(url, headers)
-        data = response.json()
+        data = _cached_api_data(url, headers, stale_while_revalidate=True,
+                                projection=ARTICLES_PROJECTION)
 
         # Extract articles list from response
         parts_list = data.get('articles', [])
@@ -156,7 +149,7 @@ def get_parts_list_node(state):
 
         if not parts_list or count_articles == 0:
             # API returned no parts - add invalid_category message to chat
-            prompts = _load_prompts()
+            prompts = registry.load_prompts(_PROMPTS_PATH)
 
             updated_history = state.get('chat_history', []).copy()
             updated_history.append({
@@ -182,7 +175,7 @@ def get_parts_list_node(state):
         print(f"Error in get_parts_list_node: {str(e)}")
 
         # Add error message to chat history
-        prompts = _load_prompts()
+        prompts = registry.load_prompts(_PROMPTS_PATH)
         updated_history = state.get('chat_history', []).copy()
         updated_history.append({
             'role': 'user',
@@ -261,8 +254,7 @@ def get_part_details_node(state):
                 }
 
                 # Make cached API request
-                response = _cached_api_request(url, headers)
-                data = response.json()
+                data = _cached_api_data(url, headers, stale_while_revalidate=True)
 
                 # Get article details
                 article_details = data.get('article', {})
@@ -368,7 +360,7 @@ def match_part_node(state):
             }
 
         # Multiple parts - use LLM to match
-        prompts = _load_prompts()
+        prompts = registry.load_prompts(_PROMPTS_PATH)
 
         # Format the parts list as bullet list
         parts_text = "\n".join([f"- {part}" for part in unique_parts])
@@ -4,24 +4,11 @@ import base64
 from typing import List
 from lib.secrets import load_secrets
 from lib import openai_client
+from lib import registry
 
 
-def _load_prompts() -> dict:
-    """
-    Load prompts from prompts.json file.
-
-    Returns:
-        Dictionary containing prompt templates
-
-    Raises:
-        RuntimeError: If prompts file cannot be loaded
-    """
-    try:
-        prompts_path = os.path.join(os.path.dirname(__file__), 'prompts.json')
-        with open(prompts_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        raise RuntimeError(f"Failed to load prompts: {str(e)}")
+# Loaded once per container through lib.registry
+_PROMPTS_PATH = os.path.join(os.path.dirname(__file__), 'prompts.json')
 
 
 def detect_objects(image_bytes: bytes) -> List[str]:
@@ -38,7 +25,7 @@ def detect_objects(image_bytes: bytes) -> List[str]:
         RuntimeError: If LLM call fails
     """
     try:
-        prompts = _load_prompts()
+        prompts = registry.load_prompts(_PROMPTS_PATH)
 
         # Combine system prompt and user prompt into single instructions
         instructions = f"{prompts['system']}\n\n{prompts['detect_objects']}"
@@ -0,0 +1,76 @@
+"""
+Measure the effect of compressed cache storage on DynamoDB item size, read
+capacity units and payload decode time, using an api_cache.json snapshot.
+
+Usage:
+    python scripts/bench_cache_encoding.py [path/to/api_cache.json]
+"""
+import json
+import math
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda_layers', 'lambda_utils'))
+from lib import restapi  # noqa: E402
+
+
+DEFAULT_SNAPSHOT = os.path.join(os.path.dirname(__file__), '..', 'parts_categories', 'api_cache.json')
+RCU_BYTES = 4 * 1024
+REPEATS = 50
+
+
+def _read_units(size: int) -> int:
+    """Strongly consistent read capacity units for an item of the given size."""
+    return max(1, math.ceil(size / RCU_BYTES))
+
+
+def _time_per_call(fn, repeats: int = REPEATS) -> float:
+    """Average wall time of fn in microseconds."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main(snapshot_path: str) -> None:
+    with open(snapshot_path, 'r') as f:
+        snapshot = json.load(f)
+
+    totals = {'plain_bytes': 0, 'zlib_bytes': 0, 'plain_rcu': 0, 'zlib_rcu': 0,
+              'plain_us': 0.0, 'zlib_us': 0.0, 'chunked': 0}
+
+    print(f"{'endpoint':<40} {'plain KB':>9} {'zlib KB':>8} {'ratio':>6} {'RCU':>9} {'decode us':>16}")
+    for entry in snapshot.values():
+        text = entry['content']
+        plain = text.encode('utf-8')
+        compressed = zlib.compress(plain, restapi._COMPRESSION_LEVEL)
+
+        plain_us = _time_per_call(lambda: text.encode('utf-8'))
+        zlib_us = _time_per_call(lambda: zlib.decompress(compressed))
+
+        totals['plain_bytes'] += len(plain)
+        totals['zlib_bytes'] += len(compressed)
+        totals['plain_rcu'] += _read_units(len(plain))
+        totals['zlib_rcu'] += _read_units(len(compressed))
+        totals['plain_us'] += plain_us
+        totals['zlib_us'] += zlib_us
+        totals['chunked'] += len(compressed) > restapi._CHUNK_BYTES
+
+        endpoint = entry['url'].split('.rapidapi.com/')[-1][:40]
+        print(f"{endpoint:<40} {len(plain) / 1024:>9.1f} {len(compressed) / 1024:>8.1f} "
+              f"{len(plain) / len(compressed):>6.1f} "
+              f"{_read_units(len(plain)):>4}->{_read_units(len(compressed)):<4} "
+              f"{plain_us:>7.1f}->{zlib_us:<7.1f}")
+
+    print()
+    print(f"Entries: {len(snapshot)} (chunked after compression: {totals['chunked']})")
+    print(f"Stored bytes: {totals['plain_bytes'] / 1024:.1f} KB -> {totals['zlib_bytes'] / 1024:.1f} KB "
+          f"({totals['plain_bytes'] / totals['zlib_bytes']:.1f}x smaller)")
+    print(f"Read units for one pass: {totals['plain_rcu']} -> {totals['zlib_rcu']}")
+    print(f"Decode time for one pass: {totals['plain_us'] / 1000:.2f} ms -> {totals['zlib_us'] / 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SNAPSHOT)
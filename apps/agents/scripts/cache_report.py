@@ -0,0 +1,79 @@
+"""
+Offline report over the API cache table: entry counts and stored bytes per
+endpoint family, and the hottest and largest keys.
+
+Hit counts come from the hitCount attribute, which the Lambdas maintain when
+API_CACHE_TRACK_HITS is enabled. Memo entries (lib.memo) are reported under
+their memo name.
+
+Usage:
+    python scripts/cache_report.py [--table Hp-ApiCache-Table] [--top 20]
+"""
+import argparse
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda_layers', 'lambda_utils'))
+from lib import restapi  # noqa: E402
+
+
+def _scan_entries(table_name: str):
+    """Yield primary cache items (lease and chunk items are skipped)."""
+    table = boto3.resource('dynamodb').Table(table_name)
+    scan_kwargs = {
+        'ProjectionExpression': 'cacheKey, #u, #s, chunks, hitCount, lastHit, negative, #t, memo, memoKey',
+        'ExpressionAttributeNames': {'#u': 'url', '#s': 'size', '#t': 'ttl'}
+    }
+
+    while True:
+        page = table.scan(**scan_kwargs)
+        for item in page.get('Items', []):
+            key = item['cacheKey']
+            if key.startswith('lease#') or '#chunk' in key:
+                continue
+            yield item
+
+        if 'LastEvaluatedKey' not in page:
+            break
+        scan_kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+
+def main(table_name: str, top: int) -> None:
+    entries = list(_scan_entries(table_name))
+    now = int(datetime.now().timestamp())
+
+    families = defaultdict(lambda: {'entries': 0, 'expired': 0, 'negative': 0, 'bytes': 0, 'hits': 0})
+    for item in entries:
+        family = families[item.get('memo') or restapi.endpoint_family(item.get('url', ''))]
+        family['entries'] += 1
+        family['expired'] += int(item.get('ttl', 0)) <= now
+        family['negative'] += bool(item.get('negative'))
+        family['bytes'] += int(item.get('size', 0))
+        family['hits'] += int(item.get('hitCount', 0))
+
+    print(f"Table {table_name}: {len(entries)} entries\n")
+    print(f"{'family':<18} {'entries':>8} {'expired':>8} {'negative':>9} {'MB':>8} {'hits':>8}")
+    for name, family in sorted(families.items(), key=lambda kv: -kv[1]['hits']):
+        print(f"{name:<18} {family['entries']:>8} {family['expired']:>8} {family['negative']:>9} "
+              f"{family['bytes'] / 1024 / 1024:>8.2f} {family['hits']:>8}")
+
+    print(f"\nHottest {top} keys:")
+    for item in sorted(entries, key=lambda i: -int(i.get('hitCount', 0)))[:top]:
+        print(f"  {int(item.get('hitCount', 0)):>7} hits  {item.get('lastHit', '-'):<26}  {item.get('url') or item.get('memoKey')}")
+
+    print(f"\nLargest {top} keys:")
+    for item in sorted(entries, key=lambda i: -int(i.get('size', 0)))[:top]:
+        chunks = f" ({int(item['chunks'])} chunks)" if 'chunks' in item else ''
+        print(f"  {int(item.get('size', 0)) / 1024:>8.1f} KB{chunks}  {item.get('url') or item.get('memoKey')}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report on API cache table usage.')
+    parser.add_argument('--table', default=os.environ.get('API_CACHE_TABLE', 'Hp-ApiCache-Table'))
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+    main(args.table, args.top)
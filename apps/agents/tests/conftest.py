@@ -0,0 +1,104 @@
+import os
+import sys
+
+import pytest
+import requests
+
+# Keep the suite off the /tmp disk tier and AWS; set before the modules read them
+os.environ['API_CACHE_DISK_MB'] = '0'
+os.environ['API_CACHE_TABLE'] = 'Hp-ApiCache-Table-Test'
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+_AGENTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_AGENTS_DIR, 'lambda_layers', 'lambda_utils'))
+sys.path.insert(0, os.path.join(_AGENTS_DIR, 'parts_categories'))
+
+from botocore.exceptions import ClientError  # noqa: E402
+from lib import restapi, transport  # noqa: E402
+
+
+class FakeTable:
+    """In-memory stand-in for the cache table, recording every write."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = {}
+        self.puts = []
+        self.deletes = []
+
+    def get_item(self, Key, **kwargs):
+        item = self.items.get(Key['cacheKey'])
+        return {'Item': item} if item is not None else {}
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeValues=None):
+        current = self.items.get(Item['cacheKey'])
+        if ConditionExpression and current is not None and current['leaseExpires'] >= ExpressionAttributeValues[':now']:
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'PutItem')
+        self.puts.append(Item['cacheKey'])
+        self.items[Item['cacheKey']] = Item
+
+    def delete_item(self, Key, ConditionExpression=None, ExpressionAttributeValues=None):
+        self.deletes.append(Key['cacheKey'])
+        self.items.pop(Key['cacheKey'], None)
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _FakeBatchWriter(self)
+
+
+class _FakeBatchWriter:
+    def __init__(self, table: FakeTable):
+        self.table = table
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def put_item(self, Item):
+        self.table.put_item(Item=Item)
+
+
+class FakeDynamoDB:
+    def __init__(self, table: FakeTable):
+        self.table = table
+
+    def Table(self, name):
+        return self.table
+
+    def batch_get_item(self, RequestItems):
+        (name, spec), = RequestItems.items()
+        found = [self.table.items[key['cacheKey']] for key in spec['Keys'] if key['cacheKey'] in self.table.items]
+        return {'Responses': {name: found}, 'UnprocessedKeys': {}}
+
+
+@pytest.fixture
+def cache_table(monkeypatch):
+    """Fake cache table behind boto3, with empty container-local tiers."""
+    table = FakeTable(os.environ['API_CACHE_TABLE'])
+    monkeypatch.setattr(restapi.boto3, 'resource', lambda *args, **kwargs: FakeDynamoDB(table))
+    restapi.memory_cache.clear()
+    yield table
+    restapi._flush_cache_writes()
+    restapi.memory_cache.clear()
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fake upstream API: serves JSON bodies from a dict and records requested URLs."""
+    bodies = {}
+    requested = []
+
+    def get(url, headers):
+        requested.append(url)
+        response = requests.Response()
+        response.status_code = 200 if url in bodies else 404
+        response._content = bodies.get(url, b'{}')
+        response.headers['Content-Type'] = 'application/json'
+        response.url = url
+        return response
+
+    monkeypatch.setattr(transport, 'get', get)
+    get.bodies = bodies
+    get.requested = requested
+    return get
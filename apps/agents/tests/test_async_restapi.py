@@ -0,0 +1,50 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from lib import async_restapi
+from lib import openai_client
+from lib import restapi
+
+HEADERS = {'x-rapidapi-host': 'auto-parts-catalog.p.rapidapi.com'}
+
+
+def test_disk_tier_reads_do_not_block_the_event_loop(cache_table, monkeypatch):
+    def slow_local_get(cache_key):
+        time.sleep(0.2)
+        return 'disk', (200, b'{"ok": true}', {'Content-Type': 'application/json'})
+
+    monkeypatch.setattr(restapi, '_local_get', slow_local_get)
+    urls = [f'https://auto-parts-catalog.p.rapidapi.com/manufacturers/list/type-id/{i}' for i in range(5)]
+
+    start = time.perf_counter()
+    results = async_restapi.run(async_restapi.cached_api_data_many(urls, HEADERS))
+
+    assert results == {url: {'ok': True} for url in urls}
+    assert time.perf_counter() - start < 0.6
+
+
+def test_async_openai_client_is_reused_per_event_loop(monkeypatch):
+    clients = []
+
+    class FakeAsyncOpenAI:
+        def __init__(self):
+            clients.append(self)
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+        async def create(self, **kwargs):
+            message = SimpleNamespace(content=kwargs['model'])
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(openai_client, 'AsyncOpenAI', FakeAsyncOpenAI)
+    monkeypatch.setattr(openai_client, '_async_client', None)
+    messages = [{'role': 'user', 'content': 'hi'}]
+
+    async def twice():
+        return [await openai_client.invoke_model_text_async(messages) for _ in range(2)]
+
+    assert async_restapi.run(twice()) == [openai_client.default_model] * 2
+    assert len(clients) == 1
+
+    asyncio.run(twice())
+    assert len(clients) == 2
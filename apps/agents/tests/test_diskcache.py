@@ -0,0 +1,66 @@
+import os
+import time
+
+import pytest
+
+from lib import diskcache
+
+LARGE = os.urandom(diskcache._INLINE_MAX_BYTES + 1)
+
+
+@pytest.fixture
+def disk(tmp_path):
+    return diskcache.DiskCache(str(tmp_path), max_bytes=3 * len(LARGE))
+
+
+def _expires_in(seconds):
+    return int(time.time()) + seconds
+
+
+@pytest.mark.parametrize('content', [b'{"small": true}', LARGE])
+def test_entries_round_trip(disk, content):
+    expires_at = _expires_in(60)
+    disk.put('key', expires_at, 200, content, {'Content-Type': 'application/json'})
+
+    assert disk.get('key') == (expires_at, 200, content, {'Content-Type': 'application/json'})
+
+
+def test_expired_entries_are_misses(disk):
+    disk.put('key', _expires_in(-1), 200, LARGE, {})
+
+    assert disk.get('key') is None
+    assert disk.current_bytes == 0
+
+
+def test_least_recently_used_entries_are_evicted_past_the_budget(disk):
+    for key in ('a', 'b', 'c'):
+        disk.put(key, _expires_in(60), 200, LARGE, {})
+    disk.get('a')
+
+    disk.put('d', _expires_in(60), 200, LARGE, {})
+
+    assert disk.get('b') is None
+    assert [disk.get(key) is not None for key in ('a', 'c', 'd')] == [True, True, True]
+    assert disk.current_bytes == 3 * len(LARGE)
+
+
+def test_expired_entries_are_evicted_before_live_ones(disk):
+    disk.put('expired', _expires_in(-1), 200, LARGE, {})
+    disk.put('a', _expires_in(60), 200, LARGE, {})
+    disk.put('b', _expires_in(60), 200, LARGE, {})
+
+    disk.put('c', _expires_in(60), 200, LARGE, {})
+
+    assert not os.path.exists(disk._blob_path('expired'))
+    assert [disk.get(key) is not None for key in ('a', 'b', 'c')] == [True, True, True]
+
+
+def test_entry_with_missing_payload_file_is_dropped(disk):
+    disk.put('key', _expires_in(60), 200, LARGE, {})
+    os.remove(disk._blob_path('key'))
+
+    assert disk.get('key') is None
+    assert disk.current_bytes == 0
+
+    disk.put('key', _expires_in(60), 200, LARGE, {})
+    assert disk.get('key')[2] == LARGE
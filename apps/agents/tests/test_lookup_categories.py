@@ -0,0 +1,110 @@
+from concurrent.futures import Future
+
+import pytest
+
+import lookup_categories as lc
+from lib import memo
+from lib import openai_client
+
+VIN = {"make": "BMW", "model": "5-Series", "model_year": "2019", "plant_country": "GERMANY",
+       "displacement_(l)": "2.0", "drive_type": "RWD/Rear-Wheel Drive", "series": "520i"}
+
+
+def _vehicle(engine_name, litres="2.0000", drive="Rear-Wheel Drive"):
+    return {"typeEngineName": engine_name, "capacityLt": litres, "driveType": drive,
+            "constructionIntervalStart": "2016-09-01", "constructionIntervalEnd": "2023-06-01"}
+
+
+def test_vehicle_top_k_never_splits_a_tie(monkeypatch):
+    monkeypatch.setattr(lc, "VEHICLE_LLM_TOP_K", 3)
+    # Five variants tie for the best score, listed with the VIN's 520i last
+    shortlisted = {vid: _vehicle(name) for vid, name in
+                   [(105, "530 i"), (104, "520 d"), (103, "518 d"), (102, "525 d"), (101, "520 i")]}
+    shortlisted[200] = _vehicle("520 d xDrive", drive="All-Wheel Drive")
+    shortlisted[300] = _vehicle("540 i", litres="3.0000")
+    # Within the score window but below the best, so the cap applies to it
+    shortlisted[400] = _vehicle("520 i", litres="2.1000")
+
+    vehicle_id, candidates, best_vehicle_id = lc._vehicle_candidates(VIN, shortlisted)
+
+    assert vehicle_id is None
+    assert list(candidates) == [101, 102, 103, 104, 105]
+    assert best_vehicle_id == 101
+
+
+def test_tied_perfect_matches_do_not_stop_detail_fetching():
+    vin = {**VIN, "engine_power_(kw)": "135"}
+    perfect_score = lc._max_vehicle_score(vin)
+    tied = {1: {**_vehicle("520 i"), "powerKw": "135"}, 2: {**_vehicle("520 d"), "powerKw": "135"}}
+    leading = {1: tied[1], 3: {**_vehicle("530 i"), "powerKw": "185"}}
+
+    assert not lc._shortlist_decided(vin, tied, perfect_score)
+    assert not lc._shortlist_decided(vin, {1: tied[1]}, perfect_score)
+    assert lc._shortlist_decided(vin, leading, perfect_score)
+
+
+def test_detail_fetching_does_not_stop_on_a_leader_an_unfetched_vehicle_ties(monkeypatch):
+    vin = {**VIN, "series": "530i", "fuel_type_-_primary": "Gasoline"}
+    details = {1: {**_vehicle("520 i"), "fuelType": "Petrol"},
+               2: {**_vehicle("520 d"), "fuelType": "Diesel"},
+               3: {**_vehicle("530 i"), "fuelType": "Petrol"}}
+    monkeypatch.setattr(lc, "VEHICLE_DETAILS_WAVE_SIZE", 2)
+    monkeypatch.setattr(lc, "_known_vehicles", lambda ids, country_filter_id: {})
+    monkeypatch.setattr(lc, "_get_vehicle_details_batch", lambda ids, *args: {vid: details[vid] for vid in ids})
+
+    shortlisted = lc._find_vehicle_candidates(vin, [1, 2, 3], lc.TYPE_ID, lc.LANG_ID, 63)
+    vehicle_id, candidates, _ = lc._vehicle_candidates(vin, shortlisted)
+
+    assert list(shortlisted) == [1, 2, 3]
+    assert vehicle_id is None
+    assert list(candidates) == [3, 1]
+
+
+def test_detail_wave_size_is_read_at_call_time(monkeypatch):
+    waves = []
+    monkeypatch.setattr(lc, "VEHICLE_DETAILS_WAVE_SIZE", 2)
+    monkeypatch.setattr(lc, "_get_vehicle_details_batch", lambda ids, *args: waves.append(ids) or {})
+
+    list(lc._iter_vehicle_details([1, 2, 3, 4, 5], lc.TYPE_ID, lc.LANG_ID, 63))
+
+    assert waves == [[1, 2], [3, 4], [5]]
+
+
+def test_vins_differing_only_in_power_do_not_share_a_memo_entry(cache_table):
+    vin_135 = {**VIN, "engine_power_(kw)": "135"}
+    vin_140 = {**VIN, "engine_power_(kw)": "140"}
+    metadata = {"countryFilterId": 63, "manufacturerId": 16, "modelId": 37157, "vehicleId": 128091}
+
+    memo.put(lc._RESOLUTION_MEMO, lc._resolution_key(vin_135), metadata, 1)
+
+    assert memo.get(lc._RESOLUTION_MEMO, lc._resolution_key({**vin_135, "engine_power_(kw)": "135.0"})) == metadata
+    assert memo.get(lc._RESOLUTION_MEMO, lc._resolution_key(vin_140)) is None
+
+
+def test_resolution_key_covers_every_field_the_selection_stages_read():
+    for field in lc._MODEL_PROMPT_FIELDS + lc._VEHICLE_PROMPT_FIELDS + ("make", "plant_country", "series", "trim"):
+        assert field in lc._RESOLUTION_KEY_FIELDS
+
+
+def test_speculation_is_discarded_when_llm_selection_fails(monkeypatch):
+    pending = {}
+    candidates = [{"modelId": 1}, {"modelId": 2}]
+
+    def speculate(label, fn, *args):
+        pending[label] = Future()
+        return pending[label]
+
+    def invoke_model_text(messages):
+        raise TimeoutError("LLM timed out")
+
+    monkeypatch.setattr(lc, "SPECULATIVE_MODELS", 2)
+    monkeypatch.setattr(lc, "_speculate", speculate)
+    monkeypatch.setattr(lc, "_get_models", lambda *args: {})
+    monkeypatch.setattr(lc, "_model_candidates", lambda vehicle_info, models: (None, candidates))
+    monkeypatch.setattr(lc, "_select_model_prompt", lambda vehicle_info, candidates: "prompt")
+    monkeypatch.setattr(openai_client, "invoke_model_text", invoke_model_text)
+
+    with pytest.raises(RuntimeError, match="LLM timed out"):
+        lc._get_model_id(VIN, lc.TYPE_ID, lc.LANG_ID, 63, 16)
+
+    assert len(pending) == 2 and all(future.cancelled() for future in pending.values())
@@ -0,0 +1,28 @@
+import threading
+
+import lookup_categories_async as lca
+from lib import async_restapi
+from lib import memo
+
+VIN = {"make": "BMW", "model": "5-Series", "model_year": "2019", "plant_country": "GERMANY"}
+
+
+def test_resolution_memo_is_read_and_written_off_the_event_loop(monkeypatch):
+    threads = []
+
+    async def stage(*args):
+        return 1
+
+    def record_thread(*args):
+        threads.append(threading.current_thread())
+
+    monkeypatch.setattr(lca, "_get_manufacturer_id", stage)
+    monkeypatch.setattr(lca, "_get_model_id", stage)
+    monkeypatch.setattr(lca, "_get_vehicle_id", stage)
+    monkeypatch.setattr(memo, "get", record_thread)
+    monkeypatch.setattr(memo, "put", record_thread)
+
+    async_restapi.run(lca._resolve_vehicle(VIN))
+
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from lib import projection
+
+ijson = pytest.importorskip('ijson')
+
+ARTICLES = {
+    'countArticles': 2,
+    'articles': [
+        {'articleId': 1, 'articleProductName': 'Brake Pad', 'price': 12.5,
+         'criteria': [{'name': 'Width', 'value': '120'}], 'images': ['a.jpg']},
+        {'articleId': 2, 'articleProductName': 'Brake Disc', 'price': None},
+    ],
+    'debug': {'articles': [{'articleId': 'not this one'}], 'trace': [1, 2, 3]},
+}
+
+CASES = [
+    # List of objects, with nested values kept whole and missing fields skipped
+    (ARTICLES, {'countArticles': None, 'articles': ['articleId', 'criteria', 'price', 'missing']}),
+    # Whole nested values
+    (ARTICLES, {'debug': None}),
+    # A single object, and keys absent from the document
+    ({'vehicle': {'id': 7, 'name': '520i', 'engine': {'kw': 135}}, 'extra': True},
+     {'vehicle': ['name', 'engine'], 'absent': None}),
+    # Scalars and scalar list elements under a field projection
+    ({'total': 3.25, 'ids': [1, 2, 3], 'mixed': [{'id': 1, 'x': 0}, 4]},
+     {'total': ['id'], 'ids': ['id'], 'mixed': ['id']}),
+]
+
+
+@pytest.mark.parametrize('document, fields', CASES)
+def test_streaming_and_loaded_projections_agree(document, fields):
+    content = json.dumps(document).encode('utf-8')
+
+    streamed = projection._project_stream(content, fields)
+
+    assert streamed == projection._project_loaded(content, fields)
+
+
+def test_large_bodies_are_projected_from_the_stream(monkeypatch):
+    content = json.dumps(ARTICLES).encode('utf-8')
+    fields = {'articles': ['articleId', 'articleProductName']}
+    loaded = projection.apply(content, fields)
+
+    def no_load(*args):
+        raise AssertionError('parsed the whole document')
+
+    monkeypatch.setattr(projection, '_STREAM_MIN_BYTES', 0)
+    monkeypatch.setattr(projection, '_project_loaded', no_load)
+
+    assert projection.apply(content, fields) == loaded
+    assert json.loads(loaded) == {'articles': [{'articleId': 1, 'articleProductName': 'Brake Pad'},
+                                               {'articleId': 2, 'articleProductName': 'Brake Disc'}]}
+
+
+@pytest.mark.parametrize('stream_min_bytes', [0, projection._STREAM_MIN_BYTES])
+@pytest.mark.parametrize('content', [b'[{"articleId": 1}]', b'{"articles": [{"articleId": 1}'])
+def test_invalid_bodies_raise_value_error_on_both_paths(monkeypatch, stream_min_bytes, content):
+    monkeypatch.setattr(projection, '_STREAM_MIN_BYTES', stream_min_bytes)
+
+    with pytest.raises(ValueError):
+        projection.apply(content, {'articles': ['articleId']})
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from lib import registry
+
+
+@pytest.fixture
+def prompts_file(tmp_path):
+    path = tmp_path / 'prompts.json'
+    path.write_text(json.dumps({'verify': 'Is {part} in the photo? Examples of {part}: {examples}',
+                                'system': 'You are a parts expert.'}))
+    yield str(path)
+    registry.reload()
+
+
+def test_templates_format_with_exactly_their_placeholders(prompts_file):
+    prompts = registry.load_prompts(prompts_file)
+
+    assert prompts['verify'].fields == {'part', 'examples'}
+    assert prompts['verify'].format(part='brake pad', examples='3') == \
+        'Is brake pad in the photo? Examples of brake pad: 3'
+    assert prompts['system'] == 'You are a parts expert.'
+
+
+def test_missing_and_unexpected_values_are_rejected(prompts_file):
+    prompts = registry.load_prompts(prompts_file)
+
+    with pytest.raises(KeyError, match='examples'):
+        prompts['verify'].format(part='brake pad')
+    with pytest.raises(TypeError, match='exampels'):
+        prompts['verify'].format(part='brake pad', examples='3', exampels='3')
+
+
+def test_malformed_templates_fail_at_load(tmp_path):
+    path = tmp_path / 'prompts.json'
+    path.write_text(json.dumps({'broken': 'Unclosed {part'}))
+
+    with pytest.raises(RuntimeError, match='Failed to load prompts'):
+        registry.load_prompts(str(path))
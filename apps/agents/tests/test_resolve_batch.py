@@ -0,0 +1,20 @@
+import json
+
+import pytest
+
+import resolve_batch
+
+
+@pytest.mark.parametrize('event, error', [
+    ({'body': '{"vehicles": ['}, 'Invalid JSON in request body'),
+    ({'body': '{}'}, 'Missing required field: vehicles'),
+    ({'body': 'null'}, 'Request body must be a JSON object'),
+    ({'body': '[{"make": "BMW"}]'}, 'Request body must be a JSON object'),
+    ({'body': '{"vehicles": {"make": "BMW"}}'}, 'Field vehicles must be a non-empty list'),
+    ({'vehicles': []}, 'Field vehicles must be a non-empty list'),
+])
+def test_malformed_requests_are_rejected_with_400(event, error):
+    response = resolve_batch.lambda_handler(event, None)
+
+    assert response['statusCode'] == 400
+    assert json.loads(response['body'])['error'].startswith(error)
@@ -0,0 +1,225 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+import requests
+
+from lib import restapi
+
+URL = 'https://auto-parts-catalog.p.rapidapi.com/manufacturers/list/type-id/1'
+HEADERS = {'x-rapidapi-host': 'auto-parts-catalog.p.rapidapi.com'}
+
+
+def _lease_writes(table):
+    return [key for key in table.puts + table.deletes if key.startswith('lease#')]
+
+
+def test_cold_miss_takes_no_lease(cache_table, upstream):
+    upstream.bodies[URL] = b'{"manufacturers": []}'
+
+    response = restapi._cached_api_request(URL, HEADERS)
+    restapi._flush_cache_writes()
+
+    assert response.json() == {'manufacturers': []}
+    assert upstream.requested == [URL]
+    assert _lease_writes(cache_table) == []
+    assert cache_table.puts == [restapi.make_cache_key(URL, HEADERS)]
+
+
+def test_expired_entry_refresh_takes_and_releases_lease(cache_table, upstream):
+    upstream.bodies[URL] = b'{"manufacturers": [1]}'
+    cache_key = restapi.make_cache_key(URL, HEADERS)
+    restapi._cached_api_request(URL, HEADERS)
+    restapi._flush_cache_writes()
+    cache_table.items[cache_key]['ttl'] = int(datetime.now().timestamp()) - 1
+    restapi.memory_cache.clear()
+    cache_table.puts.clear()
+
+    restapi._cached_api_request(URL, HEADERS)
+    restapi._flush_cache_writes()
+
+    assert _lease_writes(cache_table) == [restapi._lease_key(cache_key)] * 2
+    assert len(upstream.requested) == 2
+
+
+def test_chunks_are_written_before_primary_item(cache_table, upstream):
+    upstream.bodies[URL] = os.urandom(restapi._CHUNK_BYTES + 1024)
+    cache_key = restapi.make_cache_key(URL, HEADERS)
+
+    restapi._cached_api_request(URL, HEADERS)
+    restapi._flush_cache_writes()
+
+    assert cache_table.puts == [restapi._chunk_key(cache_key, 0), restapi._chunk_key(cache_key, 1), cache_key]
+
+
+def test_primary_item_with_missing_chunks_is_a_miss(cache_table, upstream):
+    body = os.urandom(restapi._CHUNK_BYTES + 1024)
+    upstream.bodies[URL] = body
+    cache_key = restapi.make_cache_key(URL, HEADERS)
+    cache_table.items[cache_key] = {
+        'cacheKey': cache_key,
+        'status_code': 200,
+        'headers': {},
+        'encoding': 'zlib',
+        'chunks': 2,
+        'chunkVersion': 'v1',
+        'ttl': int(datetime.now().timestamp()) + 3600
+    }
+    cache_table.items[restapi._chunk_key(cache_key, 0)] = {
+        'cacheKey': restapi._chunk_key(cache_key, 0), 'body': b'partial', 'chunkVersion': 'v1'
+    }
+
+    response = restapi._cached_api_request(URL, HEADERS)
+
+    assert response.content == body
+    assert upstream.requested == [URL]
+
+
+def test_flush_waits_for_background_revalidation(cache_table, upstream, monkeypatch):
+    upstream.bodies[URL] = b'{"manufacturers": [1]}'
+    cache_key = restapi.make_cache_key(URL, HEADERS)
+    restapi._cached_api_request(URL, HEADERS)
+    restapi._flush_cache_writes()
+    cache_table.items[cache_key]['ttl'] = int(datetime.now().timestamp()) - 1
+    restapi.memory_cache.clear()
+    cache_table.puts.clear()
+
+    fetch = restapi.transport.get
+    monkeypatch.setattr(restapi.transport, 'get', lambda url, headers: time.sleep(0.3) or fetch(url, headers))
+    upstream.bodies[URL] = b'{"manufacturers": [2]}'
+
+    stale = restapi._cached_api_request(URL, HEADERS, stale_while_revalidate=True)
+    assert stale.json() == {'manufacturers': [1]}
+
+    assert restapi._flush_cache_writes() is True
+    assert cache_table.puts == [restapi._lease_key(cache_key), cache_key]
+    assert cache_table.deletes == [restapi._lease_key(cache_key)]
+
+
+class _CountingEvent(threading.Event):
+    """Event that counts the threads waiting on it."""
+
+    waiting = 0
+    _count_lock = threading.Lock()
+
+    def wait(self, timeout=None):
+        with self._count_lock:
+            _CountingEvent.waiting += 1
+        return super().wait(timeout)
+
+
+@pytest.fixture
+def coalesced_callers(monkeypatch):
+    """
+    Run callers concurrently, holding the upstream request until all but the
+    leader are waiting on it.
+    """
+    class InFlightCall(restapi._InFlightCall):
+        def __init__(self):
+            super().__init__()
+            self.done = _CountingEvent()
+
+    monkeypatch.setattr(restapi, '_InFlightCall', InFlightCall)
+    monkeypatch.setattr(_CountingEvent, 'waiting', 0)
+
+    def run(count, fn):
+        fetch = restapi.transport.get
+
+        def held_fetch(url, headers):
+            deadline = time.monotonic() + 5
+            while _CountingEvent.waiting < count - 1 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            return fetch(url, headers)
+
+        monkeypatch.setattr(restapi.transport, 'get', held_fetch)
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            futures = [executor.submit(fn) for _ in range(count)]
+        return futures
+
+    return run
+
+
+def test_concurrent_identical_requests_share_one_upstream_call(cache_table, upstream, coalesced_callers):
+    upstream.bodies[URL] = b'{"manufacturers": [1]}'
+
+    futures = coalesced_callers(3, lambda: restapi._cached_api_request(URL, HEADERS))
+    responses = [future.result() for future in futures]
+    restapi._flush_cache_writes()
+
+    assert upstream.requested == [URL]
+    assert cache_table.puts == [restapi.make_cache_key(URL, HEADERS)]
+    assert [response.json() for response in responses] == [{'manufacturers': [1]}] * 3
+    # Each caller gets its own Response object
+    assert len({id(response) for response in responses}) == 3
+
+
+def test_coalesced_callers_receive_the_leader_error(cache_table, upstream, coalesced_callers, monkeypatch):
+    def refused(url, headers):
+        upstream.requested.append(url)
+        raise requests.ConnectionError('refused')
+
+    monkeypatch.setattr(restapi.transport, 'get', refused)
+
+    futures = coalesced_callers(3, lambda: restapi._cached_api_request(URL, HEADERS))
+
+    for future in futures:
+        with pytest.raises(requests.ConnectionError):
+            future.result()
+    assert upstream.requested == [URL]
+    assert cache_table.puts == []
+
+
+def test_write_behind_writes_queued_responses_in_order_then_releases_leases(cache_table, monkeypatch):
+    queue = restapi._WriteBehindQueue(batch_window_seconds=0.05)
+    written_at_release = []
+    delete_item = cache_table.delete_item
+
+    def release(Key, **kwargs):
+        written_at_release.append(list(cache_table.puts))
+        delete_item(Key, **kwargs)
+
+    monkeypatch.setattr(cache_table, 'delete_item', release)
+
+    queue.put(cache_table, [{'cacheKey': 'a'}])
+    queue.put(cache_table, [{'cacheKey': 'b#chunk0'}, {'cacheKey': 'b'}], lease=('b', 'owner'))
+
+    assert queue.drain(timeout=5) is True
+    assert cache_table.puts == ['a', 'b#chunk0', 'b']
+    assert cache_table.deletes == [restapi._lease_key('b')]
+    assert written_at_release == [['a', 'b#chunk0', 'b']]
+
+
+def test_write_behind_releases_leases_when_the_write_fails(cache_table, monkeypatch):
+    queue = restapi._WriteBehindQueue(batch_window_seconds=0)
+
+    def throttled(Item, **kwargs):
+        raise RuntimeError('throttled')
+
+    monkeypatch.setattr(cache_table, 'put_item', throttled)
+
+    queue.put(cache_table, [{'cacheKey': 'a'}], lease=('a', 'owner'))
+
+    assert queue.drain(timeout=5) is True
+    assert cache_table.deletes == [restapi._lease_key('a')]
+
+
+def test_write_behind_drain_waits_for_the_write_in_progress(cache_table, monkeypatch):
+    queue = restapi._WriteBehindQueue(batch_window_seconds=0)
+    release = threading.Event()
+    put_item = cache_table.put_item
+
+    def slow_put(Item, **kwargs):
+        release.wait(5)
+        put_item(Item, **kwargs)
+
+    monkeypatch.setattr(cache_table, 'put_item', slow_put)
+
+    queue.put(cache_table, [{'cacheKey': 'a'}])
+
+    assert queue.drain(timeout=0.1) is False
+    release.set()
+    assert queue.drain(timeout=5) is True
+    assert cache_table.puts == ['a']
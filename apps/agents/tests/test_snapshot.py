@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from lib import restapi
+from lib import snapshot
+
+URL = 'https://auto-parts-catalog.p.rapidapi.com/manufacturers/list/type-id/1'
+HEADERS = {'x-rapidapi-host': 'auto-parts-catalog.p.rapidapi.com'}
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('API_CACHE_SNAPSHOT_DIR', str(tmp_path))
+    monkeypatch.setenv('API_CACHE_SNAPSHOT', 'snap.json')
+    monkeypatch.setattr(snapshot, '_snapshots', {})
+    return tmp_path
+
+
+def test_recorded_responses_are_written_once_on_flush(cache_table, upstream, snapshot_dir, monkeypatch):
+    monkeypatch.setenv('API_CACHE_MODE', snapshot.RECORD)
+    urls = [f'{URL}?page={page}' for page in range(3)]
+    for url in urls:
+        upstream.bodies[url] = b'{"manufacturers": []}'
+        restapi._cached_api_request(url, HEADERS)
+
+    assert not (snapshot_dir / 'snap.json').exists()
+
+    restapi._flush_cache_writes()
+
+    recorded = json.loads((snapshot_dir / 'snap.json').read_text())
+    assert sorted(entry['url'] for entry in recorded.values()) == urls
+
+
+def test_replay_serves_recorded_responses_without_the_network(cache_table, upstream, snapshot_dir, monkeypatch):
+    monkeypatch.setenv('API_CACHE_MODE', snapshot.RECORD)
+    upstream.bodies[URL] = b'{"manufacturers": [1]}'
+    restapi._cached_api_request(URL, HEADERS)
+    restapi._flush_cache_writes()
+
+    monkeypatch.setenv('API_CACHE_MODE', snapshot.REPLAY)
+    monkeypatch.setattr(snapshot, '_snapshots', {})
+    upstream.requested.clear()
+
+    assert restapi._cached_api_request(URL, HEADERS).json() == {'manufacturers': [1]}
+    assert upstream.requested == []
+    with pytest.raises(snapshot.SnapshotMissError):
+        restapi._cached_api_request(URL + '?page=2', HEADERS)
+
+
+def test_recording_a_url_again_keeps_one_entry(snapshot_dir):
+    recorded = snapshot._get_snapshot()
+    recorded.add('key-1', URL, 200, '{"v": 1}')
+    recorded.add('key-2', URL, 200, '{"v": 2}')
+    recorded.save()
+
+    assert list(json.loads((snapshot_dir / 'snap.json').read_text())) == ['key-2']
+    assert recorded.get(URL)['content'] == '{"v": 2}'
@@ -0,0 +1,99 @@
+import httpx
+import pytest
+import requests
+
+from lib import async_restapi
+from lib import transport
+
+URL = 'https://auto-parts-catalog.p.rapidapi.com/manufacturers/list/type-id/1'
+HOST = 'auto-parts-catalog.p.rapidapi.com'
+
+
+def _response(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b'{}'
+    return response
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    """The shared breaker, opening after one failure with no cooldown."""
+    monkeypatch.setattr(transport._breaker, 'failure_threshold', 1)
+    monkeypatch.setattr(transport._breaker, 'cooldown_seconds', 0)
+    monkeypatch.setattr(transport.time, 'sleep', lambda seconds: None)
+    yield transport._breaker
+    transport._breaker.record_success(HOST)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """Fake shared session: each GET takes the next reply, raising it if it is an exception."""
+    replies = []
+
+    class FakeSession:
+        def get(self, url, headers, timeout):
+            reply = replies.pop(0)
+            if isinstance(reply, Exception):
+                raise reply
+            return reply
+
+    monkeypatch.setattr(transport, 'get_session', FakeSession)
+    return replies
+
+
+def test_server_errors_are_retried(breaker, session):
+    session.extend([_response(503), requests.ConnectionError('reset'), _response(200)])
+
+    assert transport.get(URL, {}).status_code == 200
+    assert session == []
+
+
+def test_breaker_fails_fast_while_open(breaker, session, monkeypatch):
+    monkeypatch.setattr(breaker, 'cooldown_seconds', 60)
+    monkeypatch.setattr(transport, '_MAX_RETRIES', 0)
+    session.append(requests.ConnectionError('reset'))
+
+    with pytest.raises(requests.ConnectionError):
+        transport.get(URL, {})
+    with pytest.raises(transport.CircuitOpenError):
+        transport.get(URL, {})
+
+
+@pytest.mark.parametrize('error', [requests.exceptions.ChunkedEncodingError('truncated'),
+                                   requests.exceptions.ContentDecodingError('bad gzip'),
+                                   requests.TooManyRedirects('loop')])
+def test_failed_half_open_trial_lets_the_next_trial_through(breaker, session, monkeypatch, error):
+    monkeypatch.setattr(transport, '_MAX_RETRIES', 0)
+    session.extend([requests.ConnectionError('reset'), error, _response(200)])
+
+    with pytest.raises(requests.ConnectionError):
+        transport.get(URL, {})
+    with pytest.raises(type(error)):
+        transport.get(URL, {})
+
+    assert transport.get(URL, {}).status_code == 200
+    assert breaker.before_request(HOST) is False
+
+
+def test_failed_async_half_open_trial_lets_the_next_trial_through(breaker, monkeypatch):
+    replies = [httpx.ConnectError('reset'), httpx.DecodingError('bad gzip'),
+               httpx.Response(200, content=b'{}')]
+
+    class FakeClient:
+        async def get(self, url, headers):
+            reply = replies.pop(0)
+            if isinstance(reply, Exception):
+                raise reply
+            return reply
+
+    monkeypatch.setattr(async_restapi, '_get_client', FakeClient)
+    monkeypatch.setattr(async_restapi, '_MAX_RETRIES', 0)
+
+    with pytest.raises(requests.ConnectionError):
+        async_restapi.run(async_restapi.get(URL, {}))
+    with pytest.raises(requests.RequestException):
+        async_restapi.run(async_restapi.get(URL, {}))
+
+    assert async_restapi.run(async_restapi.get(URL, {})).status_code == 200
+    assert breaker.before_request(HOST) is False
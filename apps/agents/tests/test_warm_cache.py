@@ -0,0 +1,25 @@
+import lookup_categories
+import warm_cache
+from lookup_categories import _ModelYearIndex
+
+MODELS = _ModelYearIndex([
+    {"modelId": 1, "modelName": "3 (G20, G80)", "modelYearFrom": "2018-11-01", "modelYearTo": None},
+    {"modelId": 2, "modelName": "5 (G30, F90)", "modelYearFrom": "2016-11-01", "modelYearTo": "2023-10-01"},
+    {"modelId": 3, "modelName": "5 Touring (G31, F90)", "modelYearFrom": "2017-06-01", "modelYearTo": "2023-12-01"},
+    {"modelId": 4, "modelName": "X5 (G05, F95)", "modelYearFrom": "2018-08-01", "modelYearTo": None},
+])
+
+
+def test_models_are_matched_like_the_lookup_matches_them(monkeypatch):
+    monkeypatch.setattr(lookup_categories, "MODEL_LLM_TOP_K", 2)
+    vehicle_info = {"make": "BMW", "model": "5-Series", "model_year": "2019", "plant_country": "GERMANY"}
+
+    # "5-Series" is not a substring of "5 (G30, F90)"; the ranking still finds it
+    assert [model["modelId"] for model in warm_cache._match_models(vehicle_info, MODELS)] == [2, 3]
+
+
+def test_a_confident_model_match_warms_only_that_model():
+    vehicle_info = {"make": "BMW", "model": "5-Series", "series": "G30", "body_class": "Sedan/Saloon",
+                    "model_year": "2019", "plant_country": "GERMANY"}
+
+    assert [model["modelId"] for model in warm_cache._match_models(vehicle_info, MODELS)] == [2]
@@ -3,26 +3,15 @@ import os
 import base64
 from typing import Dict, Any
 import boto3
+import requests
 from lib.secrets import load_secrets
 from lib import openai_client
+from lib import registry
+from lib import transport
 
 
-def _load_prompts() -> Dict[str, str]:
-    """
-    Load prompts from prompts.json file.
-
-    Returns:
-        Dictionary containing prompt templates
-
-    Raises:
-        RuntimeError: If prompts file cannot be loaded
-    """
-    try:
-        prompts_path = os.path.join(os.path.dirname(__file__), 'prompts.json')
-        with open(prompts_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        raise RuntimeError(f"Failed to load prompts: {str(e)}")
+# Loaded once per container through lib.registry
+_PROMPTS_PATH = os.path.join(os.path.dirname(__file__), 'prompts.json')
 
 
 def _extract_vin_with_textract(image_bytes: bytes) -> str:
@@ -46,7 +35,7 @@ def _extract_vin_with_textract(image_bytes: bytes) -> str:
         )
 
         # Use OpenAI to extract VIN from Textract output
-        prompts = _load_prompts()
+        prompts = registry.load_prompts(_PROMPTS_PATH)
 
         # Prepare message with Textract output
         message_content = f"{prompts['extract_vin_from_textract']}\n\nTextract Output:\n{json.dumps(textract_response, indent=2)}"
@@ -95,8 +84,6 @@ def _lookup_vehicle_info(vin: str) -> Dict[str, Any]:
         raise ValueError("RAPIDAPI_KEY environment variable must be set")
 
     try:
-        import requests
-
         # Look up VIN using RapidAPI
         vin_url = f"https://tecdoc-catalog.p.rapidapi.com/vin/decoder-v2/{vin}"
         headers = {
@@ -104,7 +91,7 @@ def _lookup_vehicle_info(vin: str) -> Dict[str, Any]:
             "x-rapidapi-key": api_key
         }
 
-        vin_response = requests.get(vin_url, headers=headers)
+        vin_response = transport.get(vin_url, headers)
         vin_response.raise_for_status()
 
         vehicle_data = vin_response.json()
@@ -10,6 +10,7 @@ export class AgentsStack extends cdk.Stack {
   public readonly vinLookupLambda: lambda.Function;
   public readonly photoAnalyzerLambda: lambda.Function;
   public readonly partsCategoriesLambda: lambda.Function;
+  public readonly partsCategoriesBatchLambda: lambda.Function;
   public readonly partsSearchLambda: lambda.Function;
   public readonly apiKeysSecret: secretsmanager.Secret;
 
@@ -37,6 +38,7 @@ export class AgentsStack extends cdk.Stack {
     this.vinLookupLambda = partsAgent.vinLookupLambda;
     this.photoAnalyzerLambda = partsAgent.photoAnalyzerLambda;
     this.partsCategoriesLambda = partsAgent.partsCategoriesLambda;
+    this.partsCategoriesBatchLambda = partsAgent.partsCategoriesBatchLambda;
     this.partsSearchLambda = partsAgent.partsSearchLambda;
   }
 }
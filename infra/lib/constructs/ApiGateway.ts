@@ -9,6 +9,7 @@ export interface ApiGatewayProps {
   vinLookupLambda: lambda.Function;
   photoAnalyzerLambda: lambda.Function;
   partsCategoriesLambda: lambda.Function;
+  partsCategoriesBatchLambda: lambda.Function;
   partsSearchLambda: lambda.Function;
 }
 
@@ -90,6 +91,14 @@ export class ApiGateway extends Construct {
       defaultMethodOptions
     );
 
+    // POST /agents/parts-categories/batch
+    const partsCategoriesBatch = partsCategories.addResource('batch');
+    partsCategoriesBatch.addMethod(
+      'POST',
+      new apigateway.LambdaIntegration(props.partsCategoriesBatchLambda),
+      defaultMethodOptions
+    );
+
     // POST /agents/parts-search
     const partsSearch = agents.addResource('parts-search');
     partsSearch.addMethod(
@@ -14,7 +14,9 @@ export class PartsAgent extends Construct {
   public readonly vinLookupLambda: lambda.Function;
   public readonly photoAnalyzerLambda: lambda.Function;
   public readonly partsCategoriesLambda: lambda.Function;
+  public readonly partsCategoriesBatchLambda: lambda.Function;
   public readonly partsSearchLambda: lambda.Function;
+  public readonly cacheWarmerLambda: lambda.Function;
   public readonly apiCacheTable: dynamodb.Table;
 
   constructor(scope: Construct, id: string, props: PartsAgentProps) {
@@ -89,10 +91,32 @@ export class PartsAgent extends Construct {
     this.partsCategoriesLambda = new lambda.Function(this, 'PartsCategoriesLambda', {
       functionName: 'Hp-PartsCategoriesAgent-Lambda',
       ...commonLambdaProps,
+      // /tmp holds the on-disk API cache tier for the life of the container
+      ephemeralStorageSize: cdk.Size.gibibytes(2),
+      environment: {
+        ...commonLambdaProps.environment,
+        API_CACHE_DISK_MB: '1536',
+      },
       code: lambda.Code.fromAsset(path.join(__dirname, '../../../apps/agents/parts_categories')),
       handler: 'lookup_categories.lambda_handler',
     });
 
+    // Create Parts Categories Batch Lambda (same code, resolves many vehicles
+    // per request for fleet imports; API Gateway still cuts responses at 29s,
+    // so large imports should be split or invoke the function directly)
+    this.partsCategoriesBatchLambda = new lambda.Function(this, 'PartsCategoriesBatchLambda', {
+      functionName: 'Hp-PartsCategoriesBatch-Lambda',
+      ...commonLambdaProps,
+      timeout: cdk.Duration.minutes(15),
+      ephemeralStorageSize: cdk.Size.gibibytes(2),
+      environment: {
+        ...commonLambdaProps.environment,
+        API_CACHE_DISK_MB: '1536',
+      },
+      code: lambda.Code.fromAsset(path.join(__dirname, '../../../apps/agents/parts_categories')),
+      handler: 'resolve_batch.lambda_handler',
+    });
+
     // Create Parts Search Lambda (with LangGraph layer)
     this.partsSearchLambda = new lambda.Function(this, 'PartsSearchLambda', {
       functionName: 'Hp-PartsSearchAgent-Lambda',
@@ -100,25 +124,42 @@ export class PartsAgent extends Construct {
       timeout: cdk.Duration.minutes(5),
       memorySize: 1024,
       layers: [lambdaUtilsLayer, langgraphLayer],
+      ephemeralStorageSize: cdk.Size.gibibytes(2),
       environment: {
         SECRET_ARN: props.apiKeysSecret.secretArn,
         API_CACHE_TABLE: this.apiCacheTable.tableName,
+        API_CACHE_DISK_MB: '1536',
       },
       code: lambda.Code.fromAsset(path.join(__dirname, '../../../apps/agents/parts_lookup')),
       handler: 'lookup_parts.lambda_handler',
     });
 
+    // Create Cache Warmer Lambda (same code as Parts Categories). It has no
+    // schedule or route: invoke it manually with {"vehicles": [...]} to
+    // pre-populate the API cache
+    this.cacheWarmerLambda = new lambda.Function(this, 'CacheWarmerLambda', {
+      functionName: 'Hp-CacheWarmer-Lambda',
+      ...commonLambdaProps,
+      timeout: cdk.Duration.minutes(15),
+      code: lambda.Code.fromAsset(path.join(__dirname, '../../../apps/agents/parts_categories')),
+      handler: 'warm_cache.lambda_handler',
+    });
+
     // Grant all Lambdas access to:
     // 1. DynamoDB table (read/write)
     this.apiCacheTable.grantReadWriteData(this.vinLookupLambda);
     this.apiCacheTable.grantReadWriteData(this.photoAnalyzerLambda);
     this.apiCacheTable.grantReadWriteData(this.partsCategoriesLambda);
+    this.apiCacheTable.grantReadWriteData(this.partsCategoriesBatchLambda);
     this.apiCacheTable.grantReadWriteData(this.partsSearchLambda);
+    this.apiCacheTable.grantReadWriteData(this.cacheWarmerLambda);
 
     // 2. Secrets Manager (read)
     props.apiKeysSecret.grantRead(this.vinLookupLambda);
     props.apiKeysSecret.grantRead(this.photoAnalyzerLambda);
     props.apiKeysSecret.grantRead(this.partsCategoriesLambda);
+    props.apiKeysSecret.grantRead(this.partsCategoriesBatchLambda);
     props.apiKeysSecret.grantRead(this.partsSearchLambda);
+    props.apiKeysSecret.grantRead(this.cacheWarmerLambda);
   }
 }
@@ -11,6 +11,7 @@ interface InfraStackProps extends cdk.StackProps {
   vinLookupLambda: lambda.Function;
   photoAnalyzerLambda: lambda.Function;
   partsCategoriesLambda: lambda.Function;
+  partsCategoriesBatchLambda: lambda.Function;
   partsSearchLambda: lambda.Function;
   apiKeysSecret: secretsmanager.Secret;
 }
@@ -34,6 +35,7 @@ export class InfraStack extends cdk.Stack {
       vinLookupLambda: props.vinLookupLambda,
       photoAnalyzerLambda: props.photoAnalyzerLambda,
       partsCategoriesLambda: props.partsCategoriesLambda,
+      partsCategoriesBatchLambda: props.partsCategoriesBatchLambda,
       partsSearchLambda: props.partsSearchLambda,
     });
 